@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'todo.replicas.primary_stickiness_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,6 +75,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
@@ -84,6 +87,7 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+# Con DJANGO_DB_PROFILE=production se aplica SQLITE_PRODUCTION_PROFILE (más abajo)
 
 
 # Password validation
@@ -127,6 +131,21 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Los adjuntos se guardan por contenido (SHA-256) en MEDIA_ROOT/todo_attachments/blobs:
+# los archivos repetidos ocupan una sola copia (todo.storage.ContentAddressedStorage)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'attachments': {
+        'BACKEND': 'todo.storage.ContentAddressedStorage',
+        'OPTIONS': {'blob_dir': 'todo_attachments/blobs'},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -137,16 +156,118 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # Codifican/decodifican con orjson si está instalado; si no, se comportan
+    # como rest_framework.renderers.JSONRenderer / rest_framework.parsers.JSONParser
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'todo.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'todo.parsers.FastJSONParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Stream de eventos (SSE, /api/events/): LocalEventBackend difunde dentro del
+# proceso; con varios procesos usar todo.events.DatabaseEventBackend
+TODO_EVENTS_BACKEND = 'todo.events.LocalEventBackend'
+# Eventos pendientes por conexión; si un cliente lento la llena, se cierra
+TODO_EVENTS_QUEUE_SIZE = 100
+
+# Lecturas de la API con vistas asíncronas (todo.async_views). config/asgi.py
+# lo activa; con WSGI las vistas asíncronas no aportan y se usan las síncronas
+TODO_ASYNC_VIEWS = os.environ.get('TODO_ASYNC_VIEWS', '0') == '1'
+
+# Descargas de adjuntos (/api/attachments/<id>/download/): con
+# 'x-accel-redirect' (nginx) o 'x-sendfile' (Apache, lighttpd) el servidor web
+# envía el archivo; None lo envía Django con FileResponse. Solo WSGI
+# (wsgi.file_wrapper) lo envía con sendfile; bajo ASGI se copia por bloques
+# desde Python, así que en despliegues ASGI conviene activar el envío delegado
+TODO_ATTACHMENT_OFFLOAD = os.environ.get('TODO_ATTACHMENT_OFFLOAD') or None
+# Location interna de nginx que sirve MEDIA_ROOT (solo con x-accel-redirect)
+TODO_ATTACHMENT_ACCEL_PREFIX = '/protected-media/'
+
+# Miniaturas de los adjuntos de imagen (lado máximo en píxeles y formatos),
+# generadas por TODO_THUMBNAIL_WORKERS procesos (0: en un hilo del servidor).
+# Con más de TODO_THUMBNAIL_QUEUE_SIZE pendientes se omiten hasta el
+# siguiente `manage.py generate_thumbnails`
+TODO_THUMBNAIL_SIZES = (128, 512)
+TODO_THUMBNAIL_FORMATS = ('webp', 'jpeg')
+TODO_THUMBNAIL_WORKERS = 2
+TODO_THUMBNAIL_QUEUE_SIZE = 100
+# 'jobs' encola las miniaturas en la cola de trabajos (run_todo_worker) en
+# lugar del pool del propio servidor
+TODO_THUMBNAIL_QUEUE = 'local'
+
+# Cola de trabajos en segundo plano (todo.jobs, manage.py run_todo_worker):
+# un trabajo fallido se reintenta tras 5 s, 10 s, 20 s...
+TODO_JOB_RETRY_BACKOFF = 5
+
+# Caché de respuestas de categorías y usuarios (todo.response_cache). La clave
+# incluye las generaciones de DataGeneration, así que las escrituras de
+# cualquier proceso invalidan también las LocMemCache de los demás. Con varios
+# procesos (workers de gunicorn) FileBasedCache con TODO_CACHE_DIR comparte
+# además las respuestas guardadas
+TODO_CACHE_DIR = os.environ.get('TODO_CACHE_DIR')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todo',
+    },
+}
+if TODO_CACHE_DIR:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TODO_CACHE_DIR,
+    }
+TODO_RESPONSE_CACHE = 'default'
+# Las respuestas guardadas caducan a los 5 minutos aunque no haya escrituras
+TODO_RESPONSE_CACHE_TIMEOUT = 300
+
+# Perfil de producción de SQLite. Cada conexión nueva ejecuta los PRAGMA:
+# - WAL: los lectores no bloquean al escritor.
+# - synchronous=NORMAL: con WAL no corrompe la base; ante un corte de luz
+#   pueden perderse las últimas transacciones.
+# - mmap de 256 MB, caché de 64 MB por conexión y tablas temporales en memoria.
+# - Espera de hasta 5 s por el bloqueo de escritura.
+# Las transacciones empiezan con BEGIN IMMEDIATE: así esperan el bloqueo al
+# empezar, en lugar de fallar con "database is locked" al pasar de lectura
+# a escritura. Las conexiones se reutilizan entre peticiones. Con ASGI cada
+# petición usa su propio hilo, así que no se reutilizan (CONN_MAX_AGE=0).
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+SQLITE_PRODUCTION_PROFILE = {
+    'CONN_MAX_AGE': 0 if TODO_ASYNC_VIEWS else 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRODUCTION_PRAGMAS.items()),
+        'transaction_mode': 'IMMEDIATE',
+    },
+}
+if os.environ.get('DJANGO_DB_PROFILE') == 'production':
+    DATABASES['default'].update(SQLITE_PRODUCTION_PROFILE)
+
+# Réplicas de lectura: DJANGO_READ_REPLICAS=/ruta/replica1.sqlite3,/ruta/replica2.sqlite3
+# añade los alias replica1, replica2... que `manage.py sync_replicas` copia
+# del primario. todo.replicas.ReplicaRouter manda ahí las lecturas mientras
+# estén al día (TODO_REPLICA_MAX_LAG, comprobado cada TODO_REPLICA_CHECK_INTERVAL
+# segundos); tras una escritura, el cliente lee del primario durante
+# TODO_PRIMARY_STICKY_SECONDS segundos.
+TODO_READ_REPLICAS = []
+for index, replica_path in enumerate(filter(None, os.environ.get('DJANGO_READ_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'NAME': replica_path, 'TEST': {'MIRROR': 'default'}}
+    TODO_READ_REPLICAS.append(f'replica{index}')
+DATABASE_ROUTERS = ['todo.replicas.ReplicaRouter']
+TODO_REPLICA_MAX_LAG = 10
+TODO_REPLICA_CHECK_INTERVAL = 1
+TODO_PRIMARY_STICKY_SECONDS = 5
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -49,8 +49,13 @@ class TodoCategoryAdmin(admin.ModelAdmin):
     
     def tasks_count(self, obj):
         """Mostrar número de tareas en esta categoría"""
-        return obj.todo_set.count()
+        return obj.tasks_count
     tasks_count.short_description = 'Número de tareas'
+    tasks_count.admin_order_field = 'tasks_count'
+    
+    def get_queryset(self, request):
+        """Anotar el número de tareas desde los contadores"""
+        return super().get_queryset(request).with_tasks_count()
 
 
 @admin.register(TodoAttachment)
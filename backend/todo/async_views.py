@@ -0,0 +1,106 @@
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.shortcuts import aget_object_or_404
+from rest_framework.response import Response
+
+from .pagination import apaginate_queryset
+
+
+class AsyncReadMixin:
+    """
+    Acciones de lectura asíncronas para los ViewSets servidos por ASGI
+
+    Con settings.TODO_ASYNC_VIEWS (lo activa config/asgi.py), las rutas que
+    incluyen alguna acción de `async_actions` se sirven con una vista
+    asíncrona: esas acciones se ejecutan en el event loop con su versión
+    `a<acción>`, que consulta con el ORM asíncrono, y el resto de métodos
+    de la ruta (p. ej. POST sobre la lista) en un hilo, igual que las vistas
+    síncronas bajo ASGI. Autenticación, permisos, negociación de contenido
+    y manejo de errores son los de DRF.
+    """
+    async_actions = ()
+    async_view = False
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        if not getattr(settings, 'TODO_ASYNC_VIEWS', False) or not actions or \
+                not set(cls.async_actions).intersection(actions.values()):
+            return super().as_view(actions, **initkwargs)
+
+        view = super().as_view(actions, async_view=True, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            # dispatch() devuelve la corrutina de adispatch()
+            return await view(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.async_view:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """APIView.dispatch para el event loop"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # La autenticación por sesión consulta la base de datos
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if self.action in self.async_actions:
+                response = await getattr(self, f'a{self.action}')(request, *args, **kwargs)
+            else:
+                method = request.method.lower()
+                handler = self.http_method_not_allowed
+                if method in self.http_method_names:
+                    handler = getattr(self, method, self.http_method_not_allowed)
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_queryset(self):
+        """get_queryset para las acciones asíncronas (no debe consultar la base de datos)"""
+        return self.get_queryset()
+
+    async def aget_object(self):
+        """get_object con el ORM asíncrono"""
+        queryset = self.filter_queryset(await self.aget_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await aget_object_or_404(queryset, **filter_kwargs)
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await apaginate_queryset(self.paginator, queryset, self.request, view=self)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(await self.aget_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
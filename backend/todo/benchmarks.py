@@ -0,0 +1,616 @@
+import asyncio
+import copy
+import importlib
+import io
+import itertools
+import json
+import logging
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.signals import got_request_exception
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import clear_url_caches
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .export import iter_export_rows
+from .models import Todo, TodoCategory
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .serializers import TodoSerializer
+
+
+# (nombre, método, URL, cuerpo); {todo}, {category} y {user} se completan
+# con IDs existentes de los datos sembrados
+ENDPOINTS = [
+    ('todos-list', 'get', '/api/todos/', None),
+    ('todos-list-status', 'get', '/api/todos/?status=pending', None),
+    ('todos-list-status-priority', 'get', '/api/todos/?status=pending&priority=high', None),
+    ('todos-list-category', 'get', '/api/todos/?category={category}', None),
+    ('todos-list-user', 'get', '/api/todos/?user={user}', None),
+    ('todos-list-overdue', 'get', '/api/todos/?overdue=true', None),
+    ('todos-list-search', 'get', '/api/todos/?search=presupuesto', None),
+    ('todos-list-deep-page', 'get', '/api/todos/?page=50', None),
+    ('todos-list-cursor', 'get', '/api/todos/?pagination=cursor', None),
+    ('todos-list-fields', 'get', '/api/todos/?fields=id,title,status', None),
+    ('todos-list-expand', 'get', '/api/todos/?expand=category,user,attachments', None),
+    ('todos-detail', 'get', '/api/todos/{todo}/', None),
+    ('todos-create', 'post', '/api/todos/', {'title': 'Tarea de benchmark', 'priority': 'high'}),
+    ('todos-partial-update', 'patch', '/api/todos/{todo}/', {'title': 'Tarea modificada'}),
+    ('todos-update-status', 'patch', '/api/todos/{todo}/update_status/', {'status': 'in_progress'}),
+    ('todos-mark-completed', 'post', '/api/todos/{todo}/mark_completed/', None),
+    ('todos-delete', 'delete', '/api/todos/{todo}/', None),
+    ('todos-stats', 'get', '/api/todos/stats/', None),
+    ('todos-stats-user', 'get', '/api/todos/stats/?user={user}', None),
+    ('todos-stats-search', 'get', '/api/todos/stats/?search=presupuesto', None),
+    ('todos-high-priority', 'get', '/api/todos/high-priority/', None),
+    ('todos-high-priority-fields', 'get', '/api/todos/high-priority/?fields=id,title,status', None),
+    ('todos-overdue', 'get', '/api/todos/overdue/', None),
+    ('todos-pending-ids', 'get', '/api/todos/pending-ids/', None),
+    ('todos-pending-titles', 'get', '/api/todos/pending-titles/', None),
+    ('todos-pending-unresolved', 'get', '/api/todos/pending-unresolved/', None),
+    ('todos-pending-resolved', 'get', '/api/todos/pending-resolved/', None),
+    ('todos-pending-users', 'get', '/api/todos/pending-users/', None),
+    ('todos-resolved-users', 'get', '/api/todos/resolved-users/', None),
+    ('todos-unresolved-users', 'get', '/api/todos/unresolved-users/', None),
+    ('todos-unresolved-users-columns', 'get', '/api/todos/unresolved-users/?layout=columns', None),
+    ('todos-unresolved-users-cursor', 'get', '/api/todos/unresolved-users/?pagination=cursor', None),
+    ('todos-pending-ids-packed', 'get', '/api/todos/pending-ids/?format=packed', None),
+    ('todos-pending-ids-cursor', 'get', '/api/todos/pending-ids/?pagination=cursor&page_size=10000', None),
+    ('todos-changes', 'get', '/api/todos/changes/', None),
+    ('todos-export-ndjson', 'get', '/api/todos/export/?format=ndjson&user={user}', None),
+    ('todos-bulk-create', 'post', '/api/todos/bulk-create/',
+     [{'title': f'Masiva {i}', 'category': '{category}'} for i in range(100)]),
+    ('categories-list', 'get', '/api/categories/', None),
+    ('categories-detail', 'get', '/api/categories/{category}/', None),
+    ('attachments-list', 'get', '/api/attachments/', None),
+    ('users-list', 'get', '/api/users/', None),
+    ('dashboard', 'get', '/api/dashboard/', None),
+]
+
+# Endpoints sin paginar que serializan todas las tareas que cumplen el filtro:
+# por encima de UNBOUNDED_MAX_SIZE tareas no se miden y la línea base los
+# registra como omitidos
+UNBOUNDED_ENDPOINTS = {'todos-high-priority', 'todos-overdue'}
+UNBOUNDED_MAX_SIZE = 100000
+
+# Un paso de SQLite que recorre la tabla de tareas, directamente o por un índice
+TABLE_SCAN = re.compile(r'^SCAN (TABLE )?todo_todo\b')
+# Cada cuántas instrucciones de la VM de SQLite se llama al contador
+VM_STEP_UNIT = 1000
+
+# Sentencias de control de transacción que no cuentan como consultas
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+# Los endpoints más lentos que esto se miden una sola vez
+SLOW_REQUEST_SECONDS = 2.0
+
+# Margen permitido sobre la línea base antes de considerar una regresión
+TIME_TOLERANCE = 1.5
+TIME_SLACK_MS = 5.0
+VM_STEPS_TOLERANCE = 1.1
+VM_STEPS_SLACK = 10
+
+
+# (nombre, renderer, parser) que se comparan en benchmark_json; el primero es la referencia
+JSON_CODECS = [
+    ('drf', JSONRenderer, JSONParser),
+    ('fast', FastJSONRenderer, FastJSONParser),
+]
+
+
+# Lecturas que reparte la prueba de concurrencia entre los clientes
+CONCURRENCY_URLS = [
+    '/api/todos/',
+    '/api/todos/{todo}/',
+    '/api/todos/stats/',
+    '/api/todos/high-priority/?user={user}&category={category}',
+    '/api/todos/overdue/?user={user}&category={category}',
+    '/api/users/',
+]
+# Conexión de SQLite sin ajustes (la de Django): diario de rollback,
+# transacciones diferidas y una conexión por petición
+SQLITE_DEFAULT_PROFILE = {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}}
+# Proporción de escrituras (PATCH de estado o POST) en la prueba mixta
+MIXED_WRITE_RATIO = 0.2
+# wsgi: vistas síncronas en un pool de hilos fijo (servidor WSGI con hilos);
+# asgi-sync: ASGI con las vistas síncronas; asgi: ASGI con las vistas asíncronas
+CONCURRENCY_STACKS = ('wsgi', 'asgi-sync', 'asgi')
+
+
+@contextmanager
+def seeded_database(size, stdout=None, path=None):
+    """Base de datos de prueba temporal con `size` tareas sintéticas (en el archivo `path` si se indica)"""
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    if path:
+        test_settings['NAME'] = str(path)
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            call_command(
+                'create_sample_data', '--todos', str(size), '--users', str(max(size // 1000, 1)),
+                '--categories', '20', '--attachments', str(size // 100), '--seed', '1',
+                stdout=stdout or io.StringIO(),
+            )
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        teardown_test_environment()
+
+
+def endpoint_ids():
+    """IDs existentes para completar las URLs de los endpoints"""
+    return {
+        'todo': Todo.objects.order_by('id').values_list('id', flat=True).first(),
+        'category': TodoCategory.objects.order_by('id').values_list('id', flat=True).first(),
+        'user': Todo.objects.exclude(user=None).order_by('id').values_list('user_id', flat=True).first(),
+    }
+
+
+def fill_ids(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, list):
+        return [fill_ids(item, ids) for item in value]
+    if isinstance(value, dict):
+        return {key: fill_ids(item, ids) for key, item in value.items()}
+    return value
+
+
+@contextmanager
+def count_vm_steps():
+    """Contar (en miles) las instrucciones ejecutadas por la VM de SQLite"""
+    steps = [0]
+    if connection.vendor != 'sqlite':
+        yield steps
+        return
+
+    def progress():
+        steps[0] += 1
+        return 0
+
+    connection.ensure_connection()
+    connection.connection.set_progress_handler(progress, VM_STEP_UNIT)
+    try:
+        yield steps
+    finally:
+        connection.connection.set_progress_handler(None, VM_STEP_UNIT)
+
+
+class QueryRecorder:
+    """
+    Contar las consultas de una petición y guardar una muestra por sentencia
+
+    Se usa execute_wrapper en lugar de CaptureQueriesContext porque el
+    registro de consultas de Django se trunca a 9000 entradas.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+            self.count += 1
+            self.statements.setdefault(sql, params)
+        return execute(sql, params, many, context)
+
+
+def is_full_scan(sql, step):
+    """
+    Indicar si un paso del plan de `sql` recorre todo_todo completa
+
+    Recorrer un índice (SCAN ... USING INDEX) solo se admite en sentencias
+    sin WHERE: el listado por defecto, acotado por su LIMIT, y los conteos
+    de toda la tabla. Con un filtro, recorrer un índice poco selectivo es un
+    recorrido completo aunque SQLite lo muestre con USING INDEX.
+    """
+    if not TABLE_SCAN.match(step):
+        return False
+    return 'USING' not in step or ' WHERE ' in sql
+
+
+def count_full_scans(statements):
+    """Número de sentencias distintas cuyo plan recorre todo_todo completa"""
+    if connection.vendor != 'sqlite':
+        return None
+    scans = 0
+    with connection.cursor() as cursor:
+        for sql, params in statements.items():
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            if any(is_full_scan(sql, row[-1]) for row in cursor.fetchall()):
+                scans += 1
+    return scans
+
+
+def request_once(client, method, url, body):
+    """Ejecutar una petición y revertir sus cambios para no alterar los datos"""
+    with transaction.atomic():
+        response = getattr(client, method)(url, body, format='json')
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+        transaction.set_rollback(True)
+    return response
+
+
+def run_endpoint(client, method, url, body, repeat):
+    """Medir un endpoint: mediana del tiempo, consultas, recorridos completos y pasos de la VM"""
+    started = time.perf_counter()
+    request_once(client, method, url, body)  # calentamiento
+    if time.perf_counter() - started > SLOW_REQUEST_SECONDS:
+        repeat = 1
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        request_once(client, method, url, body)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder), count_vm_steps() as steps:
+        response = request_once(client, method, url, body)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method.upper()} {url} respondió {response.status_code}')
+
+    return {
+        'time_ms': round(statistics.median(timings), 2),
+        'queries': recorder.count,
+        'full_scans': count_full_scans(recorder.statements),
+        'vm_steps': steps[0] if connection.vendor == 'sqlite' else None,
+    }
+
+
+def run_benchmarks(repeat=5, names=None, size=None):
+    """
+    Medir todos los endpoints (o los indicados) contra los datos actuales
+
+    Con `size` (tareas sembradas) por encima de UNBOUNDED_MAX_SIZE los
+    endpoints de UNBOUNDED_ENDPOINTS se devuelven como {'skipped': motivo}.
+    """
+    client = APIClient()
+    ids = endpoint_ids()
+    results = {}
+    for name, method, url, body in ENDPOINTS:
+        if names and name not in names:
+            continue
+        if name in UNBOUNDED_ENDPOINTS and size is not None and size > UNBOUNDED_MAX_SIZE:
+            results[name] = {'skipped': f'sin paginar: no se mide con más de {UNBOUNDED_MAX_SIZE} tareas'}
+            continue
+        results[name] = run_endpoint(client, method, fill_ids(url, ids), fill_ids(body, ids), repeat)
+    return results
+
+
+def compare_with_baseline(results, baseline):
+    """
+    Comparar resultados con la línea base; devuelve la lista de regresiones
+
+    Las consultas y los recorridos completos no pueden aumentar; el tiempo
+    y los pasos de la VM admiten un margen por el ruido de la medición. Los
+    endpoints omitidos (en los resultados o en la línea base) no se comparan;
+    un endpoint medido sin entrada en la línea base cuenta como regresión.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            regressions.append(f'{name}: sin línea base (grabarla con --update-baseline)')
+            continue
+        if 'skipped' in expected or 'skipped' in result:
+            continue
+        if result['queries'] > expected['queries']:
+            regressions.append(f"{name}: {result['queries']} consultas (línea base {expected['queries']})")
+        if (result['full_scans'] or 0) > (expected.get('full_scans') or 0):
+            regressions.append(
+                f"{name}: {result['full_scans']} recorridos completos (línea base {expected['full_scans']})"
+            )
+        if expected.get('vm_steps') is not None and result['vm_steps'] is not None:
+            if result['vm_steps'] > expected['vm_steps'] * VM_STEPS_TOLERANCE + VM_STEPS_SLACK:
+                regressions.append(
+                    f"{name}: {result['vm_steps']}k pasos de VM (línea base {expected['vm_steps']}k)"
+                )
+        if result['time_ms'] > expected['time_ms'] * TIME_TOLERANCE + TIME_SLACK_MS:
+            regressions.append(f"{name}: {result['time_ms']} ms (línea base {expected['time_ms']} ms)")
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, baseline):
+    with open(path, 'w', encoding='utf-8') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def json_payloads(limit):
+    """Datos a codificar: la salida de TodoSerializer y las filas de la exportación"""
+    queryset = Todo.objects.select_related('user').prefetch_related(
+        Prefetch('category', queryset=TodoCategory.objects.with_tasks_count()),
+        'attachments'
+    ).order_by('id')[:limit]
+    return {
+        'todos-serializer': TodoSerializer(queryset, many=True).data,
+        'todos-export': list(iter_export_rows(Todo.objects.order_by('id')[:limit])),
+    }
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 2)
+
+
+def run_json_benchmark(payloads, repeat=5):
+    """
+    Medir codificación y decodificación de cada carga con cada renderer/parser
+
+    Además del tiempo se comprueba que cada renderer produce exactamente
+    los mismos bytes que JSONRenderer.
+    """
+    results = {}
+    for payload_name, data in payloads.items():
+        reference = None
+        for codec_name, renderer_class, parser_class in JSON_CODECS:
+            renderer, parser = renderer_class(), parser_class()
+            content = renderer.render(data)
+            reference = content if reference is None else reference
+            results[(payload_name, codec_name)] = {
+                'render_ms': median_ms(lambda: renderer.render(data), repeat),
+                'parse_ms': median_ms(lambda: parser.parse(io.BytesIO(content)), repeat),
+                'bytes': len(content),
+                'identical': content == reference,
+            }
+    return results
+
+
+def reload_urls():
+    """Volver a construir las vistas de las URLs (as_view() lee TODO_ASYNC_VIEWS)"""
+    importlib.reload(importlib.import_module('todo.urls'))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@contextmanager
+def use_async_views(enabled):
+    """Servir la API con las vistas asíncronas activadas o desactivadas"""
+    try:
+        with override_settings(TODO_ASYNC_VIEWS=enabled):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+def wsgi_request(handler, url, method='GET', body=None):
+    """Petición contra el handler WSGI (cuerpo en JSON); devuelve el código de estado"""
+    path, _, query = url.partition('?')
+    content = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': 'testserver',
+        'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(content)), 'wsgi.input': io.BytesIO(content),
+    }
+    setup_testing_defaults(environ)
+    status = []
+    response = handler(environ, lambda status_line, headers: status.append(int(status_line[:3])))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return status[0]
+
+
+async def asgi_get(application, url):
+    """GET contra la aplicación ASGI; devuelve el código de estado"""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # El cliente no se desconecta; Django cancela la espera al terminar
+        await asyncio.Future()
+
+    status = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+async def drive_clients(get, urls, clients, requests):
+    """
+    Repartir `requests` peticiones entre `clients` clientes concurrentes
+
+    Cada cliente envía la siguiente petición en cuanto recibe la respuesta
+    anterior. Devuelve peticiones por segundo, latencias (mediana y p95,
+    incluida la espera en cola) y respuestas con error.
+    """
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        while (index := next(counter)) < requests:
+            started = time.perf_counter()
+            status = await get(urls[index % len(urls)])
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += status >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests_per_second': round(requests / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        'errors': errors,
+    }
+
+
+@contextmanager
+def stack_client(stack, threads):
+    """Función asíncrona que hace un GET a través de la pila indicada"""
+    if stack == 'wsgi':
+        handler = WSGIHandler()
+        with ThreadPoolExecutor(threads) as executor:
+            async def get(url):
+                return await asyncio.get_running_loop().run_in_executor(executor, wsgi_request, handler, url)
+            yield get
+        return
+
+    application = ASGIHandler()
+
+    async def get(url):
+        return await asgi_get(application, url)
+    yield get
+
+
+def run_concurrency_benchmark(client_counts, requests=1000, threads=32, stacks=CONCURRENCY_STACKS):
+    """
+    Comparar el rendimiento de las lecturas con WSGI y con ASGI bajo concurrencia
+
+    Los clientes y el servidor comparten el proceso (sin red ni servidor
+    externo), así que se mide el costo de cada pila y cómo reparte la
+    espera entre clientes, no el máximo de una instalación real.
+    """
+    ids = endpoint_ids()
+    urls = [url.format(**ids) for url in CONCURRENCY_URLS]
+    results = {}
+    for stack in stacks:
+        with use_async_views(stack == 'asgi'), stack_client(stack, threads) as get:
+            for clients in client_counts:
+                results[(stack, clients)] = asyncio.run(drive_clients(get, urls, clients, requests))
+    return results
+
+
+@contextmanager
+def database_profile(profile):
+    """Aplicar CONN_MAX_AGE, CONN_HEALTH_CHECKS y OPTIONS de un perfil a las conexiones que se abran"""
+    settings_dict = connection.settings_dict
+    saved = {key: settings_dict[key] for key in profile}
+    connection.close()
+    settings_dict.update(copy.deepcopy(profile))
+    try:
+        yield
+    finally:
+        connection.close()
+        settings_dict.update(saved)
+
+
+@contextmanager
+def quiet_request_errors():
+    """Contar las excepciones de las peticiones sin registrarlas; devuelve la lista de excepciones"""
+    exceptions = []
+
+    def record(sender, **kwargs):
+        exceptions.append(sys.exc_info()[1])
+
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+    got_request_exception.connect(record)
+    try:
+        yield exceptions
+    finally:
+        got_request_exception.disconnect(record)
+        request_logger.setLevel(level)
+
+
+def mixed_operations(requests, write_ratio=MIXED_WRITE_RATIO, seed=1):
+    """(método, URL, cuerpo) de una carga mixta: lecturas de la API y escrituras de tareas"""
+    rng = random.Random(seed)
+    ids = endpoint_ids()
+    reads = [url.format(**ids) for url in CONCURRENCY_URLS]
+    todo_ids = list(Todo.objects.order_by('id').values_list('id', flat=True)[:1000])
+    operations = []
+    for index in range(requests):
+        if rng.random() >= write_ratio:
+            operations.append(('GET', reads[index % len(reads)], None))
+        elif index % 2:
+            status = rng.choice(['pending', 'in_progress', 'completed'])
+            operations.append(('PATCH', f'/api/todos/{rng.choice(todo_ids)}/', {'status': status}))
+        else:
+            operations.append(('POST', '/api/todos/', {'title': f'Tarea concurrente {index}', 'priority': 'medium'}))
+    return operations
+
+
+def run_mixed_benchmark(operations, threads=16, profiles=None):
+    """
+    Ejecutar la carga mixta con `threads` hilos WSGI bajo cada perfil de conexión
+
+    Por defecto compara la conexión sin ajustes con SQLITE_PRODUCTION_PROFILE
+    (en ese orden: WAL persiste en el archivo). Devuelve por perfil peticiones
+    por segundo, p95 de lecturas y escrituras y las peticiones fallidas, de
+    las que `locked` fallaron con "database is locked".
+    """
+    profiles = profiles or [
+        ('default', SQLITE_DEFAULT_PROFILE), ('production', settings.SQLITE_PRODUCTION_PROFILE),
+    ]
+    handler = WSGIHandler()
+
+    def timed(operation):
+        method, url, body = operation
+        started = time.perf_counter()
+        status = wsgi_request(handler, url, method, body)
+        return method, status, (time.perf_counter() - started) * 1000
+
+    results = {}
+    for name, profile in profiles:
+        with database_profile(profile), quiet_request_errors() as exceptions:
+            with ThreadPoolExecutor(threads) as executor:
+                started = time.perf_counter()
+                outcomes = list(executor.map(timed, operations))
+                elapsed = time.perf_counter() - started
+        reads = sorted(ms for method, _, ms in outcomes if method == 'GET')
+        writes = sorted(ms for method, _, ms in outcomes if method != 'GET')
+        results[name] = {
+            'requests_per_second': round(len(operations) / elapsed, 1),
+            'read_p95_ms': round(reads[int(len(reads) * 0.95) - 1], 2) if reads else None,
+            'write_p95_ms': round(writes[int(len(writes) * 0.95) - 1], 2) if writes else None,
+            'errors': sum(status >= 500 for _, status, _ in outcomes),
+            'locked': sum('database is locked' in str(exc) for exc in exceptions),
+        }
+    return results
@@ -0,0 +1,150 @@
+import os
+import time
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .generations import bump_generation
+from .models import AttachmentBlob, DataGeneration, TodoAttachment
+from .storage import DIGEST_RE, TEMP_PREFIX, ContentAddressedStorage
+
+
+# Los blobs de menos de una hora no se borran: pueden estar a punto de
+# recibir su primera referencia (subida en curso) o acabar de reutilizarse
+GC_GRACE_SECONDS = 3600
+
+
+def blob_storage():
+    """Almacenamiento con el que se guardan los archivos adjuntos"""
+    return TodoAttachment._meta.get_field('file').storage
+
+
+def blob_digest(name):
+    """SHA-256 del archivo de un adjunto si está guardado por contenido"""
+    storage = blob_storage()
+    if not name or not isinstance(storage, ContentAddressedStorage):
+        return None
+    return storage.digest_of(name)
+
+
+def add_reference(name, count=1):
+    """Sumar `count` adjuntos al blob `name` (los archivos guardados por nombre se ignoran)"""
+    digest = blob_digest(name)
+    if digest is None or not count:
+        return
+    blob, _ = AttachmentBlob.objects.get_or_create(
+        sha256=digest, defaults={'name': name, 'size': lambda: blob_storage().size(name)}
+    )
+    AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + count)
+
+
+def release_reference(name, count=1):
+    """Restar `count` adjuntos al blob `name`; el archivo lo borra collect_garbage()"""
+    digest = blob_digest(name)
+    if digest is not None and count:
+        AttachmentBlob.objects.filter(sha256=digest).update(ref_count=F('ref_count') - count)
+
+
+def recount_references():
+    """Recalcular las referencias de cada blob a partir de los adjuntos; devuelve cuántos blobs cambiaron"""
+    storage = blob_storage()
+    counts = {}
+    for name, count in TodoAttachment.objects.filter(file__startswith=f'{storage.blob_dir}/') \
+            .values_list('file').annotate(count=Count('id')).order_by():
+        digest = storage.digest_of(name)
+        if digest is not None:
+            counts[digest] = counts.get(digest, 0) + count
+
+    changed = 0
+    with transaction.atomic():
+        for blob in AttachmentBlob.objects.select_for_update():
+            count = counts.pop(blob.sha256, 0)
+            if blob.ref_count != count:
+                AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=count)
+                changed += 1
+        for digest, count in counts.items():
+            add_reference(storage.blob_name(digest), count)
+            changed += 1
+    return changed
+
+
+def collect_garbage(grace=GC_GRACE_SECONDS, dry_run=False):
+    """
+    Borrar los blobs que ningún adjunto usa
+
+    - Blobs con cero referencias.
+    - Archivos del directorio de blobs sin fila en AttachmentBlob ni
+      adjunto que los use (con sus miniaturas), y temporales de subidas
+      interrumpidas.
+    En ambos casos solo si el archivo no se ha escrito ni reutilizado en
+    los últimos `grace` segundos. Devuelve (archivos borrados, bytes liberados).
+    """
+    storage = blob_storage()
+    cutoff = time.time() - grace
+    removed, freed = 0, 0
+
+    def remove(path):
+        nonlocal removed, freed
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                return False
+            if not dry_run:
+                os.unlink(path)
+        except FileNotFoundError:
+            return False
+        removed += 1
+        freed += stat.st_size
+        return True
+
+    for blob in AttachmentBlob.objects.filter(ref_count__lte=0).iterator():
+        path = storage.path(blob.name)
+        if os.path.exists(path) and os.stat(path).st_mtime > cutoff:
+            continue
+        if dry_run:
+            remove(path)
+        elif AttachmentBlob.objects.filter(pk=blob.pk, ref_count__lte=0).delete()[0]:
+            remove(path)
+
+    known = set(AttachmentBlob.objects.values_list('sha256', flat=True))
+    known.update(
+        storage.digest_of(name) for name in TodoAttachment.objects
+        .filter(file__startswith=f'{storage.blob_dir}/').values_list('file', flat=True).distinct()
+    )
+    for root, _, files in os.walk(storage.path(storage.blob_dir)):
+        for filename in files:
+            # Las miniaturas (<sha256>.thumb-...) se van con su blob
+            digest = filename.split('.', 1)[0]
+            if filename.startswith(TEMP_PREFIX) or (DIGEST_RE.match(digest) and digest not in known):
+                remove(os.path.join(root, filename))
+    return removed, freed
+
+
+def migrate_legacy_attachments(keep_originals=False):
+    """
+    Pasar al almacenamiento por contenido los adjuntos guardados por nombre
+
+    Cada archivo se copia (y se deduplica) una vez aunque lo usen varios
+    adjuntos. Devuelve (archivos migrados, adjuntos actualizados, archivos
+    que no existen).
+    """
+    storage = blob_storage()
+    names = TodoAttachment.objects.exclude(file='').exclude(file__startswith=f'{storage.blob_dir}/') \
+        .values_list('file', flat=True).distinct().order_by()
+    migrated, updated, missing = 0, 0, 0
+    for name in list(names):
+        try:
+            with storage.open(name, 'rb') as original:
+                blob = storage.save(name, original)
+        except FileNotFoundError:
+            missing += 1
+            continue
+        with transaction.atomic():
+            count = TodoAttachment.objects.filter(file=name).update(file=blob)
+            add_reference(blob, count)
+            bump_generation(DataGeneration.TODOS)
+        if not keep_originals:
+            storage.delete(name)
+        migrated += 1
+        updated += count
+    return migrated, updated, missing
@@ -0,0 +1,183 @@
+from django.contrib.auth.models import User
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .blobs import release_reference
+from .changes import record_deletions
+from .counters import apply_queryset_delete
+from .events import publish_event
+from .generations import bump_generation
+from .models import DataGeneration, Todo, TodoAttachment, TodoCategory
+from .serializers import TodoBulkCreateSerializer, TodoBulkUpdateSerializer, apply_completed_at
+
+
+BULK_MAX_ITEMS = 10000
+BULK_BATCH_SIZE = 500
+
+
+class BulkValidationError(Exception):
+    """Errores de validación por elemento (lista alineada con la entrada)"""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def preload_related(items):
+    """Cargar en dos consultas los usuarios y categorías referenciados"""
+    ids = {'user': set(), 'category': set()}
+    for item in items:
+        for field, values in ids.items():
+            value = item.get(field) if isinstance(item, dict) else None
+            if isinstance(value, int) and not isinstance(value, bool):
+                values.add(value)
+            elif isinstance(value, str) and value.isdigit():
+                values.add(int(value))
+    return {
+        User: User.objects.in_bulk(ids['user']),
+        TodoCategory: TodoCategory.objects.in_bulk(ids['category']),
+    }
+
+
+def validate_items(serializer_class, items, partial=False):
+    """Validar todos los elementos en una pasada; lanza BulkValidationError si alguno falla"""
+    context = {'preloaded': preload_related(items)}
+    validated, errors = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            validated.append(None)
+            errors.append({'non_field_errors': ['Se esperaba un objeto.']})
+            continue
+        serializer = serializer_class(data=item, partial=partial, context=context)
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+            errors.append({})
+        else:
+            validated.append(None)
+            errors.append(serializer.errors)
+    if any(errors):
+        raise BulkValidationError(errors)
+    return validated
+
+
+def bulk_create_todos(items):
+    """Validar y crear tareas con bulk_create en una transacción"""
+    validated = validate_items(TodoBulkCreateSerializer, items)
+    todos = []
+    for data in validated:
+        data = dict(data)
+        if data.get('status') == 'completed':
+            data['completed_at'] = timezone.now()
+        todos.append(Todo(**data))
+    with transaction.atomic():
+        return Todo.objects.bulk_create(todos, batch_size=BULK_BATCH_SIZE)
+
+
+def bulk_update_todos(items):
+    """Validar y actualizar tareas con bulk_update, aplicando las reglas de completed_at"""
+    validated = validate_items(TodoBulkUpdateSerializer, items, partial=True)
+
+    errors = [{} for _ in validated]
+    for index, data in enumerate(validated):
+        if 'id' not in data:
+            errors[index] = {'id': ['Este campo es requerido.']}
+    ids = [data['id'] for data in validated if 'id' in data]
+    seen = set()
+    for index, data in enumerate(validated):
+        if 'id' in data and data['id'] in seen:
+            errors[index] = {'id': ['ID duplicado en la petición.']}
+        seen.add(data.get('id'))
+
+    with transaction.atomic():
+        todos = Todo.objects.select_for_update().in_bulk(ids)
+        for index, data in enumerate(validated):
+            if not errors[index] and data['id'] not in todos:
+                errors[index] = {'id': [f"No existe una tarea con ID {data['id']}."]}
+        if any(errors):
+            raise BulkValidationError(errors)
+
+        now = timezone.now()
+        fields = {'updated_at', 'completed_at'}
+        for data in validated:
+            data = dict(data)
+            todo = todos[data.pop('id')]
+            apply_completed_at(todo, data)
+            for attr, value in data.items():
+                setattr(todo, attr, value)
+            todo.updated_at = now
+            fields.update(data)
+        updated = [todos[data['id']] for data in validated]
+        Todo.objects.bulk_update(updated, sorted(fields), batch_size=BULK_BATCH_SIZE)
+    return updated
+
+
+def fast_delete_supported():
+    """
+    Indicar si delete_todos puede prescindir del borrado de Django
+
+    Solo replica las señales de Todo y la cascada a TodoAttachment; otra
+    relación que borre o modifique filas al eliminar una tarea (o un
+    adjunto) obliga a usar QuerySet.delete().
+    """
+    if Todo._meta.many_to_many or TodoAttachment._meta.many_to_many:
+        return False
+    for relation in Todo._meta.related_objects:
+        if relation.on_delete is models.DO_NOTHING:
+            continue
+        if relation.related_model is not TodoAttachment or relation.on_delete is not models.CASCADE:
+            return False
+    return all(relation.on_delete is models.DO_NOTHING for relation in TodoAttachment._meta.related_objects)
+
+
+def delete_rows(model, field, ids):
+    """DELETE filtrado por `field` IN ids, sin cargar las filas; devuelve las filas borradas"""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    column = qn(model._meta.get_field(field).column)
+    deleted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), BULK_MAX_ITEMS):
+            batch = ids[start:start + BULK_MAX_ITEMS]
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(batch))})', batch)
+            deleted += cursor.rowcount
+    return deleted
+
+
+def delete_todos(ids):
+    """
+    Eliminar tareas existentes sin recorrerlas una a una; devuelve cuántas se borraron
+    
+    QuerySet.delete() carga cada tarea y dispara sus señales (contadores,
+    tombstone, generación, evento), O(N) consultas. Aquí se leen una vez
+    los grupos de contadores y los archivos de los adjuntos, se borran
+    adjuntos y tareas con un DELETE filtrado, y se aplica un ajuste por
+    grupo, un bulk_create de TodoDeletion, un incremento de generación y
+    un único evento todo.bulk_deleted.
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+    if not fast_delete_supported():
+        return Todo.objects.filter(pk__in=ids).delete()[1].get(Todo._meta.label, 0)
+    with transaction.atomic():
+        attachments = TodoAttachment.objects.filter(todo_id__in=ids)
+        files = list(attachments.order_by().values_list('file').annotate(count=models.Count('id')))
+        apply_queryset_delete(Todo.objects.filter(pk__in=ids))
+        delete_rows(TodoAttachment, 'todo', ids)
+        deleted = delete_rows(Todo, 'id', ids)
+        for name, count in files:
+            release_reference(name, count)
+        record_deletions(ids)
+        bump_generation(DataGeneration.TODOS)
+        # Sin IDs, como todo.bulk_updated: los clientes usan el feed de cambios
+        publish_event({'type': 'todo.bulk_deleted', 'count': deleted})
+    return deleted
+
+
+def bulk_delete_todos(ids):
+    """Eliminar con un único delete filtrado; devuelve (eliminados, IDs no encontrados)"""
+    ids = set(ids)
+    with transaction.atomic():
+        existing = set(Todo.objects.filter(id__in=ids).values_list('id', flat=True))
+        delete_todos(sorted(existing))
+    return sorted(existing), sorted(ids - existing)
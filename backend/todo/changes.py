@@ -0,0 +1,132 @@
+import base64
+import binascii
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import TodoDeletion
+
+
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 1000
+# Una transacción puede confirmar después de otra con marca de tiempo posterior;
+# el token vuelve a cubrir este margen, así que los cambios recientes se
+# reenvían (entrega al menos una vez) en lugar de perderse
+SETTLE_WINDOW = timedelta(seconds=5)
+# Antigüedad a partir de la cual se purga el registro de eliminaciones
+DELETION_LOG_RETENTION = timedelta(days=30)
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'El token es anterior al registro de eliminaciones; vuelva a sincronizar desde cero.'
+    default_code = 'sync_token_expired'
+
+
+def record_deletion(todo_id, deleted_at=None):
+    """Anotar la eliminación de una tarea para los clientes que sincronizan cambios"""
+    TodoDeletion.objects.create(todo_id=todo_id, deleted_at=deleted_at or timezone.now())
+
+
+def record_deletions(todo_ids, deleted_at=None):
+    """record_deletion para muchas tareas con un bulk_create"""
+    deleted_at = deleted_at or timezone.now()
+    TodoDeletion.objects.bulk_create(
+        [TodoDeletion(todo_id=todo_id, deleted_at=deleted_at) for todo_id in todo_ids], batch_size=500
+    )
+
+
+def prune_deletions(now=None):
+    """Eliminar las entradas del registro de eliminaciones más antiguas que la retención"""
+    deleted, _ = TodoDeletion.objects.filter(
+        deleted_at__lt=(now or timezone.now()) - DELETION_LOG_RETENTION
+    ).delete()
+    return deleted
+
+
+class ChangeStream:
+    """
+    Filas de una tabla posteriores a un cursor (marca de tiempo, id), en orden
+
+    El cursor sin marca de tiempo (None) representa el inicio de la tabla.
+    """
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+
+    def after(self, cursor):
+        timestamp, pk = cursor
+        queryset = self.queryset.order_by(self.field, 'id')
+        if timestamp is None:
+            return queryset
+        return queryset.filter(
+            Q(**{f'{self.field}__gte': timestamp}) & ~Q(**{self.field: timestamp, 'id__lte': pk})
+        )
+
+    def read(self, cursor, limit, horizon):
+        """Devolver (filas, cursor siguiente, hay más)"""
+        rows = list(self.after(cursor)[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            cursor = (getattr(rows[-1], self.field), rows[-1].id)
+        if not more and cursor[0] is not None and cursor[0] >= horizon:
+            cursor = (horizon, 0)
+        return rows, cursor, more
+
+
+def encode_token(changes_cursor, deletions_cursor):
+    parts = []
+    for timestamp, pk in (changes_cursor, deletions_cursor):
+        parts += [timestamp.isoformat() if timestamp else '', str(pk)]
+    return base64.urlsafe_b64encode('|'.join(parts).encode('ascii')).decode('ascii')
+
+
+def decode_token(token):
+    """Decodificar ((marca, id) de cambios, (marca, id) de eliminaciones) de un token"""
+    try:
+        parts = base64.urlsafe_b64decode(token.encode('ascii')).decode('ascii').split('|')
+        if len(parts) != 4:
+            raise ValueError
+        cursors = []
+        for timestamp, pk in (parts[0:2], parts[2:4]):
+            parsed = parse_datetime(timestamp) if timestamp else None
+            if timestamp and parsed is None:
+                raise ValueError
+            cursors.append((parsed, int(pk)))
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise ValidationError({'since': ['Token inválido']})
+    if cursors[1][0] is None:
+        raise ValidationError({'since': ['Token inválido']})
+    return cursors[0], cursors[1]
+
+
+def read_changes(queryset, token=None, limit=CHANGES_PAGE_SIZE, now=None):
+    """
+    Tareas creadas o modificadas y tareas eliminadas desde un token
+
+    Sin token se devuelven todas las tareas (sincronización inicial) y las
+    eliminaciones desde ese momento. Cada flujo se pagina por separado con
+    su cursor; `more` indica que hay que volver a llamar con el token nuevo.
+    Devuelve (tareas, IDs eliminados, token nuevo, more).
+    """
+    now = now or timezone.now()
+    horizon = now - SETTLE_WINDOW
+    if token:
+        changes_cursor, deletions_cursor = decode_token(token)
+        if deletions_cursor[0] < now - DELETION_LOG_RETENTION:
+            raise SyncTokenExpired()
+    else:
+        changes_cursor, deletions_cursor = (None, 0), (horizon, 0)
+
+    todos, changes_cursor, more_changes = ChangeStream(queryset, 'updated_at').read(changes_cursor, limit, horizon)
+    deletions, deletions_cursor, more_deletions = ChangeStream(
+        TodoDeletion.objects.all(), 'deleted_at'
+    ).read(deletions_cursor, limit, horizon)
+    deleted = [deletion.todo_id for deletion in deletions]
+    return todos, deleted, encode_token(changes_cursor, deletions_cursor), more_changes or more_deletions
@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .generations import read_generations
+from .models import Todo, overdue_aggregate
+
+
+def last_passed_due_date(now):
+    """
+    Última fecha límite ya pasada entre las tareas sin resolver
+
+    En SQLite se fuerza el índice parcial (overdue_aggregate), que resuelve
+    el MAX con una sola búsqueda.
+    """
+    using = router.db_for_read(Todo)
+    if connections[using].vendor != 'sqlite':
+        return Todo.objects.using(using).overdue(now).order_by('-due_date').values_list('due_date', flat=True).first()
+    value = overdue_aggregate(using, now, 'MAX', 'due_date')
+    due_date = Todo._meta.get_field('due_date')
+    connection = connections[using]
+    return connection.ops.convert_datetimefield_value(value, due_date, connection) if value else None
+
+
+def compute_validators(request, keys, time_sensitive=False):
+    """
+    Calcular (ETag, Last-Modified) de una respuesta sin generarla
+
+    Se combinan la URL, el Accept y las generaciones de los conjuntos de
+    los que depende la respuesta (una consulta). Si la respuesta depende
+    de la hora (vencidas, días restantes) se añaden la fecha actual y la
+    última fecha límite ya pasada de las tareas sin resolver, que se lee
+    del índice parcial de vencidas.
+    """
+    generations = read_generations(*keys)
+    parts = [request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+    parts += [f'{key}:{generations[key][0]}' for key in keys]
+    modified = [changed_at for _, changed_at in generations.values() if changed_at]
+
+    if time_sensitive:
+        now = timezone.now()
+        last_due = last_passed_due_date(now)
+        parts += [now.date().isoformat(), last_due.isoformat() if last_due else '']
+        modified.append(datetime.combine(now.date(), time.min, tzinfo=now.tzinfo))
+        if last_due:
+            modified.append(last_due)
+
+    digest = hashlib.md5('|'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    last_modified = int(max(modified).timestamp()) if modified else None
+    return quote_etag(digest), last_modified
+
+
+def set_validators(response, etag, last_modified):
+    """Añadir ETag y Last-Modified a las respuestas 200 y 304"""
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+def conditional_get(*keys, time_sensitive=False):
+    """
+    Responder 304 a GET/HEAD condicionales sin ejecutar la vista
+
+    Las respuestas 200 llevan ETag y Last-Modified; si el cliente envía
+    If-None-Match o If-Modified-Since y siguen vigentes, no se consulta
+    ni se serializa nada más. Admite también métodos asíncronos (las
+    validaciones se calculan en un hilo).
+    """
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+            @wraps(view_method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view_method(self, request, *args, **kwargs)
+
+                etag, last_modified = await sync_to_async(compute_validators)(request, keys, time_sensitive)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view_method(self, request, *args, **kwargs)
+                return set_validators(response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_method(self, request, *args, **kwargs)
+
+            etag, last_modified = compute_validators(request, keys, time_sensitive)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+            return set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,346 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connection, connections, models, router, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Todo, TodoCategory, TodoCounter, overdue_aggregate
+from .stats import UNCATEGORIZED_LABEL, build_stats_payload, empty_totals
+
+
+# Campos de la tarea que determinan en qué contadores cuenta
+STATE_FIELDS = ('user_id', 'category_id', 'status', 'priority')
+KEY_FIELDS = ('scope', 'scope_id', 'category_key', 'status', 'priority')
+ATTNAMES = {
+    'user': 'user_id', 'user_id': 'user_id',
+    'category': 'category_id', 'category_id': 'category_id',
+    'status': 'status', 'priority': 'priority',
+}
+
+_suspended = ContextVar('todo_counters_suspended', default=False)
+
+
+@contextmanager
+def suspend_counters():
+    """Desactivar el ajuste de contadores en QuerySet.update (lo hace quien llama)"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def counters_suspended():
+    return _suspended.get()
+
+
+def counter_state(instance):
+    """Estado (user_id, category_id, status, priority) de una tarea, o None si hay campos diferidos"""
+    values = instance.__dict__
+    if any(field not in values for field in STATE_FIELDS):
+        return None
+    return tuple(values[field] for field in STATE_FIELDS)
+
+
+def fetch_state(pk):
+    """Leer el estado guardado de una tarea desde la base de datos"""
+    return Todo.objects.filter(pk=pk).values_list(*STATE_FIELDS).first()
+
+
+def remember_state(instance, state=None):
+    """Guardar en la instancia el estado con el que cuenta en los contadores"""
+    instance._counter_state = state if state is not None else counter_state(instance)
+
+
+def ensure_state(instance):
+    """Cargar el estado persistido si la instancia no lo tiene (campos diferidos)"""
+    if getattr(instance, '_counter_state', None) is None and instance.pk is not None:
+        instance._counter_state = fetch_state(instance.pk)
+
+
+def add_state(deltas, state, amount):
+    """Sumar una tarea con el estado dado a los contadores global y de usuario"""
+    if state is None or not amount:
+        return
+    user_id, category_id, status, priority = state
+    category_key = category_id or 0
+    deltas[(TodoCounter.SCOPE_GLOBAL, 0, category_key, status, priority)] += amount
+    if user_id:
+        deltas[(TodoCounter.SCOPE_USER, user_id, category_key, status, priority)] += amount
+
+
+def apply_deltas(deltas):
+    """Aplicar incrementos atómicos (F()) a los contadores, creando las filas que falten"""
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        lookup = dict(zip(KEY_FIELDS, key))
+        if TodoCounter.objects.filter(**lookup).update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                TodoCounter.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Otra petición creó la fila entre el update y el create
+            TodoCounter.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def upsert_deltas(deltas):
+    """
+    Sumar los incrementos con un único INSERT ... ON CONFLICT por lotes
+
+    Para cargas masivas: apply_deltas hace al menos una consulta por
+    contador, y una carga de millones de tareas toca cientos de miles.
+    """
+    qn = connection.ops.quote_name
+    table = qn(TodoCounter._meta.db_table)
+    keys = [qn(TodoCounter._meta.get_field(field).column) for field in KEY_FIELDS]
+    count = qn(TodoCounter._meta.get_field('count').column)
+    sql = (
+        f'INSERT INTO {table} ({", ".join(keys)}, {count}) VALUES ({", ".join(["%s"] * (len(keys) + 1))}) '
+        f'ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}'
+    )
+    rows = [(*key, delta) for key, delta in deltas.items() if delta]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def apply_save(instance, created):
+    """Mover una tarea guardada entre los contadores"""
+    new_state = counter_state(instance) or fetch_state(instance.pk)
+    deltas = defaultdict(int)
+    if not created:
+        old_state = getattr(instance, '_counter_state', None)
+        if old_state == new_state:
+            return
+        add_state(deltas, old_state, -1)
+    add_state(deltas, new_state, 1)
+    apply_deltas(deltas)
+    remember_state(instance, new_state)
+
+
+def apply_delete(instance):
+    """Descontar una tarea eliminada de sus contadores"""
+    deltas = defaultdict(int)
+    add_state(deltas, getattr(instance, '_counter_state', None), -1)
+    apply_deltas(deltas)
+
+
+def apply_queryset_update(queryset, values, do_update):
+    """
+    Ajustar los contadores para un QuerySet.update()
+
+    Se agrupan las filas afectadas antes de actualizar y se trasladan al
+    estado nuevo. Si algún valor es una expresión, se reconstruyen todos.
+    """
+    new_values = {}
+    for name, value in values.items():
+        if name not in ATTNAMES:
+            continue
+        if hasattr(value, 'resolve_expression'):
+            result = do_update(**values)
+            rebuild_counters()
+            return result
+        if isinstance(value, models.Model):
+            value = value.pk
+        new_values[ATTNAMES[name]] = value
+
+    groups = list(
+        queryset.order_by().values(*STATE_FIELDS).annotate(tasks=Count('id'))
+    )
+    result = do_update(**values)
+
+    deltas = defaultdict(int)
+    for group in groups:
+        old_state = tuple(group[field] for field in STATE_FIELDS)
+        new_state = tuple(new_values.get(field, group[field]) for field in STATE_FIELDS)
+        if old_state != new_state:
+            add_state(deltas, old_state, -group['tasks'])
+            add_state(deltas, new_state, group['tasks'])
+    apply_deltas(deltas)
+    return result
+
+
+def apply_queryset_delete(queryset):
+    """Descontar de los contadores las tareas de un QuerySet que se va a eliminar (una consulta por grupo)"""
+    deltas = defaultdict(int)
+    for group in queryset.order_by().values(*STATE_FIELDS).annotate(tasks=Count('id')):
+        add_state(deltas, tuple(group[field] for field in STATE_FIELDS), -group['tasks'])
+    apply_deltas(deltas)
+
+
+def apply_bulk_create(objs, conflicts=False):
+    """Sumar a los contadores las tareas creadas con bulk_create"""
+    if conflicts:
+        # Con ignore/update_conflicts no se sabe qué filas se insertaron
+        rebuild_counters()
+        for obj in objs:
+            remember_state(obj)
+        return
+
+    deltas = defaultdict(int)
+    for obj in objs:
+        state = counter_state(obj)
+        add_state(deltas, state, 1)
+        remember_state(obj, state)
+    apply_deltas(deltas)
+
+
+def apply_bulk_update(objs, do_update, batch_size=500):
+    """Mover entre contadores las tareas modificadas con bulk_update"""
+    objs = list(objs)
+    old_states = {}
+    pks = [obj.pk for obj in objs]
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        for pk, *state in Todo.objects.filter(pk__in=batch).values_list('pk', *STATE_FIELDS):
+            old_states[pk] = tuple(state)
+
+    with suspend_counters():
+        # bulk_update usa internamente QuerySet.update con expresiones Case()
+        result = do_update()
+
+    deltas = defaultdict(int)
+    for obj in objs:
+        old_state = old_states.get(obj.pk)
+        new_state = counter_state(obj)
+        if old_state is not None and new_state is not None and old_state != new_state:
+            add_state(deltas, old_state, -1)
+            add_state(deltas, new_state, 1)
+        remember_state(obj, new_state)
+    apply_deltas(deltas)
+    return result
+
+
+def move_category_counters(category_id):
+    """Pasar a "sin categoría" los contadores de una categoría que se elimina"""
+    counters = TodoCounter.objects.filter(category_key=category_id)
+    deltas = defaultdict(int)
+    for counter in counters.exclude(count=0):
+        deltas[(counter.scope, counter.scope_id, 0, counter.status, counter.priority)] += counter.count
+    counters.delete()
+    apply_deltas(deltas)
+
+
+def compute_expected_counters():
+    """Recalcular desde la tabla de tareas el valor que deben tener los contadores"""
+    expected = defaultdict(int)
+    groups = Todo.objects.order_by().values(*STATE_FIELDS).annotate(tasks=Count('id'))
+    for group in groups:
+        add_state(expected, tuple(group[field] for field in STATE_FIELDS), group['tasks'])
+    return {key: count for key, count in expected.items() if count}
+
+
+def rebuild_counters():
+    """
+    Reemplazar todos los contadores por los valores recalculados
+
+    Se recalculan con un INSERT ... SELECT agrupado: con muchos usuarios hay
+    cientos de miles de filas y crearlas con bulk_create es mucho más lento.
+    """
+    qn = connection.ops.quote_name
+    table = qn(Todo._meta.db_table)
+    user, category, status, priority = (qn(Todo._meta.get_field(field).column) for field in STATE_FIELDS)
+    columns = ', '.join(qn(TodoCounter._meta.get_field(field).column) for field in (*KEY_FIELDS, 'count'))
+    group = f'COALESCE({category}, 0), {status}, {priority}'
+    sql = (
+        f'INSERT INTO {qn(TodoCounter._meta.db_table)} ({columns}) '
+        f'SELECT %s, 0, {group}, COUNT(*) FROM {table} GROUP BY {group} '
+        f'UNION ALL '
+        f'SELECT %s, {user}, {group}, COUNT(*) FROM {table} '
+        f'WHERE {user} IS NOT NULL GROUP BY {user}, {group}'
+    )
+    with transaction.atomic():
+        TodoCounter.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [TodoCounter.SCOPE_GLOBAL, TodoCounter.SCOPE_USER])
+    return TodoCounter.objects.count()
+
+
+def check_counters():
+    """Comparar los contadores guardados con los recalculados; devuelve las diferencias"""
+    stored = {
+        tuple(row[field] for field in KEY_FIELDS): row['count']
+        for row in TodoCounter.objects.exclude(count=0).values(*KEY_FIELDS, 'count')
+    }
+    expected = compute_expected_counters()
+    return [
+        (key, stored.get(key, 0), expected.get(key, 0))
+        for key in sorted(set(stored) | set(expected))
+        if stored.get(key, 0) != expected.get(key, 0)
+    ]
+
+
+def read_counter_stats(user_id=None, category_id=None, status=None, priority=None):
+    """
+    Construir las estadísticas leyendo los contadores
+
+    Lee como máximo una fila por categoría, estado y prioridad del ámbito.
+    Las tareas vencidas dependen de la hora actual, así que se cuentan con
+    una consulta sobre el índice parcial de tareas sin resolver (count_overdue).
+    """
+    rows = counter_rows(user_id, category_id, status, priority)
+    return summarize_counter_rows(rows, count_overdue(user_id, category_id, status, priority))
+
+
+async def aread_counter_stats(user_id=None, category_id=None, status=None, priority=None):
+    """read_counter_stats con el ORM asíncrono"""
+    rows = [row async for row in counter_rows(user_id, category_id, status, priority)]
+    return summarize_counter_rows(rows, await sync_to_async(count_overdue)(user_id, category_id, status, priority))
+
+
+def counter_rows(user_id, category_id, status, priority):
+    """Filas de contadores del ámbito con el nombre de su categoría"""
+    counters = TodoCounter.objects.filter(
+        scope=TodoCounter.SCOPE_USER if user_id else TodoCounter.SCOPE_GLOBAL,
+        scope_id=user_id or 0,
+    )
+    if category_id:
+        counters = counters.filter(category_key=category_id)
+    if status:
+        counters = counters.filter(status=status)
+    if priority:
+        counters = counters.filter(priority=priority)
+
+    return counters.exclude(count=0).annotate(
+        category_name=Subquery(
+            TodoCategory.objects.filter(pk=OuterRef('category_key')).values('name')[:1]
+        )
+    ).values('category_name', 'status', 'priority', 'count')
+
+
+def count_overdue(user_id=None, category_id=None, status=None, priority=None):
+    """
+    Número de tareas vencidas del ámbito
+
+    En SQLite se fuerza el índice parcial todo_unresolved_due_idx con
+    INDEXED BY (overdue_aggregate): sin ANALYZE el planificador elige el
+    índice por estado y cuenta todas las tareas sin resolver.
+    """
+    filters = {
+        name: value
+        for name, value in (('user_id', user_id), ('category_id', category_id), ('status', status), ('priority', priority))
+        if value
+    }
+    using = router.db_for_read(Todo)
+    if connections[using].vendor != 'sqlite':
+        return Todo.objects.using(using).overdue().filter(**filters).count()
+    return overdue_aggregate(using, timezone.now(), 'COUNT', **filters)
+
+
+def summarize_counter_rows(rows, overdue_count):
+    totals = empty_totals()
+    tasks_by_category = {}
+    for row in rows:
+        totals['total'] += row['count']
+        for key in (f"status_{row['status']}", f"priority_{row['priority']}"):
+            if key in totals:
+                totals[key] += row['count']
+        label = row['category_name'] or UNCATEGORIZED_LABEL
+        tasks_by_category[label] = tasks_by_category.get(label, 0) + row['count']
+    totals['overdue'] = overdue_count
+
+    return build_stats_payload(totals, tasks_by_category)
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.db.models import prefetch_related_objects
+
+from .counters import count_overdue, summarize_counter_rows
+from .filters import HIGH_PRIORITIES
+from .models import Todo, TodoCategory, TodoCounter
+
+
+DASHBOARD_PREVIEW_SIZE = 5
+DASHBOARD_MAX_PREVIEW_SIZE = 50
+
+
+def build_dashboard(preview_size=DASHBOARD_PREVIEW_SIZE):
+    """
+    Datos de la pantalla de inicio con un número fijo de consultas
+
+    Las filas de contadores globales se leen una vez y dan tanto las
+    estadísticas como el tasks_count de cada categoría. Las tareas de las
+    vistas previas (vencidas y de alta prioridad) no hacen joins: su
+    categoría y su usuario salen de las listas ya cargadas, las que están
+    en ambas vistas se comparten y los adjuntos se leen en una consulta.
+    """
+    rows = list(
+        TodoCounter.objects.filter(scope=TodoCounter.SCOPE_GLOBAL, scope_id=0).exclude(count=0)
+        .values('category_key', 'status', 'priority', 'count')
+    )
+    categories = list(TodoCategory.objects.all())
+    users = list(User.objects.all())
+
+    names = {category.pk: category.name for category in categories}
+    counts = {}
+    for row in rows:
+        row['category_name'] = names.get(row['category_key'])
+        counts[row['category_key']] = counts.get(row['category_key'], 0) + row['count']
+    for category in categories:
+        category.tasks_count = counts.get(category.pk, 0)
+    stats = summarize_counter_rows(rows, count_overdue())
+
+    overdue = list(Todo.objects.overdue()[:preview_size])
+    loaded = {todo.pk: todo for todo in overdue}
+    high_priority = [
+        loaded.setdefault(todo.pk, todo)
+        for todo in Todo.objects.filter(priority__in=HIGH_PRIORITIES)[:preview_size]
+    ]
+    categories_by_id = {category.pk: category for category in categories}
+    users_by_id = {user.pk: user for user in users}
+    for todo in loaded.values():
+        todo.category = categories_by_id.get(todo.category_id)
+        todo.user = users_by_id.get(todo.user_id)
+    prefetch_related_objects(list(loaded.values()), 'attachments')
+
+    return {
+        'stats': stats,
+        'categories': categories,
+        'users': users,
+        'overdue': overdue,
+        'high_priority': high_priority,
+    }
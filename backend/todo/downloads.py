@@ -0,0 +1,209 @@
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .blobs import blob_digest
+
+
+OFFLOAD_ACCEL = 'x-accel-redirect'
+OFFLOAD_SENDFILE = 'x-sendfile'
+DEFAULT_ACCEL_PREFIX = '/protected-media/'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class FileRange:
+    """
+    Tramo [start, start + length) de un archivo abierto
+
+    read() no pasa del final del tramo. fileno() es el del archivo, que
+    queda posicionado en `start`: los servidores WSGI que envían con
+    sendfile (gunicorn) parten de esa posición y de Content-Length. Bajo
+    ASGI no hay sendfile y el tramo se lee por bloques (aiter_file).
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+async def aiter_file(file, block_size):
+    """
+    Bloques de un archivo leídos en un hilo, para las respuestas ASGI
+
+    Django lee entero con sync_to_async(list) el iterador síncrono de un
+    FileResponse servido por ASGI; así solo hay un bloque en memoria.
+    """
+    read = sync_to_async(file.read, thread_sensitive=False)
+    while chunk := await read(block_size):
+        yield chunk
+
+
+def parse_range(header, size):
+    """
+    Tramo (inicio, fin) inclusivo pedido en la cabecera Range
+
+    Devuelve None si la cabecera no es un único rango de bytes válido (se
+    responde el archivo completo, como permite la RFC 9110) y lanza
+    RangeNotSatisfiable si el rango queda fuera del archivo.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Sufijo: los últimos N bytes
+        length = int(last)
+        if not length or not size:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def file_validators(storage, name):
+    """
+    (tamaño, ETag, Last-Modified) del archivo guardado; Http404 si no existe
+
+    Los archivos guardados por contenido usan su SHA-256 como ETag; los
+    anteriores, su nombre, tamaño y fecha.
+    """
+    try:
+        size = storage.size(name)
+        modified = int(storage.get_modified_time(name).timestamp())
+    except (OSError, NotImplementedError):
+        raise Http404('El archivo no existe.')
+    digest = blob_digest(name) or hashlib.md5(
+        f'{name}|{size}|{modified}'.encode('utf-8'), usedforsecurity=False
+    ).hexdigest()
+    return size, quote_etag(digest), modified
+
+
+def if_range_matches(request, etag, last_modified):
+    """If-Range ausente o vigente: se puede responder solo el tramo pedido"""
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def offload_response(mode, storage, name):
+    """
+    Respuesta vacía para que el servidor web envíe el archivo
+
+    X-Accel-Redirect (nginx) apunta a una location interna que sirve
+    MEDIA_ROOT bajo TODO_ATTACHMENT_ACCEL_PREFIX; X-Sendfile (Apache,
+    lighttpd) lleva la ruta absoluta. El servidor web atiende Range.
+    """
+    response = HttpResponse()
+    if mode == OFFLOAD_ACCEL:
+        prefix = getattr(settings, 'TODO_ATTACHMENT_ACCEL_PREFIX', DEFAULT_ACCEL_PREFIX)
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + name)
+    else:
+        response['X-Sendfile'] = storage.path(name)
+    return response
+
+
+def serve_attachment(request, attachment):
+    """Respuesta de descarga de un archivo adjunto (ver serve_file)"""
+    return serve_file(request, attachment.file.storage, attachment.file.name, attachment.filename)
+
+
+def serve_file(request, storage, name, filename=None):
+    """
+    Respuesta de descarga del archivo `name` de `storage`
+
+    - ETag y Last-Modified del archivo; If-None-Match / If-Modified-Since
+      vigentes responden 304 sin abrir el archivo.
+    - Range de un solo tramo (con If-Range) responde 206; fuera del archivo, 416.
+    - Con TODO_ATTACHMENT_OFFLOAD ('x-accel-redirect' o 'x-sendfile') el
+      contenido lo envía el servidor web y no pasa por el proceso de Python.
+    - Si no, FileResponse. Solo los servidores WSGI con wsgi.file_wrapper
+      (gunicorn) lo envían con sendfile; bajo ASGI se lee por bloques en un
+      hilo (aiter_file) y conviene el envío por el servidor web.
+    """
+    if not name:
+        raise Http404('El archivo no existe.')
+    size, etag, last_modified = file_validators(storage, name)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        filename = filename or name.rsplit('/', 1)[-1]
+        response = build_file_response(request, storage, name, filename, size, etag, last_modified)
+    if response.status_code in (200, 206, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def build_file_response(request, storage, name, filename, size, etag, last_modified):
+    """Respuesta 200, 206 o 416 (o delegada en el servidor web) para una descarga no condicional"""
+    mode = getattr(settings, 'TODO_ATTACHMENT_OFFLOAD', None)
+    if mode == OFFLOAD_SENDFILE:
+        try:
+            storage.path(name)
+        except NotImplementedError:
+            mode = None
+    if mode in (OFFLOAD_ACCEL, OFFLOAD_SENDFILE):
+        response = offload_response(mode, storage, name)
+        content_type, _ = mimetypes.guess_type(filename)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    requested = None
+    header = request.META.get('HTTP_RANGE')
+    if header and if_range_matches(request, etag, last_modified):
+        try:
+            requested = parse_range(header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = storage.open(name, 'rb')
+    if requested is None:
+        body = file
+        response = FileResponse(body, as_attachment=True, filename=filename)
+    else:
+        start, end = requested
+        body = FileRange(file, start, end - start + 1)
+        response = FileResponse(body, as_attachment=True, filename=filename, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        # Las cabeceras ya están puestas y el archivo sigue registrado para cerrarse
+        response.streaming_content = aiter_file(body, response.block_size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
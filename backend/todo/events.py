@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TodoEvent
+from .replicas import read_from_primary
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'todo.events.LocalEventBackend'
+DEFAULT_QUEUE_SIZE = 100
+# Comentario SSE periódico para que proxies y clientes no cierren la conexión
+KEEPALIVE_SECONDS = 15
+# Espera sugerida al cliente antes de reconectar (campo retry: de SSE)
+RETRY_MILLISECONDS = 3000
+
+
+class Subscriber:
+    """
+    Una conexión del stream: filtros y cola acotada en su event loop
+
+    Si la cola se llena (cliente lento), se marca como desbordada y la
+    conexión se cierra en lugar de acumular eventos en memoria; el cliente
+    reconecta y se pone al día con el feed de cambios.
+    """
+
+    def __init__(self, loop, filters, maxsize):
+        self.loop = loop
+        self.filters = filters
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def matches(self, event):
+        """Los filtros solo descartan eventos que tienen ese campo (antes o después del cambio)"""
+        previous = event.get('from', {})
+        return all(
+            key not in event or event[key] == value or previous.get(key) == value
+            for key, value in self.filters.items()
+        )
+
+    def deliver(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broadcaster:
+    """Reparte los eventos de este proceso entre las conexiones suscritas"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def subscribe(self, filters=None, maxsize=None, loop=None):
+        subscriber = Subscriber(
+            loop or asyncio.get_running_loop(), filters or {},
+            maxsize or getattr(settings, 'TODO_EVENTS_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+        )
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def dispatch(self, event):
+        """Encolar el evento en cada conexión que coincide (seguro desde cualquier hilo)"""
+        event = {'seq': next(self.ids), **event}
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            if not subscriber.matches(event):
+                continue
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # El event loop de la conexión ya se cerró
+                self.unsubscribe(subscriber)
+
+
+class LocalEventBackend:
+    """Difunde los eventos solo dentro del proceso que los produce"""
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+
+    def publish(self, event):
+        self.broadcaster.dispatch(event)
+
+    def start(self):
+        pass
+
+
+class DatabaseEventBackend:
+    """
+    Difunde los eventos a través de la tabla TodoEvent
+
+    Sirve cuando escriben unos procesos (p. ej. WSGI) y otros mantienen
+    las conexiones SSE: cada proceso con suscriptores lee los eventos
+    nuevos en un hilo y purga los que superan la retención.
+    """
+    poll_interval = 0.5
+    retention = timedelta(minutes=5)
+    prune_every = 120
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self.last_id = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def publish(self, event):
+        TodoEvent.objects.create(payload=json.dumps(event))
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='todo-events', daemon=True)
+                self.thread.start()
+
+    def poll(self):
+        """
+        Difundir los eventos nuevos; devuelve cuántos se leyeron
+
+        Se lee del primario: en una réplica con retraso last_id podría pasar
+        por encima de eventos que aún no se han copiado y que se perderían.
+        """
+        with read_from_primary():
+            if self.last_id is None:
+                self.last_id = TodoEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+                return 0
+            rows = list(TodoEvent.objects.filter(id__gt=self.last_id).order_by('id').values_list('id', 'payload')[:500])
+        for pk, payload in rows:
+            self.broadcaster.dispatch(json.loads(payload))
+            self.last_id = pk
+        return len(rows)
+
+    def prune(self):
+        TodoEvent.objects.filter(created_at__lt=timezone.now() - self.retention).delete()
+
+    def run(self):
+        for iteration in itertools.count(1):
+            try:
+                while self.poll():
+                    pass
+                if iteration % self.prune_every == 0:
+                    self.prune()
+            except DatabaseError:
+                logger.exception('Error leyendo los eventos de tareas')
+                close_old_connections()
+            time.sleep(self.poll_interval)
+
+
+broadcaster = Broadcaster()
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        backend_class = import_string(getattr(settings, 'TODO_EVENTS_BACKEND', DEFAULT_BACKEND))
+        _backend = backend_class(broadcaster)
+    return _backend
+
+
+def publish_event(event):
+    """Publicar un evento cuando se confirme la transacción en curso"""
+    transaction.on_commit(lambda: get_backend().publish(event))
+
+
+def todo_event(action, todo, previous=None):
+    """
+    Evento de una tarea; `previous` es el estado (user_id, category_id, status, priority) anterior
+
+    Un cambio de estado se publica como todo.status; los valores anteriores
+    que cambiaron van en "from" para que los filtros también los vean.
+    """
+    event = {
+        'type': f'todo.{action}', 'id': todo.pk,
+        'user': todo.user_id, 'category': todo.category_id, 'status': todo.status,
+    }
+    if previous is not None:
+        changed = {
+            key: old for key, old, new in zip(
+                ('user', 'category', 'status'), previous, (todo.user_id, todo.category_id, todo.status)
+            ) if old != new
+        }
+        if changed:
+            event['from'] = changed
+        if 'status' in changed:
+            event['type'] = 'todo.status'
+    return event
+
+
+def category_event(action, category):
+    return {'type': f'category.{action}', 'id': category.pk, 'category': category.pk, 'name': category.name}
+
+
+def attachment_event(action, attachment, user_id=None, category_id=None):
+    return {
+        'type': f'attachment.{action}', 'id': attachment.pk, 'todo': attachment.todo_id,
+        'user': user_id, 'category': category_id,
+    }
+
+
+def format_event(event):
+    """Serializar un evento en formato SSE"""
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_events(filters, keepalive=KEEPALIVE_SECONDS):
+    """Generar el stream SSE de una conexión hasta que se cierre o se desborde su cola"""
+    get_backend().start()
+    subscriber = broadcaster.subscribe(filters)
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        while not subscriber.overflowed:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield format_event(event)
+        yield 'event: overflow\ndata: {}\n\n'
+    finally:
+        broadcaster.unsubscribe(subscriber)
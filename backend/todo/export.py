@@ -0,0 +1,58 @@
+from asgiref.sync import sync_to_async
+from rest_framework import serializers
+
+
+EXPORT_FIELDS = [
+    'id', 'title', 'description', 'priority', 'status', 'created_at', 'updated_at',
+    'due_date', 'completed_at', 'user', 'category',
+]
+DATETIME_FIELDS = ['created_at', 'updated_at', 'due_date', 'completed_at']
+EXPORT_CHUNK_SIZE = 2000
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Recorrer las tareas como diccionarios planos para exportar
+
+    Lee el queryset por bloques con iterator(), sin instanciar modelos ni
+    cargar relaciones, de modo que la memoria no crece con el número de filas.
+    Las fechas se formatean igual que en TodoSerializer.
+    """
+    datetime_field = serializers.DateTimeField()
+    rows = (
+        queryset.select_related(None).prefetch_related(None)
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        for field in DATETIME_FIELDS:
+            if row[field] is not None:
+                row[field] = datetime_field.to_representation(row[field])
+        yield row
+
+
+def stream_export(renderer, rows, batch_size=500):
+    """Generar el cuerpo de la exportación agrupando las líneas en bloques"""
+    batch = []
+    for line in renderer.stream(rows):
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+async def astream_export(renderer, rows, batch_size=500):
+    """
+    stream_export para peticiones ASGI
+
+    Bajo ASGI Django consume con sync_to_async(list) los iteradores
+    síncronos de StreamingHttpResponse y carga la exportación entera en
+    memoria. Aquí cada bloque se genera con sync_to_async en el hilo de la
+    petición (thread_sensitive), que es el dueño del cursor de iterator().
+    """
+    chunks = stream_export(renderer, rows, batch_size)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
@@ -0,0 +1,44 @@
+from .search import search_todos
+
+
+HIGH_PRIORITIES = ['high', 'urgent']
+
+
+def filter_todos(queryset, params):
+    """
+    Filtros del listado de tareas (?status=, ?priority=, ?category=, ?user=, ?search=, ?overdue=)
+
+    `params` es un QueryDict o un diccionario: los trabajos en segundo
+    plano (todo.tasks) guardan los parámetros de la petición y filtran igual.
+    """
+    # Filtro por estado
+    status_filter = params.get('status', None)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    
+    # Filtro por prioridad
+    priority_filter = params.get('priority', None)
+    if priority_filter:
+        queryset = queryset.filter(priority=priority_filter)
+    
+    # Filtro por categoría
+    category_filter = params.get('category', None)
+    if category_filter:
+        queryset = queryset.filter(category_id=category_filter)
+    
+    # Filtro por usuario
+    user_filter = params.get('user', None)
+    if user_filter:
+        queryset = queryset.filter(user_id=user_filter)
+    
+    # Búsqueda por texto
+    search = params.get('search', None)
+    if search:
+        queryset = search_todos(queryset, search)
+    
+    # Filtro por vencidas
+    overdue_filter = params.get('overdue', None)
+    if overdue_filter is not None and overdue_filter.lower() in ['true', '1', 'yes']:
+        queryset = queryset.overdue()
+    
+    return queryset
@@ -0,0 +1,27 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataGeneration
+
+
+def bump_generation(*keys):
+    """Incrementar la generación de los conjuntos dados (dentro de la transacción de la escritura)"""
+    now = timezone.now()
+    for key in keys:
+        if DataGeneration.objects.filter(key=key).update(value=F('value') + 1, changed_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                DataGeneration.objects.create(key=key, value=1, changed_at=now)
+        except IntegrityError:
+            # Otra petición creó la fila entre el update y el create
+            DataGeneration.objects.filter(key=key).update(value=F('value') + 1, changed_at=now)
+
+
+def read_generations(*keys):
+    """Leer en una consulta {clave: (generación, último cambio)}; las claves sin fila valen (0, None)"""
+    rows = DataGeneration.objects.filter(key__in=keys).values_list('key', 'value', 'changed_at')
+    generations = {key: (0, None) for key in keys}
+    generations.update({key: (value, changed_at) for key, value, changed_at in rows})
+    return generations
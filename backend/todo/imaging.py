@@ -0,0 +1,77 @@
+# Se ejecuta en los procesos del pool de miniaturas (todo.thumbnails): no
+# debe importar modelos, que necesitarían configurar Django en cada proceso
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow es opcional
+    Image = None
+
+from .storage import TEMP_PREFIX
+
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+SAVE_OPTIONS = {
+    'webp': {'quality': 80, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def flatten(image):
+    """Imagen RGB sobre fondo blanco (JPEG no admite transparencia)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def save_atomically(image, path, image_format):
+    """Escribir a un temporal y renombrar: nunca queda una miniatura a medias"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            image.save(temp, PIL_FORMATS[image_format], **SAVE_OPTIONS[image_format])
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def render_thumbnails(source, targets):
+    """
+    Generar las miniaturas de la imagen `source` que aún no existen
+
+    `targets` es una lista de (ruta, lado máximo, formato). Se decodifica la
+    imagen una vez (con draft() los JPEG se decodifican ya reducidos), se
+    aplica la orientación EXIF y se reduce de mayor a menor tamaño. Devuelve
+    las rutas generadas o ya existentes; lista vacía si no es una imagen.
+    """
+    if Image is None:
+        return []
+    pending = [target for target in targets if not os.path.exists(target[0])]
+    done = [target[0] for target in targets if os.path.exists(target[0])]
+    if not pending:
+        return done
+
+    try:
+        with Image.open(source) as original:
+            largest = max(size for _, size, _ in pending)
+            original.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return []
+
+    for path, size, image_format in sorted(pending, key=lambda target: -target[1]):
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if image_format == 'jpeg' or thumbnail.mode not in ('RGB', 'RGBA'):
+            thumbnail = flatten(thumbnail) if image_format == 'jpeg' else thumbnail.convert('RGBA')
+        save_atomically(thumbnail, path, image_format)
+        done.append(path)
+    return done
@@ -0,0 +1,217 @@
+import logging
+import multiprocessing
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import TodoJob
+from .worker import execute_in_process, setup_process
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VISIBILITY_TIMEOUT = 300
+DEFAULT_RETRY_BACKOFF = 5
+DEFAULT_RETENTION = timedelta(days=7)
+PRUNE_INTERVAL = 3600
+
+TASKS = {}
+
+
+class PermanentJobError(Exception):
+    """Error que no se arregla reintentando (datos no válidos): el trabajo falla sin más intentos"""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def task(name):
+    """Registrar una función como tarea de la cola; recibe el TodoJob y devuelve un resultado JSON"""
+    def decorator(function):
+        TASKS[name] = function
+        return function
+    return decorator
+
+
+def enqueue(task_name, payload=None, priority=0, max_attempts=3, delay=None):
+    """Encolar un trabajo; los de mayor `priority` se reclaman antes"""
+    if task_name not in TASKS:
+        raise ValueError(f'Tarea desconocida: {task_name}')
+    run_at = timezone.now() + timedelta(seconds=delay) if delay else timezone.now()
+    return TodoJob.objects.create(
+        task=task_name, payload=payload or {}, priority=priority, max_attempts=max_attempts, run_at=run_at
+    )
+
+
+def claimable(now):
+    """En cola y con run_at cumplido, o reservados por un worker cuya reserva venció"""
+    return Q(status=TodoJob.QUEUED, run_at__lte=now) | Q(status=TodoJob.RUNNING, locked_until__lt=now)
+
+
+def claim_jobs(limit, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """
+    Reservar hasta `limit` trabajos para este worker; devuelve [(id, token)]
+
+    El UPDATE vuelve a comprobar que los trabajos siguen libres, así que
+    dos workers que eligen los mismos candidatos no los ejecutan ambos:
+    cada uno se queda solo con las filas que llevan su token.
+    """
+    now = timezone.now()
+    candidates = list(
+        TodoJob.objects.filter(claimable(now)).order_by('-priority', 'run_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not candidates:
+        return []
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        TodoJob.objects.filter(claimable(now), pk__in=candidates).update(
+            status=TodoJob.RUNNING, locked_by=token, attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout), started_at=now,
+        )
+    claimed = set(TodoJob.objects.filter(pk__in=candidates, locked_by=token).values_list('id', flat=True))
+    return [(job_id, token) for job_id in candidates if job_id in claimed]
+
+
+def extend_leases(jobs, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Renovar la reserva de los trabajos en curso para que no los reclame otro worker"""
+    for job_id, token in jobs:
+        TodoJob.objects.filter(pk=job_id, locked_by=token, status=TodoJob.RUNNING).update(
+            locked_until=timezone.now() + timedelta(seconds=visibility_timeout)
+        )
+
+
+def finish_job(job, token, **fields):
+    """Guardar el resultado solo si el trabajo sigue reservado con `token`"""
+    fields.setdefault('locked_by', '')
+    fields.setdefault('locked_until', None)
+    return TodoJob.objects.filter(pk=job.pk, locked_by=token).update(**fields)
+
+
+def execute_job(job_id, token):
+    """
+    Ejecutar un trabajo reservado y guardar el resultado
+
+    Si falla y le quedan intentos, vuelve a la cola con espera exponencial
+    (TODO_JOB_RETRY_BACKOFF segundos, luego el doble...); si no, o si el
+    error es PermanentJobError, queda como fallido con el error.
+    """
+    job = TodoJob.objects.filter(pk=job_id, locked_by=token).first()
+    if job is None:
+        return None  # Otro worker lo reclamó al vencer la reserva
+    now = timezone.now()
+    if job.attempts > job.max_attempts:
+        finish_job(job, token, status=TodoJob.FAILED, finished_at=now,
+                   error='Se agotaron los intentos: la reserva venció sin terminar el trabajo.')
+        return TodoJob.FAILED
+    handler = TASKS.get(job.task)
+    if handler is None:
+        finish_job(job, token, status=TodoJob.FAILED, finished_at=now, error=f'Tarea desconocida: {job.task}')
+        return TodoJob.FAILED
+
+    try:
+        result = handler(job)
+    except PermanentJobError as error:
+        finish_job(job, token, status=TodoJob.FAILED, finished_at=timezone.now(), error=str(error), result=error.result)
+        return TodoJob.FAILED
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Falló el trabajo %s (%s), intento %s de %s', job.pk, job.task, job.attempts, job.max_attempts)
+        if job.attempts >= job.max_attempts:
+            finish_job(job, token, status=TodoJob.FAILED, finished_at=timezone.now(), error=error)
+            return TodoJob.FAILED
+        backoff = getattr(settings, 'TODO_JOB_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF) * 2 ** (job.attempts - 1)
+        finish_job(job, token, status=TodoJob.QUEUED, error=error,
+                   run_at=timezone.now() + timedelta(seconds=backoff))
+        return TodoJob.QUEUED
+    finish_job(job, token, status=TodoJob.SUCCEEDED, finished_at=timezone.now(), result=result, error='')
+    return TodoJob.SUCCEEDED
+
+
+def prune_jobs(retention=DEFAULT_RETENTION):
+    """Borrar los trabajos terminados hace más de `retention` (y los archivos que generaron)"""
+    old = TodoJob.objects.filter(
+        status__in=[TodoJob.SUCCEEDED, TodoJob.FAILED], finished_at__lt=timezone.now() - retention
+    )
+    for result in old.exclude(result=None).values_list('result', flat=True).iterator():
+        if isinstance(result, dict) and result.get('file'):
+            default_storage.delete(result['file'])
+    return old.delete()[0]
+
+
+def run_in_thread(job_id, token):
+    try:
+        return execute_job(job_id, token)
+    finally:
+        connections.close_all()
+
+
+class Worker:
+    """
+    Bucle de un worker: reclama trabajos mientras haya hueco y los ejecuta en un pool
+
+    Con pool='process' cada trabajo se ejecuta en un proceso aparte
+    (todo.worker), útil para tareas que usan mucha CPU; con 'thread', en
+    hilos de este proceso.
+    """
+
+    def __init__(self, concurrency=4, pool='thread', poll_interval=1.0,
+                 visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT, retention=DEFAULT_RETENTION):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.retention = retention
+        self.stopping = threading.Event()
+        self.processed = 0
+
+    def stop(self, *args):
+        """Dejar de reclamar trabajos; los que están en curso terminan"""
+        self.stopping.set()
+
+    def executor(self):
+        if self.pool == 'process':
+            context = multiprocessing.get_context('spawn')
+            return ProcessPoolExecutor(self.concurrency, mp_context=context, initializer=setup_process)
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='todo-worker')
+
+    def run(self, once=False):
+        """Procesar trabajos hasta stop(); con `once`, hasta que la cola quede vacía"""
+        target = execute_in_process if self.pool == 'process' else run_in_thread
+        in_flight = {}
+        last_prune = last_lease = time.monotonic()
+        prune_jobs(self.retention)
+        with self.executor() as executor:
+            while not self.stopping.is_set() or in_flight:
+                if not self.stopping.is_set() and len(in_flight) < self.concurrency:
+                    for job in claim_jobs(self.concurrency - len(in_flight), self.visibility_timeout):
+                        in_flight[executor.submit(target, *job)] = job
+                if not in_flight:
+                    if once:
+                        break
+                    if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                        prune_jobs(self.retention)
+                        last_prune = time.monotonic()
+                    self.stopping.wait(self.poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id, _ = in_flight.pop(future)
+                    self.processed += 1
+                    if future.exception() is not None:
+                        logger.error('Error del worker con el trabajo %s', job_id, exc_info=future.exception())
+                if in_flight and time.monotonic() - last_lease > self.visibility_timeout / 3:
+                    extend_leases(in_flight.values(), self.visibility_timeout)
+                    last_lease = time.monotonic()
+        return self.processed
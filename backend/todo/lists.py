@@ -0,0 +1,65 @@
+from rest_framework.exceptions import ValidationError
+
+from .models import UNRESOLVED_STATUSES
+
+
+# Listas compactas de tareas: estados incluidos y columnas devueltas
+COMPACT_LISTS = {
+    'pending-ids': (['pending'], ['id']),
+    'pending-titles': (['pending'], ['id', 'title']),
+    'pending-unresolved': (UNRESOLVED_STATUSES, ['id', 'title']),
+    'pending-resolved': (['completed'], ['id', 'title']),
+    'pending-users': (['pending'], ['id', 'user']),
+    'resolved-users': (['completed'], ['id', 'user']),
+    'unresolved-users': (UNRESOLVED_STATUSES, ['id', 'user']),
+}
+LAYOUTS = ('rows', 'columns')
+
+
+def parse_layout(query_params):
+    """Formato pedido con ?layout= (rows por defecto)"""
+    layout = query_params.get('layout') or 'rows'
+    if layout not in LAYOUTS:
+        raise ValidationError({'layout': [f"Formato desconocido: {layout} (use {' o '.join(LAYOUTS)})"]})
+    return layout
+
+
+class CompactTodoList:
+    """
+    Lista compacta de tareas (pending-*/resolved-*) leída con values_list()
+
+    Aplica el filtro de estado de la lista sobre el queryset ya filtrado
+    por la vista y devuelve filas (`[{"id": 1, "user": 2}, ...]`, o solo
+    los IDs si es la única columna) o columnas (`{"id": [...], "user": [...]}`),
+    que ocupan menos y se decodifican más rápido.
+    """
+
+    def __init__(self, name, layout='rows'):
+        self.statuses, self.columns = COMPACT_LISTS[name]
+        self.layout = layout
+
+    def apply(self, queryset):
+        """Restringir el queryset a los estados de la lista, sin relaciones"""
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if len(self.statuses) == 1:
+            return queryset.filter(status=self.statuses[0])
+        return queryset.filter(status__in=self.statuses)
+
+    def values(self, queryset):
+        """Filas como tuplas en el orden de las columnas"""
+        return queryset.values_list(*self.columns)
+
+    def page_values(self, queryset):
+        """Filas como diccionarios con created_at, que necesita el cursor de paginación"""
+        return queryset.values(*self.columns, 'created_at')
+
+    def page_rows(self, page):
+        return [tuple(row[column] for column in self.columns) for row in page]
+
+    def to_representation(self, rows):
+        if self.layout == 'columns':
+            values = list(zip(*rows)) or [() for _ in self.columns]
+            return {column: list(column_values) for column, column_values in zip(self.columns, values)}
+        if len(self.columns) == 1:
+            return [row[0] for row in rows]
+        return [dict(zip(self.columns, row)) for row in rows]
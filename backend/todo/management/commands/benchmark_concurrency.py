@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from todo.benchmarks import CONCURRENCY_STACKS, run_concurrency_benchmark, seeded_database
+
+
+class Command(BaseCommand):
+    help = 'Comparar el rendimiento de las lecturas de la API con WSGI y con ASGI (vistas asíncronas) bajo concurrencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=10000, help='Número de tareas sintéticas')
+        parser.add_argument(
+            '--clients', type=int, nargs='+', default=[100, 250, 500, 1000],
+            help='Clientes concurrentes de cada medición'
+        )
+        parser.add_argument('--requests', type=int, default=1000, help='Peticiones por medición')
+        parser.add_argument('--threads', type=int, default=32, help='Hilos del servidor WSGI simulado')
+        parser.add_argument(
+            '--stack', action='append', choices=CONCURRENCY_STACKS,
+            help='Pila a medir (se puede repetir; por defecto todas)'
+        )
+
+    def handle(self, *args, **options):
+        with seeded_database(options['todos'], stdout=self.stdout if options['verbosity'] > 1 else None):
+            results = run_concurrency_benchmark(
+                options['clients'], requests=options['requests'], threads=options['threads'],
+                stacks=options['stack'] or CONCURRENCY_STACKS,
+            )
+
+        for (stack, clients), result in results.items():
+            errors = f"  {result['errors']} errores" if result['errors'] else ''
+            self.stdout.write(
+                f"{stack:<10} {clients:>5} clientes  {result['requests_per_second']:>8.1f} pet/s  "
+                f"p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms{errors}"
+            )
+        if any(result['errors'] for result in results.values()):
+            raise CommandError('Algunas peticiones respondieron con error')
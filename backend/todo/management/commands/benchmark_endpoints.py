@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from todo.benchmarks import (
+    ENDPOINTS, compare_with_baseline, load_baseline, run_benchmarks, save_baseline, seeded_database
+)
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmark_baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'Medir los endpoints de la API sobre datos sintéticos y compararlos con la línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000],
+            help='Número de tareas a sembrar en cada corrida (p. ej. 10000 100000 1000000)',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por endpoint')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Medir solo este endpoint')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Archivo de línea base')
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Guardar los resultados como nueva línea base en lugar de compararlos',
+        )
+
+    def handle(self, *args, **options):
+        names = set(options['endpoints'] or [])
+        unknown = names - {name for name, *_ in ENDPOINTS}
+        if unknown:
+            raise CommandError(f"Endpoints desconocidos: {', '.join(sorted(unknown))}")
+
+        baseline = load_baseline(options['baseline'])
+        regressions = []
+        for size in options['sizes']:
+            results = self.run_size(size, options['repeat'], names, options['verbosity'])
+            key = str(size)
+            if options['update_baseline']:
+                baseline.setdefault(key, {}).update(results)
+                continue
+            regressions += [f'[{size}] {message}' for message in compare_with_baseline(results, baseline.get(key, {}))]
+
+        if options['update_baseline']:
+            save_baseline(options['baseline'], baseline)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {options['baseline']}"))
+            return
+        for message in regressions:
+            self.stdout.write(self.style.ERROR(message))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regresiones respecto a la línea base')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base'))
+
+    def run_size(self, size, repeat, names, verbosity):
+        """Sembrar una base de datos de prueba con `size` tareas y medir los endpoints"""
+        self.stdout.write(f'== {size} tareas ==')
+        with seeded_database(size, stdout=self.stdout if verbosity > 1 else None):
+            results = run_benchmarks(repeat=repeat, names=names, size=size)
+
+        for name, result in results.items():
+            if 'skipped' in result:
+                self.stdout.write(f"{name:<32} omitido ({result['skipped']})")
+                continue
+            self.stdout.write(
+                f"{name:<32} {result['time_ms']:>9.2f} ms  {result['queries']:>3} consultas  "
+                f"{result['full_scans']} recorridos  {result['vm_steps']}k pasos"
+            )
+        return results
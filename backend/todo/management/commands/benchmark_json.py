@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from todo.benchmarks import JSON_CODECS, json_payloads, run_json_benchmark, seeded_database
+
+
+class Command(BaseCommand):
+    help = 'Comparar el renderer/parser JSON rápido con los de DRF sobre datos sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=10000, help='Número de tareas a codificar')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por medición')
+
+    def handle(self, *args, **options):
+        with seeded_database(options['todos'], stdout=self.stdout if options['verbosity'] > 1 else None):
+            payloads = json_payloads(options['todos'])
+            results = run_json_benchmark(payloads, repeat=options['repeat'])
+
+        reference = JSON_CODECS[0][0]
+        for (payload_name, codec_name), result in results.items():
+            base = results[(payload_name, reference)]
+            speedup = base['render_ms'] / result['render_ms'] if result['render_ms'] else 0
+            self.stdout.write(
+                f"{payload_name:<18} {codec_name:<6} render {result['render_ms']:>9.2f} ms ({speedup:.1f}x)  "
+                f"parse {result['parse_ms']:>9.2f} ms  {result['bytes']:>10} bytes"
+                f"{'' if result['identical'] else '  SALIDA DISTINTA'}"
+            )
+        if not all(result['identical'] for result in results.values()):
+            raise CommandError('Algún renderer no produce los mismos bytes que JSONRenderer')
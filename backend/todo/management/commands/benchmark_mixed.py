@@ -0,0 +1,37 @@
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from todo.benchmarks import MIXED_WRITE_RATIO, mixed_operations, run_mixed_benchmark, seeded_database
+
+
+class Command(BaseCommand):
+    help = 'Comparar lecturas y escrituras concurrentes con la conexión SQLite por defecto y con el perfil de producción'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=10000, help='Número de tareas sintéticas')
+        parser.add_argument('--requests', type=int, default=2000, help='Peticiones por perfil')
+        parser.add_argument('--threads', type=int, default=16, help='Hilos del servidor WSGI simulado')
+        parser.add_argument(
+            '--write-ratio', type=float, default=MIXED_WRITE_RATIO, help='Proporción de escrituras (0 a 1)'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('benchmark_mixed compara perfiles de SQLite')
+
+        # WAL no aplica a las bases en memoria: la base de prueba va a un archivo
+        with tempfile.TemporaryDirectory() as directory, seeded_database(
+            options['todos'], stdout=self.stdout if options['verbosity'] > 1 else None,
+            path=Path(directory) / 'benchmark.sqlite3',
+        ):
+            operations = mixed_operations(options['requests'], options['write_ratio'])
+            results = run_mixed_benchmark(operations, threads=options['threads'])
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<11} {result['requests_per_second']:>8.1f} pet/s  "
+                f"p95 lectura {result['read_p95_ms'] or 0:>9.2f} ms  escritura {result['write_p95_ms'] or 0:>9.2f} ms  "
+                f"{result['errors']} errores ({result['locked']} database is locked)"
+            )
@@ -1,13 +1,128 @@
-from django.core.management.base import BaseCommand
-from todo.models import TodoCategory, Todo
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from todo.blobs import add_reference, blob_storage
+from todo.counters import add_state, upsert_deltas
+from todo.generations import bump_generation
+from todo.models import DataGeneration, TodoCategory, Todo, TodoAttachment
+from todo.search import rebuild_search_index
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+
+STATUS_WEIGHTS = {'pending': 35, 'in_progress': 15, 'completed': 40, 'cancelled': 10}
+PRIORITY_WEIGHTS = {'low': 25, 'medium': 40, 'high': 25, 'urgent': 10}
+CATEGORY_NAMES = ['Trabajo', 'Personal', 'Hogar', 'Compras', 'Estudios', 'Salud', 'Finanzas', 'Viajes']
+CATEGORY_COLORS = ['#007bff', '#28a745', '#ffc107', '#17a2b8', '#6f42c1', '#dc3545', '#fd7e14', '#20c997']
+CATEGORY_ICONS = ['work', 'person', 'home', 'shopping_cart', 'school', 'favorite', 'payments', 'flight']
+TITLE_VERBS = ['Revisar', 'Preparar', 'Enviar', 'Llamar a', 'Comprar', 'Organizar', 'Actualizar', 'Agendar']
+TITLE_OBJECTS = ['informe', 'presupuesto', 'cliente', 'proveedor', 'reunión', 'factura', 'documentación', 'equipo']
+DESCRIPTIONS = [
+    'Pendiente de confirmar con el equipo',
+    'Revisar antes del cierre de mes',
+    'Incluir los comentarios de la última reunión',
+    'Prioridad acordada con el cliente',
+    '',
+]
+# Proporción de tareas con fecha límite y, de ellas, las que ya vencieron
+DUE_DATE_SHARE = 0.7
+PAST_DUE_SHARE = 0.25
+# Rangos (en segundos) de antigüedad, vencimiento y tiempo hasta completar
+CREATED_SPAN = 365 * 24 * 3600
+PAST_DUE_SPAN = 60 * 24 * 3600
+FUTURE_DUE_SPAN = 90 * 24 * 3600
+COMPLETION_SPAN = 30 * 24 * 3600
+BATCH_SIZE = 10000
+SEARCH_INSERT_TRIGGER = 'todo_todo_fts_insert'
+
+
+def datetime_column():
+    """
+    Marcador y adaptador para insertar fechas UTC dadas en segundos enteros
+    desde la época
+
+    En SQLite datetime(..., 'unixepoch') produce el mismo texto que
+    adapt_datetimefield_value para segundos enteros, sin crear un datetime
+    por valor en Python.
+    """
+    if connection.vendor == 'sqlite':
+        return "datetime(%s, 'unixepoch')", lambda value: value
+    adapt = connection.ops.adapt_datetimefield_value
+    return '%s', lambda value: None if value is None else adapt(datetime.fromtimestamp(value, dt_timezone.utc))
+
+
+@contextmanager
+def deferred_indexes():
+    """
+    Suspender los índices secundarios de la tabla de tareas y el trigger de
+    inserción del índice de búsqueda durante una carga masiva
+
+    Mantenerlos fila a fila multiplica varias veces el tiempo de inserción;
+    recrearlos al final ordena cada índice una sola vez. Se guarda el SQL
+    con que SQLite creó cada índice y el trigger, y se ejecuta tal cual al
+    terminar (también si la carga falla). Los índices automáticos de las
+    restricciones UNIQUE no tienen SQL y no se tocan.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+            [Todo._meta.db_table],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = %s",
+            [SEARCH_INSERT_TRIGGER],
+        )
+        row = cursor.fetchone()
+        search_trigger = row[0] if row else None
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+        if search_trigger:
+            cursor.execute(f'DROP TRIGGER {SEARCH_INSERT_TRIGGER}')
+
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+            if search_trigger:
+                cursor.execute(search_trigger)
+    if search_trigger:
+        rebuild_search_index(connection.alias)
+
 
 class Command(BaseCommand):
     help = 'Crear datos de ejemplo para el sistema ToDo'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, help='Número de tareas sintéticas a generar')
+        parser.add_argument('--users', type=int, default=0, help='Número de usuarios a generar')
+        parser.add_argument('--categories', type=int, default=0, help='Número de categorías a generar')
+        parser.add_argument('--attachments', type=int, default=0, help='Número de archivos adjuntos a generar')
+        parser.add_argument('--seed', type=int, default=0, help='Semilla para obtener datos reproducibles')
+
     def handle(self, *args, **options):
+        scaled = ('todos', 'users', 'categories', 'attachments')
+        if any(options[name] for name in scaled):
+            for name in scaled:
+                if (options[name] or 0) < 0:
+                    raise CommandError(f'--{name} no puede ser negativo')
+            self.generate_synthetic_data(options)
+            return
+        self.create_demo_data()
+
+    def create_demo_data(self):
+        """Crear el conjunto pequeño de datos de demostración"""
         # Crear categorías
         categories_data = [
             {'name': 'Trabajo', 'description': 'Tareas relacionadas con el trabajo', 'color': '#007bff', 'icon': 'work'},
@@ -122,3 +237,155 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS('Datos de ejemplo creados exitosamente!')
         )
+
+    def generate_synthetic_data(self, options):
+        """Generar datos a escala en una sola transacción"""
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+
+        with transaction.atomic():
+            user_ids = self.generate_users(options['users'], options['seed'])
+            category_ids = self.generate_categories(options['categories'], options['seed'])
+            todo_ids = self.generate_todos(options['todos'] or 0, user_ids, category_ids, rng)
+            self.generate_attachments(options['attachments'], todo_ids, rng)
+            # Las cargas masivas no disparan señales
+            bump_generation(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Datos sintéticos generados en {time.monotonic() - started:.1f}s')
+        )
+
+    def generate_users(self, count, seed):
+        if not count:
+            return list(User.objects.values_list('id', flat=True))
+        prefix = f'sample{seed}_'
+        User.objects.bulk_create(
+            [User(username=f'{prefix}{i:06d}', first_name=f'Usuario {i}', password='!') for i in range(count)],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        self.stdout.write(f'Usuarios: {count}')
+        return list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+
+    def generate_categories(self, count, seed):
+        if not count:
+            return list(TodoCategory.objects.values_list('id', flat=True))
+        names = [
+            f'{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} {seed}-{i}' for i in range(count)
+        ]
+        TodoCategory.objects.bulk_create(
+            [
+                TodoCategory(
+                    name=name,
+                    color=CATEGORY_COLORS[i % len(CATEGORY_COLORS)],
+                    icon=CATEGORY_ICONS[i % len(CATEGORY_ICONS)],
+                )
+                for i, name in enumerate(names)
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        self.stdout.write(f'Categorías: {count}')
+        return list(TodoCategory.objects.filter(name__in=names).values_list('id', flat=True))
+
+    def generate_todos(self, count, user_ids, category_ids, rng):
+        """
+        Generar tareas con distribuciones de estado, prioridad y vencimiento realistas
+
+        Se insertan por lotes con executemany: compilar cada fila con
+        bulk_create cuesta ~100µs y limita la carga a unas 8k filas/s. Las
+        fechas se calculan como segundos enteros y las convierte la base de
+        datos. Los índices secundarios y el trigger de búsqueda se suspenden
+        durante la carga, y los contadores se suman al final a partir de los
+        grupos contados al generar, sin volver a recorrer la tabla.
+        """
+        if not count:
+            return []
+        statuses = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=count)
+        priorities = rng.choices(list(PRIORITY_WEIGHTS), weights=list(PRIORITY_WEIGHTS.values()), k=count)
+        now = int(timezone.now().timestamp())
+        user_choices = user_ids + [None]
+        category_choices = category_ids + [None]
+        placeholder, adapt = datetime_column()
+        random_ = rng.random
+
+        columns = [
+            'title', 'description', 'priority', 'status', 'created_at', 'updated_at',
+            'due_date', 'completed_at', 'user_id', 'category_id',
+        ]
+        datetime_columns = {'created_at', 'updated_at', 'due_date', 'completed_at'}
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(Todo._meta.db_table),
+            ', '.join(connection.ops.quote_name(Todo._meta.get_field(column).column) for column in columns),
+            ', '.join(placeholder if column in datetime_columns else '%s' for column in columns),
+        )
+        last_id = Todo.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        # Tareas generadas por estado (user_id, category_id, status, priority)
+        groups = defaultdict(int)
+
+        with deferred_indexes(), connection.cursor() as cursor:
+            for start in range(0, count, BATCH_SIZE):
+                end = min(start + BATCH_SIZE, count)
+                size = end - start
+                rows = []
+                # Las elecciones uniformes se sortean por lote con choices()
+                for i, verb, obj, description, user_id, category_id in zip(
+                    range(start, end),
+                    rng.choices(TITLE_VERBS, k=size),
+                    rng.choices(TITLE_OBJECTS, k=size),
+                    rng.choices(DESCRIPTIONS, k=size),
+                    rng.choices(user_choices, k=size),
+                    rng.choices(category_choices, k=size),
+                ):
+                    status = statuses[i]
+                    priority = priorities[i]
+                    created_at = now - int(random_() * CREATED_SPAN)
+                    due_date = None
+                    if random_() < DUE_DATE_SHARE:
+                        if random_() < PAST_DUE_SHARE:
+                            due_date = now - int(random_() * PAST_DUE_SPAN)
+                        else:
+                            due_date = now + int(random_() * FUTURE_DUE_SPAN)
+                    completed_at = None
+                    if status == 'completed':
+                        completed_at = min(now, created_at + int(random_() * COMPLETION_SPAN))
+                    groups[user_id, category_id, status, priority] += 1
+                    rows.append((
+                        f'{verb} {obj} #{i}',
+                        description or None,
+                        priority,
+                        status,
+                        adapt(created_at),
+                        adapt(completed_at or created_at),
+                        adapt(due_date),
+                        adapt(completed_at),
+                        user_id,
+                        category_id,
+                    ))
+                cursor.executemany(sql, rows)
+                self.stdout.write(f'Tareas: {end}/{count}')
+
+        deltas = defaultdict(int)
+        for state, tasks in groups.items():
+            add_state(deltas, state, tasks)
+        upsert_deltas(deltas)
+        return list(Todo.objects.filter(id__gt=last_id).values_list('id', flat=True))
+
+    def generate_attachments(self, count, todo_ids, rng):
+        if not count:
+            return
+        if not todo_ids:
+            todo_ids = list(Todo.objects.values_list('id', flat=True))
+        if not todo_ids:
+            raise CommandError('No hay tareas a las que adjuntar archivos')
+
+        # Todos los adjuntos sintéticos apuntan al mismo archivo de muestra;
+        # bulk_create no dispara señales, así que las referencias se suman aquí
+        path = blob_storage().save('sample_attachment.txt', ContentFile(b'Archivo de ejemplo\n'))
+        for start in range(0, count, BATCH_SIZE):
+            TodoAttachment.objects.bulk_create([
+                TodoAttachment(todo_id=rng.choice(todo_ids), file=path, filename=f'adjunto_{i}.txt')
+                for i in range(start, min(start + BATCH_SIZE, count))
+            ])
+        add_reference(path, count)
+        self.stdout.write(f'Archivos adjuntos: {count}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from todo.maintenance import run_maintenance
+
+
+class Command(BaseCommand):
+    help = 'Mantenimiento de la base SQLite: ANALYZE, PRAGMA optimize, vacuum incremental y checkpoint del WAL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Alias de la base de datos')
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Activar auto_vacuum=INCREMENTAL reescribiendo la base con VACUUM si aún no lo está'
+        )
+
+    def handle(self, *args, **options):
+        if connections[options['database']].vendor != 'sqlite':
+            raise CommandError('db_maintenance solo aplica a bases SQLite')
+
+        result = run_maintenance(options['database'], vacuum=options['vacuum'])
+        if result['vacuumed']:
+            self.stdout.write('Base reescrita con VACUUM (auto_vacuum=INCREMENTAL)')
+        if result['auto_vacuum_incremental']:
+            self.stdout.write(f"{result['freed_pages']} páginas libres devueltas al sistema")
+        else:
+            self.stdout.write(
+                'auto_vacuum no es INCREMENTAL: ejecute una vez con --vacuum para liberar espacio'
+            )
+        if result['checkpointed']:
+            self.stdout.write('WAL consolidado en la base')
+        self.stdout.write(self.style.SUCCESS('Estadísticas actualizadas (ANALYZE, PRAGMA optimize)'))
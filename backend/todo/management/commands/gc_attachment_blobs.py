@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from todo.blobs import GC_GRACE_SECONDS, blob_storage, collect_garbage, recount_references
+from todo.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Borrar los archivos adjuntos guardados por contenido que ya no usa ningún adjunto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=GC_GRACE_SECONDS,
+            help='No borrar archivos escritos o reutilizados en los últimos N segundos'
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Recalcular antes las referencias a partir de los adjuntos'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar lo que se borraría sin borrar nada')
+
+    def handle(self, *args, **options):
+        if not isinstance(blob_storage(), ContentAddressedStorage):
+            raise CommandError("STORAGES['attachments'] no es todo.storage.ContentAddressedStorage")
+        if options['grace'] < 0:
+            raise CommandError('--grace no puede ser negativo')
+
+        if options['recount']:
+            self.stdout.write(f'{recount_references()} blobs con referencias corregidas')
+        removed, freed = collect_garbage(options['grace'], dry_run=options['dry_run'])
+        verb = 'se borrarían' if options['dry_run'] else 'borrados'
+        self.stdout.write(self.style.SUCCESS(f'{removed} archivos {verb} ({freed} bytes)'))
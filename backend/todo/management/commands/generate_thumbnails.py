@@ -0,0 +1,44 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from todo.imaging import render_thumbnails
+from todo.models import TodoAttachment
+from todo.thumbnails import save_thumbnails, thumbnail_targets
+
+
+class Command(BaseCommand):
+    help = 'Generar las miniaturas que falten de los adjuntos de imagen (idempotente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Procesos que generan miniaturas')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Revisar también los adjuntos que ya tienen miniaturas (p. ej. tras cambiar los tamaños)'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers debe ser al menos 1')
+
+        queryset = TodoAttachment.objects.select_related('todo').order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(thumbnails={})
+        jobs = []
+        for attachment in queryset:
+            job = thumbnail_targets(attachment)
+            if job is not None:
+                jobs.append((attachment, job))
+
+        # Pillow en los procesos; el registro, en este proceso y en orden
+        built = 0
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(options['workers'], mp_context=context) as processes:
+            futures = [
+                (attachment, targets, processes.submit(render_thumbnails, source, targets))
+                for attachment, (source, targets) in jobs
+            ]
+            for attachment, targets, future in futures:
+                if save_thumbnails(attachment, targets, future.result()):
+                    built += 1
+        self.stdout.write(self.style.SUCCESS(f'{built} de {len(jobs)} imágenes con miniaturas'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from todo.blobs import blob_storage, migrate_legacy_attachments
+from todo.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Pasar los archivos adjuntos guardados por nombre al almacenamiento por contenido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-originals', action='store_true',
+            help='No borrar los archivos originales después de copiarlos'
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(blob_storage(), ContentAddressedStorage):
+            raise CommandError("STORAGES['attachments'] no es todo.storage.ContentAddressedStorage")
+
+        migrated, updated, missing = migrate_legacy_attachments(keep_originals=options['keep_originals'])
+        if missing:
+            self.stdout.write(self.style.WARNING(f'{missing} archivos no existen y se han dejado como estaban'))
+        self.stdout.write(self.style.SUCCESS(f'{migrated} archivos migrados ({updated} adjuntos actualizados)'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from todo.changes import DELETION_LOG_RETENTION, prune_deletions
+
+
+class Command(BaseCommand):
+    help = 'Purgar el registro de tareas eliminadas más antiguo que el periodo de retención del feed de cambios'
+
+    def handle(self, *args, **options):
+        deleted = prune_deletions()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{deleted} eliminaciones anteriores a {DELETION_LOG_RETENTION.days} días purgadas'
+            )
+        )
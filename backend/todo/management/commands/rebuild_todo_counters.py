@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from todo.counters import check_counters, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcular y verificar los contadores de estadísticas de tareas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo verificar los contadores, sin modificarlos',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            buckets = rebuild_counters()
+            self.stdout.write(f'Contadores recalculados: {buckets}')
+
+        differences = check_counters()
+        for (scope, scope_id, category_key, status, priority), stored, expected in differences:
+            self.stdout.write(
+                f'{scope}:{scope_id} categoría={category_key} {status}/{priority}: '
+                f'guardado={stored} esperado={expected}'
+            )
+        if differences:
+            raise CommandError(f'{len(differences)} contadores no coinciden con las tareas')
+
+        self.stdout.write(
+            self.style.SUCCESS('Los contadores coinciden con las tareas')
+        )
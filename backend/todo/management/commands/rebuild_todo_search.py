@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from todo.search import rebuild_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    help = 'Reconstruir el índice de búsqueda de texto completo (FTS5) de las tareas'
+
+    def handle(self, *args, **options):
+        if not search_index_available():
+            raise CommandError(
+                'El índice FTS5 no existe: se requiere SQLite con FTS5 y aplicar las migraciones'
+            )
+
+        rebuild_search_index()
+        self.stdout.write(
+            self.style.SUCCESS('Índice de búsqueda reconstruido exitosamente!')
+        )
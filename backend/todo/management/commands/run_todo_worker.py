@@ -0,0 +1,38 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from todo.jobs import DEFAULT_VISIBILITY_TIMEOUT, Worker
+
+
+class Command(BaseCommand):
+    help = 'Ejecutar los trabajos en segundo plano de la cola (exportaciones, actualizaciones masivas, miniaturas...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Trabajos ejecutados a la vez')
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Hilos de este proceso o procesos aparte (tareas que usan mucha CPU)'
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Segundos entre consultas con la cola vacía')
+        parser.add_argument(
+            '--visibility-timeout', type=int, default=DEFAULT_VISIBILITY_TIMEOUT,
+            help='Segundos de reserva de un trabajo; si el worker muere, otro lo reclama al vencer'
+        )
+        parser.add_argument('--once', action='store_true', help='Salir cuando la cola quede vacía')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency debe ser al menos 1')
+        if options['visibility_timeout'] < 1:
+            raise CommandError('--visibility-timeout debe ser al menos 1')
+
+        worker = Worker(
+            concurrency=options['concurrency'], pool=options['pool'], poll_interval=options['poll_interval'],
+            visibility_timeout=options['visibility_timeout'],
+        )
+        # SIGTERM / Ctrl+C: no se reclaman más trabajos y se esperan los que están en curso
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f"Worker en marcha ({options['concurrency']} x {options['pool']})")
+        processed = worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f'{processed} trabajos procesados'))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from todo.replicas import replica_aliases, sync_replica
+
+
+class Command(BaseCommand):
+    help = 'Copiar la base del primario a las réplicas de lectura (TODO_READ_REPLICAS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Repetir la copia cada N segundos (por defecto una sola vez)'
+        )
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError('No hay réplicas configuradas (DJANGO_READ_REPLICAS)')
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('sync_replicas copia archivos SQLite; use la replicación del motor')
+
+        while True:
+            started = time.monotonic()
+            for alias in aliases:
+                sync_replica(connections[alias].settings_dict['NAME'])
+            self.stdout.write(
+                f"{len(aliases)} réplicas sincronizadas en {(time.monotonic() - started) * 1000:.0f} ms"
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:49
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    """Inicializar los contadores con las tareas existentes"""
+    Todo = apps.get_model('todo', 'Todo')
+    TodoCounter = apps.get_model('todo', 'TodoCounter')
+    counts = defaultdict(int)
+    groups = Todo.objects.order_by().values('user_id', 'category_id', 'status', 'priority').annotate(tasks=Count('id'))
+    for group in groups:
+        category_key = group['category_id'] or 0
+        counts[('global', 0, category_key, group['status'], group['priority'])] += group['tasks']
+        if group['user_id']:
+            counts[('user', group['user_id'], category_key, group['status'], group['priority'])] += group['tasks']
+    TodoCounter.objects.bulk_create([
+        TodoCounter(scope=scope, scope_id=scope_id, category_key=category_key,
+                    status=status, priority=priority, count=count)
+        for (scope, scope_id, category_key, status, priority), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0002_update_todo_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('global', 'Global'), ('user', 'Usuario')], max_length=10, verbose_name='Ámbito')),
+                ('scope_id', models.PositiveBigIntegerField(default=0, verbose_name='ID del ámbito')),
+                ('category_key', models.PositiveBigIntegerField(default=0, verbose_name='Categoría')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('in_progress', 'En Progreso'), ('completed', 'Completada'), ('cancelled', 'Cancelada')], max_length=15, verbose_name='Estado')),
+                ('priority', models.CharField(choices=[('low', 'Baja'), ('medium', 'Media'), ('high', 'Alta'), ('urgent', 'Urgente')], max_length=10, verbose_name='Prioridad')),
+                ('count', models.IntegerField(default=0, verbose_name='Número de tareas')),
+            ],
+            options={
+                'verbose_name': 'Contador de tareas',
+                'verbose_name_plural': 'Contadores de tareas',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'scope_id', 'category_key', 'status', 'priority'), name='unique_todo_counter_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:54
+
+import django.db.models.deletion
+import todo.models
+from django.db import migrations, models, transaction
+from django.db.utils import OperationalError
+
+
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE todo_todo_fts USING fts5(
+        title, description,
+        content='todo_todo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    # El título pesa más que la descripción en la relevancia (bm25)
+    "INSERT INTO todo_todo_fts(todo_todo_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    """
+    CREATE TRIGGER todo_todo_fts_insert AFTER INSERT ON todo_todo BEGIN
+        INSERT INTO todo_todo_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todo_todo_fts_delete AFTER DELETE ON todo_todo BEGIN
+        INSERT INTO todo_todo_fts(todo_todo_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todo_todo_fts_update AFTER UPDATE OF title, description ON todo_todo BEGIN
+        INSERT INTO todo_todo_fts(todo_todo_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todo_todo_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todo_todo_fts(todo_todo_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS todo_todo_fts_insert',
+    'DROP TRIGGER IF EXISTS todo_todo_fts_delete',
+    'DROP TRIGGER IF EXISTS todo_todo_fts_update',
+    'DROP TABLE IF EXISTS todo_todo_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    """Crear el índice FTS5 y sus triggers (solo SQLite compilado con FTS5)"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                for statement in CREATE_SEARCH_INDEX:
+                    cursor.execute(statement)
+    except OperationalError:
+        # SQLite sin FTS5: la búsqueda sigue usando icontains
+        pass
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_SEARCH_INDEX:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0004_todo_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoSearchIndex',
+            fields=[
+                ('todo', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='todo.todo')),
+                ('document', todo.models.SearchDocumentField(db_column='todo_todo_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'todo_todo_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
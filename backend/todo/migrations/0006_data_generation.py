@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0005_todo_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(choices=[('todos', 'Tareas y archivos adjuntos'), ('categories', 'Categorías'), ('users', 'Usuarios')], max_length=20, unique=True, verbose_name='Conjunto')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Generación')),
+                ('changed_at', models.DateTimeField(verbose_name='Último cambio')),
+            ],
+            options={
+                'verbose_name': 'Generación de datos',
+                'verbose_name_plural': 'Generaciones de datos',
+            },
+        ),
+    ]
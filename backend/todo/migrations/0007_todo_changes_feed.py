@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0006_data_generation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_id', models.PositiveBigIntegerField(verbose_name='ID de la tarea')),
+                ('deleted_at', models.DateTimeField(verbose_name='Fecha de eliminación')),
+            ],
+            options={
+                'verbose_name': 'Tarea eliminada',
+                'verbose_name_plural': 'Tareas eliminadas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['updated_at', 'id'], name='todo_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tododeletion',
+            index=models.Index(fields=['deleted_at', 'id'], name='todo_deletion_deleted_idx'),
+        ),
+    ]
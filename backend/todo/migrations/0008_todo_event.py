@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0007_todo_changes_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField(verbose_name='Evento (JSON)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Evento',
+                'verbose_name_plural': 'Eventos',
+                'indexes': [models.Index(fields=['created_at'], name='todo_event_created_idx')],
+            },
+        ),
+    ]
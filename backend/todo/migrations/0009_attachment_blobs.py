@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:23
+
+import todo.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0008_todo_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, verbose_name='Archivo')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Tamaño')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='Referencias')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Archivo almacenado',
+                'verbose_name_plural': 'Archivos almacenados',
+            },
+        ),
+        migrations.AlterField(
+            model_name='todoattachment',
+            name='file',
+            field=models.FileField(storage=todo.models.attachment_storage, upload_to='todo_attachments/', verbose_name='Archivo'),
+        ),
+    ]
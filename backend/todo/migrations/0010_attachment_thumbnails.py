@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0009_attachment_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoattachment',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Miniaturas'),
+        ),
+    ]
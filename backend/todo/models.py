@@ -1,5 +1,144 @@
+from django.core.files.storage import storages
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+COUNTER_FIELDS = {'status', 'priority', 'user', 'user_id', 'category', 'category_id'}
+UNRESOLVED_STATUSES = ['pending', 'in_progress']
+UNRESOLVED_DUE_INDEX = 'todo_unresolved_due_idx'
+
+
+class UnresolvedStatus(models.Expression):
+    """
+    Condición literal status IN ('pending', 'in_progress')
+
+    SQLite solo usa un índice parcial cuando la consulta repite su condición
+    con valores literales; con parámetros (status__in) lo descarta.
+    """
+    
+    def __init__(self):
+        super().__init__(output_field=models.BooleanField())
+        self.column = models.F('status')
+    
+    def get_source_expressions(self):
+        return [self.column]
+    
+    def set_source_expressions(self, exprs):
+        self.column, = exprs
+    
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.column)
+        values = ', '.join(f"'{value}'" for value in UNRESOLVED_STATUSES)
+        return f'{sql} IN ({values})', params
+
+
+class Likelihood(models.Expression):
+    """
+    Condición con la proporción de filas que se espera que cumpla
+
+    En SQLite se compila como likelihood(condición, proporción), que solo
+    cambia las estimaciones del planificador; en otras bases de datos es
+    la condición tal cual.
+    """
+    
+    def __init__(self, condition, probability):
+        super().__init__(output_field=models.BooleanField())
+        self.condition = condition
+        self.probability = probability
+    
+    def get_source_expressions(self):
+        return [self.condition]
+    
+    def set_source_expressions(self, exprs):
+        self.condition, = exprs
+    
+    def as_sql(self, compiler, connection):
+        return compiler.compile(self.condition)
+    
+    def as_sqlite(self, compiler, connection):
+        sql, params = compiler.compile(self.condition)
+        return f'likelihood({sql}, {float(self.probability)!r})', params
+
+
+class TodoQuerySet(models.QuerySet):
+    """
+    QuerySet de tareas que mantiene los contadores de estadísticas
+    en las operaciones masivas que no disparan señales
+    """
+    
+    def overdue(self, now=None):
+        """
+        Tareas sin resolver cuya fecha límite ya pasó
+        
+        Sin ANALYZE, SQLite toma el estado por la restricción más selectiva
+        y recorre el índice por estado (o el del orden por defecto) en lugar
+        del parcial todo_unresolved_due_idx. Las dos condiciones llevan su
+        proporción esperada (Likelihood) para que lo elija; el estado se
+        filtra solo con la condición literal del índice, ya que un
+        status__in con parámetros dejaría usar de nuevo el índice por estado.
+        """
+        from django.utils import timezone
+        return self.filter(
+            Likelihood(UnresolvedStatus(), 0.9),
+            Likelihood(models.Q(due_date__lt=now or timezone.now()), 0.0625),
+        )
+    
+    def update(self, **kwargs):
+        """Actualizar en bloque ajustando los contadores afectados y la fecha de actualización"""
+        from django.db import transaction
+        from django.utils import timezone
+        from .counters import apply_queryset_update, counters_suspended
+        from .generations import bump_generation
+        from .events import publish_event
+        # Solo updated_at: lo usan las señales de adjuntos y categorías, que publican sus eventos
+        content_changed = bool(set(kwargs) - {'updated_at'})
+        # update() no aplica auto_now; el feed de cambios depende de updated_at
+        kwargs.setdefault('updated_at', timezone.now())
+        with transaction.atomic(using=self.db):
+            bump_generation(DataGeneration.TODOS)
+            if content_changed:
+                # Sin IDs: los clientes del stream se ponen al día con el feed de cambios
+                publish_event({'type': 'todo.bulk_updated'})
+            if not COUNTER_FIELDS.intersection(kwargs) or counters_suspended():
+                return super().update(**kwargs)
+            return apply_queryset_update(self, kwargs, super().update)
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Crear en bloque sumando las nuevas tareas a los contadores
+        
+        Se publica un solo evento todo.bulk_created, sin IDs como
+        todo.bulk_updated: uno por tarea llenaría la cola de los suscriptores.
+        """
+        from django.db import transaction
+        from .counters import apply_bulk_create
+        from .events import publish_event
+        from .generations import bump_generation
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            bump_generation(DataGeneration.TODOS)
+            if created:
+                publish_event({'type': 'todo.bulk_created'})
+            apply_bulk_create(created, conflicts=bool(
+                kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts')
+            ))
+        return created
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """Actualizar en bloque moviendo las tareas entre contadores"""
+        if not COUNTER_FIELDS.intersection(fields):
+            # bulk_update usa update(), que ya incrementa la generación
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        
+        from django.db import transaction
+        from .counters import apply_bulk_update
+        with transaction.atomic(using=self.db):
+            return apply_bulk_update(
+                objs, lambda: super(TodoQuerySet, self).bulk_update(objs, fields, *args, **kwargs)
+            )
+
 
 class Todo(models.Model):
     """
@@ -56,10 +195,29 @@ class Todo(models.Model):
         verbose_name="Categoría"
     )
     
+    objects = TodoQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at', '-priority']
         verbose_name = "Tarea"
         verbose_name_plural = "Tareas"
+        indexes = [
+            # Orden por defecto del listado
+            models.Index(fields=['-created_at', '-priority'], name='todo_created_priority_idx'),
+            # Filtros del listado combinados con el orden por defecto
+            models.Index(fields=['status', '-created_at', '-priority'], name='todo_status_created_idx'),
+            models.Index(fields=['priority', '-created_at'], name='todo_priority_created_idx'),
+            models.Index(fields=['category', '-created_at', '-priority'], name='todo_category_created_idx'),
+            models.Index(fields=['user', '-created_at', '-priority'], name='todo_user_created_idx'),
+            # Feed de cambios: tareas modificadas después de un token
+            models.Index(fields=['updated_at', 'id'], name='todo_updated_idx'),
+            # Tareas vencidas: solo las que siguen sin resolver
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(status__in=UNRESOLVED_STATUSES),
+                name=UNRESOLVED_DUE_INDEX
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
@@ -72,13 +230,61 @@ class Todo(models.Model):
         self.save()
     
     def is_overdue(self):
-        """Verifica si la tarea está vencida"""
+        """Verifica si la tarea está vencida (sin resolver, como overdue())"""
         from django.utils import timezone
-        if self.due_date and self.status != 'completed':
+        if self.due_date and self.status in UNRESOLVED_STATUSES:
             return timezone.now() > self.due_date
         return False
 
 
+def overdue_aggregate(using, now, function, field=None, **filters):
+    """
+    Agregado (COUNT, MAX...) de las tareas vencidas forzando el índice parcial
+
+    Solo SQLite: sin estadísticas (sin ANALYZE) su planificador prefiere el
+    índice por estado y recorre todas las tareas sin resolver; INDEXED BY
+    fija todo_unresolved_due_idx. `filters` son igualdades sobre columnas
+    de la tarea (user_id, category_id, status, priority).
+    """
+    from django.db import connections
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    meta = Todo._meta
+    due_date = meta.get_field('due_date')
+    statuses = ', '.join(f"'{value}'" for value in UNRESOLVED_STATUSES)
+    where = [f'{qn(meta.get_field("status").column)} IN ({statuses})', f'{qn(due_date.column)} < %s']
+    params = [due_date.get_db_prep_value(now, connection)]
+    for name, value in filters.items():
+        where.append(f'{qn(meta.get_field(name).column)} = %s')
+        params.append(value)
+    target = qn(meta.get_field(field).column) if field else '*'
+    sql = (
+        f'SELECT {function}({target}) FROM {qn(meta.db_table)} INDEXED BY {qn(UNRESOLVED_DUE_INDEX)} '
+        f'WHERE {" AND ".join(where)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+
+class TodoCategoryQuerySet(models.QuerySet):
+    """QuerySet de categorías"""
+    
+    def with_tasks_count(self):
+        """
+        Anotar tasks_count con la suma de los contadores globales de la categoría
+        
+        Lee como máximo una fila de contador por estado y prioridad en lugar
+        de contar las tareas de cada categoría.
+        """
+        tasks_count = TodoCounter.objects.filter(
+            scope=TodoCounter.SCOPE_GLOBAL, scope_id=0, category_key=models.OuterRef('pk')
+        ).order_by().values('category_key').annotate(total=models.Sum('count')).values('total')
+        return self.annotate(
+            tasks_count=Coalesce(models.Subquery(tasks_count), 0)
+        )
+
+
 class TodoCategory(models.Model):
     """
     Categorías para organizar las tareas ToDo
@@ -100,6 +306,8 @@ class TodoCategory(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = TodoCategoryQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
@@ -109,6 +317,11 @@ class TodoCategory(models.Model):
         return self.name
 
 
+def attachment_storage():
+    """Almacenamiento de los archivos adjuntos (STORAGES['attachments'])"""
+    return storages['attachments']
+
+
 class TodoAttachment(models.Model):
     """
     Archivos adjuntos para las tareas
@@ -121,9 +334,12 @@ class TodoAttachment(models.Model):
     )
     file = models.FileField(
         upload_to='todo_attachments/',
+        storage=attachment_storage,
         verbose_name="Archivo"
     )
     filename = models.CharField(max_length=255, verbose_name="Nombre del archivo")
+    # {tamaño: {formato: nombre}} de las miniaturas ya generadas (todo.thumbnails)
+    thumbnails = models.JSONField(default=dict, blank=True, verbose_name="Miniaturas")
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de subida")
     
     class Meta:
@@ -132,3 +348,212 @@ class TodoAttachment(models.Model):
     
     def __str__(self):
         return f"{self.filename} - {self.todo.title}"
+
+
+class AttachmentBlob(models.Model):
+    """
+    Archivo de adjunto guardado por contenido y cuántos adjuntos lo usan
+
+    Las referencias se suman y restan con las señales de TodoAttachment;
+    los blobs sin referencias los borra el comando gc_attachment_blobs.
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    name = models.CharField(max_length=255, verbose_name="Archivo")
+    size = models.PositiveBigIntegerField(verbose_name="Tamaño")
+    ref_count = models.IntegerField(default=0, verbose_name="Referencias")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    
+    class Meta:
+        verbose_name = "Archivo almacenado"
+        verbose_name_plural = "Archivos almacenados"
+    
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count})"
+
+
+class TodoCounter(models.Model):
+    """
+    Contadores desnormalizados de tareas para las estadísticas
+
+    Cada fila guarda cuántas tareas hay en un ámbito (global o por usuario)
+    para una combinación de categoría, estado y prioridad. El valor 0 en
+    scope_id/category_key representa "global" y "sin categoría".
+    """
+    SCOPE_GLOBAL = 'global'
+    SCOPE_USER = 'user'
+    SCOPE_CHOICES = [
+        (SCOPE_GLOBAL, 'Global'),
+        (SCOPE_USER, 'Usuario'),
+    ]
+    
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES, verbose_name="Ámbito")
+    scope_id = models.PositiveBigIntegerField(default=0, verbose_name="ID del ámbito")
+    category_key = models.PositiveBigIntegerField(default=0, verbose_name="Categoría")
+    status = models.CharField(max_length=15, choices=Todo.STATUS_CHOICES, verbose_name="Estado")
+    priority = models.CharField(max_length=10, choices=Todo.PRIORITY_CHOICES, verbose_name="Prioridad")
+    count = models.IntegerField(default=0, verbose_name="Número de tareas")
+    
+    class Meta:
+        verbose_name = "Contador de tareas"
+        verbose_name_plural = "Contadores de tareas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'scope_id', 'category_key', 'status', 'priority'],
+                name='unique_todo_counter_bucket'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}:{self.scope_id} {self.status}/{self.priority} = {self.count}"
+
+
+class DataGeneration(models.Model):
+    """
+    Número de generación de un conjunto de datos
+
+    Se incrementa en cada escritura (señales y operaciones masivas de
+    TodoQuerySet), así que sirve como validador barato de las respuestas.
+    """
+    TODOS = 'todos'
+    CATEGORIES = 'categories'
+    USERS = 'users'
+    KEY_CHOICES = [
+        (TODOS, 'Tareas y archivos adjuntos'),
+        (CATEGORIES, 'Categorías'),
+        (USERS, 'Usuarios'),
+    ]
+    
+    key = models.CharField(max_length=20, choices=KEY_CHOICES, unique=True, verbose_name="Conjunto")
+    value = models.PositiveBigIntegerField(default=0, verbose_name="Generación")
+    changed_at = models.DateTimeField(verbose_name="Último cambio")
+    
+    class Meta:
+        verbose_name = "Generación de datos"
+        verbose_name_plural = "Generaciones de datos"
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class TodoDeletion(models.Model):
+    """
+    Registro de tareas eliminadas (tombstones) para el feed de cambios
+
+    Se escribe al eliminar cada tarea y se purga pasado el periodo de
+    retención; los tokens más antiguos deben sincronizar desde cero.
+    """
+    todo_id = models.PositiveBigIntegerField(verbose_name="ID de la tarea")
+    deleted_at = models.DateTimeField(verbose_name="Fecha de eliminación")
+    
+    class Meta:
+        verbose_name = "Tarea eliminada"
+        verbose_name_plural = "Tareas eliminadas"
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='todo_deletion_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.todo_id} ({self.deleted_at})"
+
+
+class TodoEvent(models.Model):
+    """
+    Evento de cambio pendiente de difundir (backend de eventos en base de datos)
+
+    Permite que los procesos que escriben y los que sirven el stream SSE
+    sean distintos: estos leen la tabla periódicamente.
+    """
+    payload = models.TextField(verbose_name="Evento (JSON)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    
+    class Meta:
+        verbose_name = "Evento"
+        verbose_name_plural = "Eventos"
+        indexes = [
+            models.Index(fields=['created_at'], name='todo_event_created_idx'),
+        ]
+    
+    def __str__(self):
+        return self.payload
+
+
+class TodoJob(models.Model):
+    """
+    Trabajo en segundo plano de la cola en base de datos (todo.jobs)
+
+    Lo ejecuta `manage.py run_todo_worker`. Un trabajo reclamado queda
+    reservado hasta locked_until; si el worker muere sin terminarlo, pasado
+    ese tiempo otro lo vuelve a reclamar (hasta max_attempts intentos).
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'En cola'),
+        (RUNNING, 'En ejecución'),
+        (SUCCEEDED, 'Completado'),
+        (FAILED, 'Fallido'),
+    ]
+    
+    task = models.CharField(max_length=100, verbose_name="Tarea")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name="Estado")
+    priority = models.SmallIntegerField(default=0, verbose_name="Prioridad")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="Máximo de intentos")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Ejecutar desde")
+    locked_by = models.CharField(max_length=64, blank=True, default='', verbose_name="Reservado por")
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name="Reservado hasta")
+    result = models.JSONField(null=True, blank=True, verbose_name="Resultado")
+    error = models.TextField(blank=True, default='', verbose_name="Error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de fin")
+    
+    class Meta:
+        verbose_name = "Trabajo"
+        verbose_name_plural = "Trabajos"
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='todo_job_claim_idx'),
+            models.Index(fields=['status', 'locked_until'], name='todo_job_lease_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class SearchDocumentField(models.TextField):
+    """Columna oculta de una tabla FTS5 que acepta el operador MATCH"""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class TodoSearchIndex(models.Model):
+    """
+    Índice de búsqueda de texto completo (tabla virtual FTS5 de SQLite)
+    
+    Tabla de contenido externo sobre título y descripción de las tareas;
+    la crean y sincronizan la migración y sus triggers, no el ORM.
+    """
+    todo = models.OneToOneField(
+        Todo,
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='search_index'
+    )
+    document = SearchDocumentField(db_column='todo_todo_fts')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'todo_todo_fts'
@@ -0,0 +1,168 @@
+import base64
+import binascii
+
+from asgiref.sync import sync_to_async
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from django.core.paginator import InvalidPage
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class TodoKeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) para las tareas, ordenada por (-created_at, -id)
+
+    Cada página filtra a partir de la última fila de la anterior en lugar de
+    usar OFFSET, así que el costo no depende de la profundidad y no se
+    ejecuta ningún COUNT(*).
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = None
+    max_page_size = None
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        """Tamaño de página, ajustable con page_size_query_param hasta max_page_size"""
+        value = request.query_params.get(self.page_size_query_param) if self.page_size_query_param else None
+        if value and value.isdigit() and int(value) > 0:
+            return min(int(value), self.max_page_size or int(value))
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset[:self.page_size_used + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset con el ORM asíncrono"""
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([row async for row in queryset[:self.page_size_used + 1]])
+
+    def get_page_queryset(self, queryset, request):
+        """Ordenar y filtrar el queryset a partir del cursor; se lee una fila de más"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size_used = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None or not self.cursor[2]:
+            queryset = queryset.order_by('-created_at', '-id')
+            if self.cursor is not None:
+                created_at, pk, _ = self.cursor
+                queryset = queryset.filter(
+                    Q(created_at__lte=created_at) & ~Q(created_at=created_at, id__gte=pk)
+                )
+            return queryset
+        created_at, pk, _ = self.cursor
+        return queryset.order_by('created_at', 'id').filter(
+            Q(created_at__gte=created_at) & ~Q(created_at=created_at, id__lte=pk)
+        )
+
+    def set_page(self, rows):
+        page_size = self.page_size_used
+        if self.cursor is None or not self.cursor[2]:
+            self.has_next = len(rows) > page_size
+            self.has_previous = self.cursor is not None
+            self.page = rows[:page_size]
+        else:
+            self.has_next = True
+            self.has_previous = len(rows) > page_size
+            self.page = list(reversed(rows[:page_size]))
+        return self.page
+
+    def decode_cursor(self, request):
+        """Decodificar el cursor (created_at, id, reverse) de la consulta"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            created_at, pk, reverse = value.split('|')
+            created_at = parse_datetime(created_at)
+            if created_at is None or reverse not in ('0', '1'):
+                raise ValueError
+            return created_at, int(pk), reverse == '1'
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, todo, reverse):
+        # Las filas pueden ser modelos o diccionarios de values()
+        if isinstance(todo, dict):
+            created_at, pk = todo['created_at'], todo['id']
+        else:
+            created_at, pk = todo.created_at, todo.pk
+        value = f"{created_at.isoformat()}|{pk}|{int(reverse)}"
+        encoded = base64.urlsafe_b64encode(value.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CompactListPagination(TodoKeysetPagination):
+    """Paginación por cursor de las listas compactas: páginas grandes, ajustables con ?page_size="""
+    page_size = 1000
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
+
+
+async def apaginate_queryset(paginator, queryset, request, view=None):
+    """
+    Paginar desde el event loop
+
+    Con PageNumberPagination se cuentan las filas y se lee la página con
+    el ORM asíncrono; las paginaciones con apaginate_queryset usan el suyo
+    y el resto se ejecutan en un hilo.
+    """
+    if hasattr(paginator, 'apaginate_queryset'):
+        return await paginator.apaginate_queryset(queryset, request, view=view)
+    if type(paginator).paginate_queryset is not PageNumberPagination.paginate_queryset:
+        return await sync_to_async(paginator.paginate_queryset)(queryset, request, view=view)
+
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        paginator.page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(
+            page_number=page_number, message=str(exc)
+        ))
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+    paginator.request = request
+    paginator.page.object_list = [item async for item in paginator.page.object_list]
+    return list(paginator.page)
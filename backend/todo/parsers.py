@@ -0,0 +1,36 @@
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+# orjson convierte en float los enteros que no caben en 64 bits; los
+# cuerpos con números tan largos se analizan con json para no perder precisión
+LONG_NUMBER = re.compile(rb'\d{19}')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser que decodifica con orjson si está disponible
+
+    Si orjson rechaza el cuerpo (NaN, JSON inválido), contiene números de
+    19 o más dígitos o la codificación no es UTF-8, se analiza con
+    JSONParser, de modo que los resultados y los mensajes de error son
+    los mismos que con el parser estándar.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        if LONG_NUMBER.search(content):
+            return super().parse(io.BytesIO(content), media_type, parser_context)
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(content), media_type, parser_context)
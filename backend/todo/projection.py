@@ -0,0 +1,143 @@
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .models import UNRESOLVED_STATUSES, Todo, TodoAttachment, TodoCategory
+from .serializers import TodoAttachmentSerializer, TodoCategorySerializer, TodoSerializer, UserSerializer
+
+
+TODO_FIELDS = TodoSerializer.Meta.fields
+# ?expand= acepta el nombre de la relación o el del campo anidado
+EXPANSIONS = {
+    'category': 'category_details', 'category_details': 'category_details',
+    'user': 'user_details', 'user_details': 'user_details',
+    'attachments': 'attachments',
+}
+# Columnas de values() que necesita cada campo calculado o anidado
+DERIVED_COLUMNS = {
+    'priority_display': ['priority'],
+    'status_display': ['status'],
+    'is_overdue': ['due_date', 'status'],
+    'days_until_due': ['due_date'],
+    'category_details': ['category'],
+    'user_details': ['user'],
+    'attachments': [],
+}
+# Siempre se leen: identifican la fila y forman el cursor de paginación
+KEY_COLUMNS = ['id', 'created_at']
+DATETIME_FIELDS = ['created_at', 'updated_at', 'due_date', 'completed_at']
+PRIORITY_LABELS = dict(Todo.PRIORITY_CHOICES)
+STATUS_LABELS = dict(Todo.STATUS_CHOICES)
+
+
+def split_param(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def parse_projection_fields(query_params):
+    """
+    Campos pedidos con ?fields= y ?expand=, en el orden de TodoSerializer
+
+    Devuelve None si no se pidió ninguno (se usa el serializer completo).
+    Sin ?fields= se devuelven todos los campos no anidados más las expansiones pedidas.
+    """
+    fields = query_params.get('fields')
+    expand = query_params.get('expand')
+    if fields is None and expand is None:
+        return None
+
+    errors = {}
+    requested = set(split_param(fields)) if fields is not None else set(TODO_FIELDS) - set(EXPANSIONS.values())
+    unknown = requested - set(TODO_FIELDS)
+    if unknown:
+        errors['fields'] = [f"Campos desconocidos: {', '.join(sorted(unknown))}"]
+    expansions = split_param(expand or '')
+    unknown = [name for name in expansions if name not in EXPANSIONS]
+    if unknown:
+        errors['expand'] = [f"Relaciones desconocidas: {', '.join(unknown)}"]
+    if errors:
+        raise ValidationError(errors)
+
+    requested.update(EXPANSIONS[name] for name in expansions)
+    return [field for field in TODO_FIELDS if field in requested]
+
+
+class TodoProjection:
+    """
+    Representación de tareas a partir de values(), sin instanciar modelos
+
+    Solo se leen las columnas de los campos pedidos; las relaciones
+    anidadas se cargan con una consulta por relación pedida y los campos
+    derivados usan una única hora de referencia por petición.
+    """
+
+    def __init__(self, fields, context=None):
+        self.fields = fields
+        self.context = context or {}
+        self.now = timezone.now()
+        self.today = self.now.date()
+        self.datetime_field = serializers.DateTimeField()
+
+    def columns(self):
+        columns = list(KEY_COLUMNS)
+        for field in self.fields:
+            for column in DERIVED_COLUMNS.get(field, [field]):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    def apply(self, queryset):
+        """Convertir el queryset de tareas en un values() con las columnas necesarias"""
+        return queryset.select_related(None).prefetch_related(None).values(*self.columns())
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        related = {
+            'category_details': self.load_categories,
+            'user_details': self.load_users,
+            'attachments': self.load_attachments,
+        }
+        nested = {field: load(rows) for field, load in related.items() if field in self.fields}
+        return [self.represent_row(row, nested) for row in rows]
+
+    def represent_row(self, row, nested):
+        data = {}
+        for field in self.fields:
+            if field in nested:
+                key = row['id'] if field == 'attachments' else row[DERIVED_COLUMNS[field][0]]
+                data[field] = nested[field].get(key, [] if field == 'attachments' else None)
+            elif field == 'priority_display':
+                data[field] = PRIORITY_LABELS.get(row['priority'], row['priority'])
+            elif field == 'status_display':
+                data[field] = STATUS_LABELS.get(row['status'], row['status'])
+            elif field == 'is_overdue':
+                data[field] = bool(row['due_date'] and row['status'] in UNRESOLVED_STATUSES and self.now > row['due_date'])
+            elif field == 'days_until_due':
+                data[field] = (row['due_date'].date() - self.today).days if row['due_date'] else None
+            elif field in DATETIME_FIELDS and row[field] is not None:
+                data[field] = self.datetime_field.to_representation(row[field])
+            else:
+                data[field] = row[field]
+        return data
+
+    def load_categories(self, rows):
+        ids = {row['category'] for row in rows if row['category']}
+        categories = TodoCategory.objects.with_tasks_count().filter(pk__in=ids)
+        return {
+            category.pk: TodoCategorySerializer(category, context=self.context).data
+            for category in categories
+        }
+
+    def load_users(self, rows):
+        users = User.objects.in_bulk({row['user'] for row in rows if row['user']})
+        return {pk: UserSerializer(user, context=self.context).data for pk, user in users.items()}
+
+    def load_attachments(self, rows):
+        attachments = {}
+        queryset = TodoAttachment.objects.filter(todo_id__in=[row['id'] for row in rows]).order_by('id')
+        for attachment in queryset:
+            attachments.setdefault(attachment.todo_id, []).append(
+                TodoAttachmentSerializer(attachment, context=self.context).data
+            )
+        return attachments
@@ -0,0 +1,158 @@
+import csv
+import json
+import sys
+from array import array
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+# Fechas y horas pasan por JSONEncoder.default para formatearlas igual que DRF
+# ("Z" para UTC); las claves no textuales se convierten como en json.dumps
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+# Separadores de línea que DRF escapa para que la salida sea JavaScript válido
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+encode_default = JSONEncoder().default
+
+
+def dumps_json(data, default=None):
+    """
+    Serializar a JSON compacto en UTF-8 (bytes) con orjson
+
+    Devuelve None si orjson no está instalado o no puede representar el
+    valor (enteros de más de 64 bits, errores de default); quien llama
+    usa entonces la serialización estándar, que da el mismo resultado.
+    """
+    if orjson is None:
+        return None
+    try:
+        content = orjson.dumps(data, default=default or encode_default, option=ORJSON_OPTIONS)
+    except TypeError:
+        return None
+    for separator, escaped in LINE_SEPARATORS:
+        if separator in content:
+            content = content.replace(separator, escaped)
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer que codifica con orjson si está disponible
+
+    Produce los mismos bytes que JSONRenderer con la configuración por
+    defecto (UNICODE_JSON y COMPACT_JSON): mismas fechas, Decimal como
+    número y textos diferidos como cadenas. Con sangría (API navegable,
+    `; indent=`), sin orjson o con valores que orjson no admite, delega
+    en JSONRenderer. A diferencia de este, NaN e infinito salen como null.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        fast = self.ensure_ascii is False and self.compact
+        if fast and self.get_indent(accepted_media_type, renderer_context or {}) is None:
+            content = dumps_json(data, self.encoder_class().default)
+            if content is not None:
+                return content
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class EchoBuffer:
+    """Buffer que devuelve lo escrito, para generar CSV línea por línea"""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Un objeto JSON por línea (newline-delimited JSON)"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.stream(rows)).encode(self.charset)
+
+    def stream(self, rows):
+        for row in rows:
+            content = dumps_json(row)
+            if content is None:
+                yield json.dumps(row, ensure_ascii=False) + '\n'
+            else:
+                yield content.decode(self.charset) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV con encabezado tomado de las claves del primer objeto"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.stream(rows)).encode(self.charset)
+
+    def stream(self, rows):
+        writer = csv.writer(EchoBuffer())
+        header = None
+        for row in rows:
+            if header is None:
+                header = list(row)
+                yield writer.writerow(header)
+            yield writer.writerow([row.get(field) for field in header])
+
+
+class PackedIntRenderer(BaseRenderer):
+    """
+    Lista de enteros como int64 little-endian consecutivos (8 bytes por valor)
+
+    Se decodifica sin analizar texto (`new BigInt64Array(buffer)`,
+    `numpy.frombuffer(data, '<i8')`). Las respuestas que no son una lista
+    de enteros, como los errores, se devuelven en JSON.
+    """
+    media_type = 'application/octet-stream'
+    format = 'packed'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            response = (renderer_context or {}).get('response')
+            if response is not None:
+                response['Content-Type'] = FastJSONRenderer.media_type
+            return FastJSONRenderer().render(data, renderer_context=renderer_context)
+        values = array('q', data)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tobytes()
+
+
+class DownloadRenderer(BaseRenderer):
+    """
+    Acepta cualquier Accept en las descargas de archivos
+
+    La vista devuelve el archivo sin pasar por el renderer; las respuestas
+    de error se devuelven en JSON.
+    """
+    media_type = '*/*'
+    format = 'download'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = FastJSONRenderer.media_type
+        return FastJSONRenderer().render(data, renderer_context=renderer_context)
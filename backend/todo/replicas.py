@@ -0,0 +1,213 @@
+import logging
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+from .models import DataGeneration
+
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = DEFAULT_DB_ALIAS
+DEFAULT_MAX_LAG = 10
+DEFAULT_CHECK_INTERVAL = 1
+DEFAULT_STICKY_SECONDS = 5
+STICKY_COOKIE = 'todo_primary'
+
+# None: lecturas en réplicas; STICKY: la petición llega dentro de la ventana
+# de una escritura anterior; WRITTEN: esta petición (o contexto) ya escribió;
+# PINNED: el código en curso exige leer del primario (read_from_primary)
+STICKY = 'sticky'
+WRITTEN = 'written'
+PINNED = 'pinned'
+_primary_state = ContextVar('todo_primary_state', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'TODO_READ_REPLICAS', []))
+
+
+def replica_lag(alias, now=None):
+    """
+    Retraso estimado de una réplica en segundos (None si no se puede leer)
+
+    Se comparan las generaciones de datos (DataGeneration) de la réplica y
+    del primario. Si coinciden, la réplica está al día. Si alguna va por
+    detrás, el retraso es el tiempo transcurrido desde el último cambio que
+    sí tiene la réplica: una cota superior, que no subestima el retraso
+    aunque el primario siga escribiendo.
+    """
+    now = now or timezone.now()
+    try:
+        primary = dict(DataGeneration.objects.using(PRIMARY).values_list('key', 'value'))
+        replica = {
+            key: (value, changed_at)
+            for key, value, changed_at in DataGeneration.objects.using(alias).values_list('key', 'value', 'changed_at')
+        }
+    except DatabaseError:
+        logger.warning('No se pudo leer la réplica %s', alias, exc_info=True)
+        return None
+    behind = [key for key, value in primary.items() if replica.get(key, (0, None))[0] < value]
+    if not behind:
+        return 0.0
+    seen = [replica[key][1] for key in behind if key in replica and replica[key][1]]
+    if not seen:
+        return float('inf')
+    return max((now - min(seen)).total_seconds(), 0.0)
+
+
+@contextmanager
+def read_from_primary():
+    """
+    Leer del primario dentro del bloque
+
+    Para los lectores con cursor (feed de cambios, sondeo de TodoEvent):
+    una réplica con retraso les haría avanzar el cursor sobre filas que aún
+    no tiene y esas filas no se entregarían nunca.
+    """
+    if _primary_state.get() is not None:
+        yield
+        return
+    token = _primary_state.set(PINNED)
+    try:
+        yield
+    finally:
+        # Si el bloque escribió se conserva WRITTEN para la cookie del middleware
+        if _primary_state.get() == PINNED:
+            _primary_state.reset(token)
+
+
+class ReplicaMonitor:
+    """Recordar durante TODO_REPLICA_CHECK_INTERVAL segundos si cada réplica está al día"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked = {}
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'TODO_REPLICA_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+        now = time.monotonic()
+        with self.lock:
+            checked = self.checked.get(alias)
+        if checked and now - checked[0] < interval:
+            return checked[1]
+
+        lag = replica_lag(alias)
+        healthy = lag is not None and lag <= getattr(settings, 'TODO_REPLICA_MAX_LAG', DEFAULT_MAX_LAG)
+        with self.lock:
+            self.checked[alias] = (now, healthy)
+        return healthy
+
+    def reset(self):
+        with self.lock:
+            self.checked.clear()
+
+
+monitor = ReplicaMonitor()
+
+
+class ReplicaRouter:
+    """
+    Lecturas en las réplicas (TODO_READ_REPLICAS) y escrituras en el primario
+
+    Las lecturas vuelven al primario si:
+    - la petición viene de un cliente que escribió hace poco (cookie de
+      PrimaryStickinessMiddleware);
+    - el contexto ya escribió o está dentro de read_from_primary;
+    - hay una transacción abierta en el primario;
+    - ninguna réplica está al día (TODO_REPLICA_MAX_LAG).
+    Sin réplicas configuradas todo va al primario.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _primary_state.get() is not None or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = [alias for alias in replica_aliases() if monitor.is_healthy(alias)]
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _primary_state.set(WRITTEN)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas son copias del primario
+        return False if db in replica_aliases() else None
+
+
+@sync_and_async_middleware
+def primary_stickiness_middleware(get_response):
+    """
+    Mantener en el primario a los clientes que acaban de escribir
+
+    Una petición que escribe responde con una cookie que dura
+    TODO_PRIMARY_STICKY_SECONDS; mientras exista, las lecturas de ese
+    cliente van al primario y ve sus propios cambios aunque las réplicas
+    aún no los tengan.
+    """
+    def start(request):
+        return _primary_state.set(STICKY if STICKY_COOKIE in request.COOKIES else None)
+
+    def finish(token, response):
+        if _primary_state.get() == WRITTEN:
+            response.set_cookie(
+                STICKY_COOKIE, '1', samesite='Lax',
+                max_age=getattr(settings, 'TODO_PRIMARY_STICKY_SECONDS', DEFAULT_STICKY_SECONDS),
+            )
+        _primary_state.reset(token)
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = start(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                _primary_state.reset(token)
+                raise
+            return finish(token, response)
+    else:
+        def middleware(request):
+            token = start(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                _primary_state.reset(token)
+                raise
+            return finish(token, response)
+    return middleware
+
+
+def sync_replica(path, using=PRIMARY):
+    """
+    Copiar la base del primario al archivo `path` de una réplica
+
+    Usa la API de backup de SQLite con una conexión propia, de modo que la
+    copia es una instantánea de lo confirmado. La réplica se deja en modo
+    WAL para que sus lectores no bloqueen la copia siguiente.
+    """
+    source = sqlite3.connect(connections[using].settings_dict['NAME'], uri=True)
+    target = sqlite3.connect(path, timeout=30)
+    try:
+        target.execute('PRAGMA journal_mode=WAL')
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
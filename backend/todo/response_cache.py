@@ -0,0 +1,107 @@
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .generations import read_generations
+
+
+DEFAULT_TIMEOUT = 300
+# Cabeceras que se recalculan al responder
+UNCACHED_HEADERS = {'content-length'}
+
+
+def response_cache():
+    return caches[getattr(settings, 'TODO_RESPONSE_CACHE', 'default')]
+
+
+def response_key(request, keys):
+    """
+    Clave de la respuesta: URL, Accept y las generaciones de sus conjuntos
+
+    Las generaciones se leen de DataGeneration (una consulta por clave
+    primaria), de modo que una escritura de cualquier proceso cambia la
+    clave aunque cada proceso tenga su propia caché.
+    """
+    generations = read_generations(*keys)
+    parts = [request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+    parts += [f'{key}:{generations[key][0]}' for key in keys]
+    return 'todo:response:' + hashlib.md5('|'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def lookup(request, keys):
+    """(clave, respuesta guardada o None)"""
+    key = response_key(request, keys)
+    return key, response_cache().get(key)
+
+
+def cached_response(request, cached):
+    """Respuesta (o 304) a partir de lo guardado: (contenido, cabeceras)"""
+    content, headers = cached
+    last_modified = parse_http_date_safe(headers['Last-Modified']) if 'Last-Modified' in headers else None
+    response = get_conditional_response(request, etag=headers.get('ETag'), last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(content)
+    for name, value in headers.items():
+        if response.status_code == 200 or name.lower() != 'content-type':
+            response[name] = value
+    return response
+
+
+def store_after_render(response, key):
+    """Guardar la respuesta 200 cuando DRF la haya renderizado"""
+    if not isinstance(response, Response) or response.status_code != 200:
+        return response
+
+    def store(rendered):
+        # Todas las cabeceras (Vary, Allow...): un acierto responde igual que la vista
+        headers = {name: value for name, value in rendered.items() if name.lower() not in UNCACHED_HEADERS}
+        timeout = getattr(settings, 'TODO_RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        response_cache().set(key, (rendered.content, headers), timeout)
+
+    response.add_post_render_callback(store)
+    return response
+
+
+def cache_response(*keys):
+    """
+    Guardar las respuestas GET en la caché de Django (TODO_RESPONSE_CACHE)
+
+    La clave incluye la generación de cada conjunto de `keys`, que
+    bump_generation incrementa en cada escritura, así que la invalidación
+    es exacta también con una caché por proceso; un acierto hace una sola
+    consulta. Las generaciones se leen antes de ejecutar la vista: lo
+    guardado nunca es más antiguo que su clave. Va por fuera de
+    conditional_get; los aciertos responden 304 con el ETag guardado.
+    """
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+            @wraps(view_method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view_method(self, request, *args, **kwargs)
+
+                key, cached = await sync_to_async(lookup)(request, keys)
+                if cached is not None:
+                    return cached_response(request, cached)
+                return store_after_render(await view_method(self, request, *args, **kwargs), key)
+            return async_wrapper
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_method(self, request, *args, **kwargs)
+
+            key, cached = lookup(request, keys)
+            if cached is not None:
+                return cached_response(request, cached)
+            return store_after_render(view_method(self, request, *args, **kwargs), key)
+        return wrapper
+    return decorator
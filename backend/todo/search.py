@@ -0,0 +1,54 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import TodoSearchIndex
+
+
+SEARCH_TABLE = TodoSearchIndex._meta.db_table
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Disponibilidad del índice FTS5 por alias de base de datos
+_available = {}
+
+
+def search_index_available(using='default'):
+    """Indicar si existe la tabla FTS5 (SQLite compilado con FTS5 y migrado)"""
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available[using]
+
+
+def build_match_query(text):
+    """
+    Convertir el texto del usuario en una consulta MATCH de FTS5
+
+    Cada palabra se cita (para neutralizar la sintaxis de FTS5) y se busca
+    como prefijo; las palabras se combinan con AND implícito.
+    """
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(text))
+
+
+def search_todos(queryset, text):
+    """Filtrar tareas por texto, ordenadas por relevancia si hay índice FTS5"""
+    match = build_match_query(text)
+    if match and search_index_available(queryset.db):
+        return queryset.filter(search_index__document__match=match).order_by(
+            'search_index__rank', *queryset.model._meta.ordering
+        )
+    return queryset.filter(
+        Q(title__icontains=text) |
+        Q(description__icontains=text)
+    )
+
+
+def rebuild_search_index(using='default'):
+    """Reconstruir el índice FTS5 a partir de la tabla de tareas"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
@@ -1,6 +1,23 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Todo, TodoCategory, TodoAttachment
+from django.utils import timezone
+from .models import Todo, TodoCategory, TodoAttachment, TodoJob
+from .thumbnails import current_thumbnails
+
+
+def apply_completed_at(instance, validated_data):
+    """
+    Reglas de completed_at al actualizar el estado de una tarea
+    
+    Sin status en los datos (p. ej. solo cambiar la prioridad) completed_at se
+    conserva; la misma regla rige para PATCH individual y actualización masiva.
+    """
+    if 'status' not in validated_data:
+        return
+    if validated_data['status'] == 'completed' and instance.status != 'completed':
+        validated_data['completed_at'] = timezone.now()
+    elif validated_data['status'] != 'completed':
+        validated_data['completed_at'] = None
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -14,11 +31,24 @@ class UserSerializer(serializers.ModelSerializer):
 
 class TodoAttachmentSerializer(serializers.ModelSerializer):
     """Serializer para archivos adjuntos"""
+    thumbnail_urls = serializers.SerializerMethodField()
     
     class Meta:
         model = TodoAttachment
-        fields = ['id', 'filename', 'file', 'uploaded_at']
+        fields = ['id', 'todo', 'filename', 'file', 'thumbnail_urls', 'uploaded_at']
         read_only_fields = ['uploaded_at']
+        # La tarea se indica al subir; en las respuestas el adjunto va anidado en ella
+        extra_kwargs = {'todo': {'write_only': True}}
+    
+    def get_thumbnail_urls(self, obj):
+        """URLs de las miniaturas ya generadas: {tamaño: {formato: url}} ({} mientras no las hay)"""
+        request = self.context.get('request')
+        urls = {}
+        for size, formats in current_thumbnails(obj).items():
+            for image_format, name in formats.items():
+                url = obj.file.storage.url(name)
+                urls.setdefault(size, {})[image_format] = request.build_absolute_uri(url) if request else url
+        return urls
 
 
 class TodoCategorySerializer(serializers.ModelSerializer):
@@ -31,7 +61,9 @@ class TodoCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
     
     def get_tasks_count(self, obj):
-        """Contar tareas en esta categoría"""
+        """Contar tareas en esta categoría (anotado por with_tasks_count si está disponible)"""
+        if hasattr(obj, 'tasks_count'):
+            return obj.tasks_count
         return obj.todo_set.count()
 
 
@@ -63,7 +95,6 @@ class TodoSerializer(serializers.ModelSerializer):
         """Calcular días hasta la fecha límite"""
         if not obj.due_date:
             return None
-        from django.utils import timezone
         delta = obj.due_date.date() - timezone.now().date()
         return delta.days
     
@@ -74,12 +105,8 @@ class TodoSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Actualizar tarea existente"""
         # Si se marca como completada, establecer la fecha de completado
-        if validated_data.get('status') == 'completed' and instance.status != 'completed':
-            from django.utils import timezone
-            validated_data['completed_at'] = timezone.now()
-        elif validated_data.get('status') != 'completed':
-            validated_data['completed_at'] = None
-            
+        apply_completed_at(instance, validated_data)
+        
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
@@ -97,6 +124,49 @@ class TodoCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que busca primero en objetos precargados
+    
+    Las operaciones masivas cargan de una vez los usuarios y categorías
+    referenciados (context['preloaded'][Modelo] = {pk: objeto}) para no
+    hacer una consulta por elemento.
+    """
+    
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in preloaded:
+            self.fail('does_not_exist', pk_value=data)
+        return preloaded[pk]
+
+
+class TodoBulkCreateSerializer(TodoCreateSerializer):
+    """Serializer de cada elemento en la creación masiva de tareas"""
+    user = PreloadedPrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
+    category = PreloadedPrimaryKeyRelatedField(queryset=TodoCategory.objects.all(), required=False, allow_null=True)
+
+
+class TodoBulkUpdateSerializer(TodoBulkCreateSerializer):
+    """Serializer de cada elemento en la actualización masiva (id obligatorio)"""
+    id = serializers.IntegerField()
+    
+    class Meta(TodoBulkCreateSerializer.Meta):
+        fields = ['id'] + TodoBulkCreateSerializer.Meta.fields
+
+
+class TodoBulkDeleteSerializer(serializers.Serializer):
+    """Serializer para la eliminación masiva de tareas"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
 class TodoUpdateStatusSerializer(serializers.ModelSerializer):
     """Serializer para actualizar solo el estado de una tarea"""
     
@@ -106,14 +176,10 @@ class TodoUpdateStatusSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         """Actualizar solo el estado"""
-        new_status = validated_data.get('status')
-        if new_status == 'completed' and instance.status != 'completed':
-            from django.utils import timezone
-            instance.completed_at = timezone.now()
-        elif new_status != 'completed':
-            instance.completed_at = None
-            
-        instance.status = new_status
+        apply_completed_at(instance, validated_data)
+        
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
         instance.save()
         return instance
 
@@ -129,3 +195,25 @@ class TodoStatsSerializer(serializers.Serializer):
     completion_rate = serializers.FloatField()
     tasks_by_priority = serializers.DictField()
     tasks_by_category = serializers.DictField()
+
+
+class DashboardSerializer(serializers.Serializer):
+    """Serializer para los datos del panel de inicio"""
+    stats = TodoStatsSerializer()
+    categories = TodoCategorySerializer(many=True)
+    users = UserSerializer(many=True)
+    overdue = TodoSerializer(many=True)
+    high_priority = TodoSerializer(many=True)
+
+
+class TodoJobSerializer(serializers.ModelSerializer):
+    """Estado de un trabajo en segundo plano (sin sus parámetros)"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = TodoJob
+        fields = [
+            'id', 'task', 'status', 'status_display', 'priority', 'attempts', 'max_attempts',
+            'run_at', 'result', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
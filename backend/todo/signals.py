@@ -0,0 +1,181 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .blobs import add_reference, release_reference
+from .changes import record_deletion
+from .counters import apply_delete, apply_save, ensure_state, move_category_counters, remember_state
+from .events import attachment_event, category_event, publish_event, todo_event
+from .generations import bump_generation
+from .jobs import enqueue
+from .models import DataGeneration, Todo, TodoAttachment, TodoCategory
+from .serializers import UserSerializer
+from .thumbnails import is_image, thumbnail_queue
+
+
+@receiver(post_init, sender=Todo)
+def remember_todo_state(sender, instance, **kwargs):
+    """Recordar el estado inicial de la tarea para calcular los cambios al guardar"""
+    remember_state(instance)
+
+
+@receiver(pre_save, sender=Todo)
+@receiver(pre_delete, sender=Todo)
+def load_todo_state(sender, instance, **kwargs):
+    """Asegurar que se conoce el estado persistido antes de modificar la tarea"""
+    if not instance._state.adding:
+        ensure_state(instance)
+
+
+@receiver(post_save, sender=Todo)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    """Actualizar los contadores al crear o modificar una tarea"""
+    apply_save(instance, created)
+
+
+@receiver(post_delete, sender=Todo)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Actualizar los contadores al eliminar una tarea"""
+    apply_delete(instance)
+
+
+@receiver(pre_delete, sender=TodoCategory)
+def move_counters_on_category_delete(sender, instance, **kwargs):
+    """Las tareas de una categoría eliminada quedan sin categoría (SET_NULL)"""
+    move_category_counters(instance.pk)
+
+
+@receiver(post_delete, sender=Todo)
+def record_todo_deletion(sender, instance, **kwargs):
+    """Dejar un tombstone para el feed de cambios (también en borrados masivos y en cascada)"""
+    record_deletion(instance.pk)
+
+
+@receiver(post_save, sender=TodoAttachment)
+@receiver(post_delete, sender=TodoAttachment)
+def touch_attachment_todo(sender, instance, origin=None, **kwargs):
+    """Los adjuntos forman parte de la tarea: marcarla como modificada"""
+    if isinstance(origin, Todo) or getattr(origin, 'model', None) is Todo:
+        return  # Se borra en cascada con su tarea
+    Todo.objects.filter(pk=instance.todo_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=TodoCategory)
+@receiver(pre_delete, sender=TodoCategory)
+def touch_category_todos(sender, instance, created=False, **kwargs):
+    """Las tareas muestran los datos de su categoría: marcarlas como modificadas"""
+    if not created:
+        Todo.objects.filter(category_id=instance.pk).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Todo)
+@receiver(post_delete, sender=Todo)
+@receiver(post_save, sender=TodoAttachment)
+@receiver(post_delete, sender=TodoAttachment)
+def bump_todos_generation(sender, **kwargs):
+    """Invalidar los validadores de las respuestas de tareas"""
+    bump_generation(DataGeneration.TODOS)
+
+
+@receiver(post_save, sender=TodoCategory)
+@receiver(post_delete, sender=TodoCategory)
+def bump_categories_generation(sender, **kwargs):
+    """Invalidar los validadores de las respuestas de categorías"""
+    bump_generation(DataGeneration.CATEGORIES)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users_generation(sender, update_fields=None, **kwargs):
+    """
+    Invalidar los validadores de las respuestas de usuarios
+    
+    Un guardado que solo toca campos que UserSerializer no devuelve (como
+    el last_login que Django actualiza en cada inicio de sesión) no cambia
+    ninguna respuesta.
+    """
+    if update_fields and not update_fields & set(UserSerializer.Meta.fields):
+        return
+    bump_generation(DataGeneration.USERS)
+
+
+@receiver(pre_save, sender=Todo)
+def remember_event_state(sender, instance, **kwargs):
+    """Guardar el estado anterior para el evento (después de load_todo_state, que lo carga)"""
+    instance._event_state = getattr(instance, '_counter_state', None)
+
+
+@receiver(post_save, sender=Todo)
+def publish_todo_saved(sender, instance, created, **kwargs):
+    """Publicar todo.created, todo.updated o todo.status en el stream de eventos"""
+    if created:
+        publish_event(todo_event('created', instance))
+    else:
+        publish_event(todo_event('updated', instance, getattr(instance, '_event_state', None)))
+
+
+@receiver(post_delete, sender=Todo)
+def publish_todo_deleted(sender, instance, **kwargs):
+    """Publicar todo.deleted (también en borrados masivos y en cascada)"""
+    publish_event(todo_event('deleted', instance))
+
+
+@receiver(post_save, sender=TodoCategory)
+@receiver(post_delete, sender=TodoCategory)
+def publish_category_event(sender, instance, created=None, **kwargs):
+    """Publicar category.created, category.updated o category.deleted"""
+    action = 'deleted' if created is None else 'created' if created else 'updated'
+    publish_event(category_event(action, instance))
+
+
+@receiver(post_save, sender=TodoAttachment)
+@receiver(post_delete, sender=TodoAttachment)
+def publish_attachment_event(sender, instance, created=None, origin=None, **kwargs):
+    """Publicar attachment.*, con el usuario y la categoría de la tarea para poder filtrar"""
+    if isinstance(origin, Todo) or getattr(origin, 'model', None) is Todo:
+        return  # El evento todo.deleted ya lo cubre
+    action = 'deleted' if created is None else 'created' if created else 'updated'
+    owner = Todo.objects.filter(pk=instance.todo_id).values_list('user_id', 'category_id').first()
+    user_id, category_id = owner or (None, None)
+    publish_event(attachment_event(action, instance, user_id, category_id))
+
+
+@receiver(pre_save, sender=TodoAttachment)
+def remember_attachment_file(sender, instance, **kwargs):
+    """Recordar el archivo guardado para mover su referencia si el adjunto lo cambia"""
+    if not instance._state.adding:
+        instance._stored_file = sender.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+
+@receiver(post_save, sender=TodoAttachment)
+def add_blob_reference(sender, instance, created, **kwargs):
+    """Contar el adjunto como referencia de su archivo (almacenamiento por contenido)"""
+    previous = None if created else getattr(instance, '_stored_file', None)
+    if created or previous != instance.file.name:
+        add_reference(instance.file.name)
+        if previous:
+            release_reference(previous)
+
+
+@receiver(post_delete, sender=TodoAttachment)
+def release_blob_reference(sender, instance, **kwargs):
+    """Liberar la referencia del adjunto eliminado (también en cascada con su tarea)"""
+    release_reference(instance.file.name)
+
+
+@receiver(post_save, sender=TodoAttachment)
+def schedule_thumbnails(sender, instance, created, **kwargs):
+    """Generar las miniaturas de las imágenes en segundo plano (cola local o TodoJob)"""
+    if created or getattr(instance, '_stored_file', None) != instance.file.name:
+        if not instance.file.name or not is_image(instance):
+            return
+        if getattr(settings, 'TODO_THUMBNAIL_QUEUE', 'local') == 'jobs':
+            # En la misma transacción que el adjunto: no se pierde aunque el proceso termine
+            enqueue('thumbnails.build', {'attachment_id': instance.pk}, priority=-1)
+        else:
+            transaction.on_commit(partial(thumbnail_queue.submit, instance.pk))
@@ -0,0 +1,88 @@
+from django.db.models import Q, Count
+from django.utils import timezone
+from .models import Todo, UNRESOLVED_STATUSES
+
+
+UNCATEGORIZED_LABEL = 'Sin categoría'
+
+
+def compute_todo_stats(queryset):
+    """
+    Calcular las estadísticas de un queryset de tareas en una sola consulta
+
+    Agrupa por categoría y usa agregación condicional para obtener en el
+    mismo recorrido los totales por estado, prioridad y vencimiento; los
+    grupos se suman en Python (una fila por categoría).
+    """
+    return summarize_stats_rows(stats_rows(queryset))
+
+
+async def acompute_todo_stats(queryset):
+    """compute_todo_stats con el ORM asíncrono"""
+    return summarize_stats_rows([row async for row in stats_rows(queryset)])
+
+
+def stats_rows(queryset):
+    """Consulta con los totales por categoría (claves de empty_totals)"""
+    now = timezone.now()
+    aggregates = {'total': Count('id')}
+    for status_value, _ in Todo.STATUS_CHOICES:
+        aggregates[f'status_{status_value}'] = Count('id', filter=Q(status=status_value))
+    for priority_value, _ in Todo.PRIORITY_CHOICES:
+        aggregates[f'priority_{priority_value}'] = Count('id', filter=Q(priority=priority_value))
+    aggregates['overdue'] = Count(
+        'id', filter=Q(due_date__lt=now, status__in=UNRESOLVED_STATUSES)
+    )
+
+    return (
+        queryset.order_by()
+        .values('category__name')
+        .annotate(**aggregates)
+    )
+
+
+def summarize_stats_rows(rows):
+    totals = empty_totals()
+    tasks_by_category = {}
+    for row in rows:
+        for key in totals:
+            totals[key] += row[key]
+        label = row['category__name'] or UNCATEGORIZED_LABEL
+        tasks_by_category[label] = tasks_by_category.get(label, 0) + row['total']
+
+    return build_stats_payload(totals, tasks_by_category)
+
+
+def empty_totals():
+    """Contadores en cero con las mismas claves que usa compute_todo_stats"""
+    totals = {'total': 0, 'overdue': 0}
+    for status_value, _ in Todo.STATUS_CHOICES:
+        totals[f'status_{status_value}'] = 0
+    for priority_value, _ in Todo.PRIORITY_CHOICES:
+        totals[f'priority_{priority_value}'] = 0
+    return totals
+
+
+def build_stats_payload(totals, tasks_by_category):
+    """Construir la respuesta de estadísticas a partir de los contadores"""
+    total_tasks = totals['total']
+    completed_tasks = totals['status_completed']
+    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+
+    tasks_by_priority = {
+        priority_value: totals[f'priority_{priority_value}']
+        for priority_value, _ in Todo.PRIORITY_CHOICES
+        if totals[f'priority_{priority_value}']
+    }
+
+    return {
+        'total_tasks': total_tasks,
+        'pending_tasks': totals['status_pending'],
+        'completed_tasks': completed_tasks,
+        'in_progress_tasks': totals['status_in_progress'],
+        'cancelled_tasks': totals['status_cancelled'],
+        'overdue_tasks': totals['overdue'],
+        'completion_rate': round(completion_rate, 2),
+        'tasks_by_priority': tasks_by_priority,
+        'tasks_by_category': tasks_by_category,
+    }
@@ -0,0 +1,68 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+TEMP_PREFIX = '.upload-'
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Almacenamiento de archivos por contenido (SHA-256)
+
+    Cada archivo se guarda una sola vez en `<blob_dir>/ab/cd/<sha256>`: el
+    hash se calcula mientras se copia la subida a un temporal del mismo
+    sistema de archivos, que después se renombra. Si el contenido ya
+    existía se descarta la copia y se devuelve el nombre existente. El
+    nombre de la subida no se usa (el nombre visible es
+    TodoAttachment.filename). Los archivos anteriores, guardados por
+    nombre, se siguen leyendo igual.
+    """
+
+    def __init__(self, blob_dir='blobs', **kwargs):
+        super().__init__(**kwargs)
+        self.blob_dir = blob_dir.strip('/')
+
+    def blob_name(self, digest):
+        return f'{self.blob_dir}/{digest[:2]}/{digest[2:4]}/{digest}'
+
+    def digest_of(self, name):
+        """SHA-256 del blob `name`, o None si no es un nombre por contenido"""
+        digest = name.rsplit('/', 1)[-1]
+        if DIGEST_RE.match(digest) and name == self.blob_name(digest):
+            return digest
+        return None
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo depende del contenido (_save)
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(self.blob_dir)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            name = self.blob_name(digest.hexdigest())
+            path = self.path(name)
+            if os.path.exists(path):
+                # Renovar la fecha para que el recolector respete el periodo de gracia
+                os.utime(path)
+                os.unlink(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return name
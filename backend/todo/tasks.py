@@ -0,0 +1,68 @@
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .bulk import BulkValidationError, bulk_update_todos
+from .counters import rebuild_counters
+from .export import iter_export_rows, stream_export
+from .filters import filter_todos
+from .jobs import PermanentJobError, task
+from .models import Todo
+from .renderers import CSVRenderer, NDJSONRenderer
+from .thumbnails import build_thumbnails
+
+
+EXPORT_RENDERERS = {renderer.format: renderer for renderer in (NDJSONRenderer, CSVRenderer)}
+
+
+@task('todos.export')
+def export_todos(job):
+    """
+    Exportar a un archivo las tareas filtradas
+
+    payload: {'format': 'ndjson' | 'csv', 'params': filtros del listado}.
+    El archivo se escribe por bloques en un temporal y se guarda en
+    exports/; se descarga desde /api/jobs/<id>/download/.
+    """
+    renderer_class = EXPORT_RENDERERS.get(job.payload.get('format', NDJSONRenderer.format))
+    if renderer_class is None:
+        raise PermanentJobError(f"Formato de exportación no válido: {job.payload.get('format')}")
+    renderer = renderer_class()
+    queryset = filter_todos(Todo.objects.all(), job.payload.get('params') or {})
+
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with tempfile.TemporaryFile() as temp:
+        for chunk in stream_export(renderer, counted(iter_export_rows(queryset))):
+            temp.write(chunk.encode(renderer.charset))
+        name = default_storage.save(f'exports/todos-{job.pk}.{renderer.format}', File(temp))
+    return {'file': name, 'format': renderer.format, 'rows': count}
+
+
+@task('todos.bulk_update')
+def bulk_update(job):
+    """Actualización masiva (payload: {'items': [...]}, como PATCH /api/todos/bulk-update/)"""
+    try:
+        todos = bulk_update_todos(job.payload.get('items') or [])
+    except BulkValidationError as error:
+        raise PermanentJobError('Errores de validación', {'errors': error.errors})
+    return {'updated': len(todos), 'ids': [todo.id for todo in todos]}
+
+
+@task('counters.rebuild')
+def rebuild_todo_counters(job):
+    """Recalcular los contadores de estadísticas"""
+    return {'rows': rebuild_counters()}
+
+
+@task('thumbnails.build')
+def thumbnails(job):
+    """Generar las miniaturas de un adjunto (payload: {'attachment_id': id})"""
+    return {'thumbnails': build_thumbnails(job.payload['attachment_id'])}
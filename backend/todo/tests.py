@@ -1,3 +1,1866 @@
-from django.test import TestCase
+import asyncio
+import copy
+import csv
+import hashlib
+import inspect
+import json
+import re
+import sqlite3
+from array import array
+import tempfile
+import warnings
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .benchmarks import (
+    UNBOUNDED_MAX_SIZE, compare_with_baseline, is_full_scan, json_payloads, mixed_operations, run_benchmarks,
+    run_concurrency_benchmark, run_json_benchmark, run_mixed_benchmark, use_async_views
+)
+from .blobs import blob_storage, collect_garbage
+from .changes import DELETION_LOG_RETENTION, encode_token, prune_deletions
+from .counters import check_counters, read_counter_stats
+from .events import DEFAULT_QUEUE_SIZE, DatabaseEventBackend, broadcaster
+from .generations import read_generations
+from .jobs import TASKS, Worker, claim_jobs, enqueue, execute_job
+from .maintenance import run_maintenance
+from .management.commands.create_sample_data import deferred_indexes
+from .models import (
+    UNRESOLVED_DUE_INDEX, AttachmentBlob, DataGeneration, Todo, TodoAttachment, TodoCategory, TodoCounter, TodoDeletion,
+    TodoEvent, TodoJob
+)
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .response_cache import lookup, response_cache
+from .replicas import STICKY_COOKIE, ReplicaRouter, monitor as replica_monitor, replica_lag, sync_replica
+from .serializers import TodoUpdateStatusSerializer
+from .stats import compute_todo_stats
+from .thumbnails import ThumbnailQueue, build_thumbnails, current_thumbnails
+
+
+class TodoStatsTests(TestCase):
+    """Pruebas del endpoint de estadísticas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='ana')
+        cls.other_user = User.objects.create(username='luis')
+        cls.work = TodoCategory.objects.create(name='Trabajo')
+        cls.home = TodoCategory.objects.create(name='Hogar')
+        past = timezone.now() - timedelta(days=2)
+        future = timezone.now() + timedelta(days=2)
+
+        Todo.objects.create(title='Informe', status='pending', priority='high',
+                            category=cls.work, user=cls.user, due_date=past)
+        Todo.objects.create(title='Reunión', status='in_progress', priority='urgent',
+                            category=cls.work, user=cls.user, due_date=future)
+        Todo.objects.create(title='Cocina', status='completed', priority='low',
+                            category=cls.home, user=cls.other_user, due_date=past)
+        Todo.objects.create(title='Correo', status='cancelled', priority='medium',
+                            user=cls.other_user)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_stats_unfiltered(self):
+        response = self.client.get('/api/todos/stats/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_tasks'], 4)
+        self.assertEqual(data['pending_tasks'], 1)
+        self.assertEqual(data['in_progress_tasks'], 1)
+        self.assertEqual(data['completed_tasks'], 1)
+        self.assertEqual(data['cancelled_tasks'], 1)
+        self.assertEqual(data['overdue_tasks'], 1)
+        self.assertEqual(data['completion_rate'], 25.0)
+        self.assertEqual(data['tasks_by_priority'],
+                         {'low': 1, 'medium': 1, 'high': 1, 'urgent': 1})
+        self.assertEqual(data['tasks_by_category'],
+                         {'Trabajo': 2, 'Hogar': 1, 'Sin categoría': 1})
+
+    def test_stats_honors_filters(self):
+        response = self.client.get('/api/todos/stats/', {'user': self.user.id})
+        data = response.json()
+        self.assertEqual(data['total_tasks'], 2)
+        self.assertEqual(data['tasks_by_category'], {'Trabajo': 2})
+
+        response = self.client.get('/api/todos/stats/', {'overdue': 'true'})
+        data = response.json()
+        self.assertEqual(data['total_tasks'], 1)
+        self.assertEqual(data['overdue_tasks'], 1)
+
+        response = self.client.get('/api/todos/stats/', {'search': 'cocina'})
+        self.assertEqual(response.json()['completed_tasks'], 1)
+
+    def test_counter_path_matches_aggregate(self):
+        cases = [
+            ({}, {}),
+            ({'user_id': self.user.id}, {'user_id': self.user.id}),
+            ({'category_id': self.work.id}, {'category_id': self.work.id}),
+            ({'user_id': self.other_user.id, 'status': 'completed'},
+             {'user_id': self.other_user.id, 'status': 'completed'}),
+        ]
+        for counter_filters, queryset_filters in cases:
+            self.assertEqual(
+                read_counter_stats(**counter_filters),
+                compute_todo_stats(Todo.objects.filter(**queryset_filters)),
+            )
+
+    def test_stats_empty(self):
+        response = self.client.get('/api/todos/stats/', {'status': 'pending', 'priority': 'low'})
+        data = response.json()
+        self.assertEqual(data['total_tasks'], 0)
+        self.assertEqual(data['completion_rate'], 0)
+        self.assertEqual(data['tasks_by_priority'], {})
+        self.assertEqual(data['tasks_by_category'], {})
+
+    def test_stats_query_count(self):
+        # Cada petición suma 2 consultas de validadores (generaciones y última fecha límite)
+        with self.assertNumQueries(4):
+            self.client.get('/api/todos/stats/')
+        with self.assertNumQueries(4):
+            self.client.get('/api/todos/stats/', {'user': self.user.id, 'category': self.work.id})
+        with self.assertNumQueries(3):
+            self.client.get('/api/todos/stats/', {
+                'status': 'pending', 'priority': 'high', 'category': self.work.id,
+                'user': self.user.id, 'search': 'inf', 'overdue': 'true',
+            })
+
+
+class TodoCounterTests(TestCase):
+    """Pruebas del mantenimiento incremental de los contadores"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='ana')
+        self.work = TodoCategory.objects.create(name='Trabajo')
+        self.todo = Todo.objects.create(title='Informe', user=self.user, category=self.work)
+
+    def assertCountersConsistent(self):
+        self.assertEqual(check_counters(), [])
+
+    def global_count(self, **lookup):
+        counters = TodoCounter.objects.filter(scope=TodoCounter.SCOPE_GLOBAL, **lookup)
+        return sum(counter.count for counter in counters)
+
+    def test_create_update_delete(self):
+        self.assertEqual(self.global_count(status='pending'), 1)
+        self.todo.priority = 'urgent'
+        self.todo.save()
+        self.assertCountersConsistent()
+        self.todo.delete()
+        self.assertCountersConsistent()
+        self.assertEqual(self.global_count(), 0)
+
+    def test_mark_as_completed_and_status_serializer(self):
+        self.todo.mark_as_completed()
+        self.assertEqual(self.global_count(status='completed'), 1)
+        serializer = TodoUpdateStatusSerializer(self.todo, data={'status': 'in_progress'}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.assertEqual(self.global_count(status='in_progress'), 1)
+        self.assertCountersConsistent()
+
+    def test_deferred_instance_save(self):
+        todo = Todo.objects.only('id', 'title').get(pk=self.todo.pk)
+        todo.status = 'cancelled'
+        todo.save()
+        self.assertCountersConsistent()
+
+    def test_queryset_and_bulk_operations(self):
+        Todo.objects.bulk_create([
+            Todo(title=f'Tarea {i}', priority='low', user=self.user if i % 2 else None)
+            for i in range(5)
+        ])
+        self.assertCountersConsistent()
+        Todo.objects.filter(priority='low').update(status='completed', category=self.work)
+        self.assertCountersConsistent()
+        todos = list(Todo.objects.filter(priority='low'))
+        for todo in todos:
+            todo.priority = 'high'
+        Todo.objects.bulk_update(todos, ['priority'])
+        self.assertCountersConsistent()
+        Todo.objects.filter(priority='high').delete()
+        self.assertCountersConsistent()
+
+    def test_category_and_user_delete(self):
+        self.work.delete()
+        self.assertCountersConsistent()
+        self.user.delete()
+        self.assertCountersConsistent()
+
+    def test_rebuild_command(self):
+        TodoCounter.objects.update(count=99)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_todo_counters', '--check', stdout=StringIO())
+        call_command('rebuild_todo_counters', stdout=StringIO())
+        self.assertCountersConsistent()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+class TodoQueryPlanTests(TestCase):
+    """Verificar con EXPLAIN que los listados usan índices"""
+
+    INDEX_SEARCH = re.compile(r'^SEARCH todo_todo USING (COVERING )?INDEX\b')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='ana')
+        cls.work = TodoCategory.objects.create(name='Trabajo')
+        Todo.objects.create(title='Informe', priority='high', user=cls.user, category=cls.work,
+                            due_date=timezone.now() - timedelta(days=1))
+
+    def query_plans(self, url, params=None):
+        """Planes de las consultas sobre todo_todo de una petición"""
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        for query in context.captured_queries:
+            if 'FROM "todo_todo"' not in query['sql']:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append((query['sql'], [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertIndexSearch(self, url, params=None):
+        """Cada consulta filtrada busca en un índice y ninguna recorre la tabla ni un índice entero"""
+        for sql, plan in self.query_plans(url, params):
+            self.assertTrue(any(self.INDEX_SEARCH.match(step) for step in plan), f'{url} {params}: {sql} {plan}')
+            for step in plan:
+                self.assertFalse(is_full_scan(sql, step), f'{url} {params}: {sql} {plan}')
+
+    def assertBoundedIndexWalk(self, url, params=None):
+        """El listado sin filtros puede recorrer un índice en orden (lo acota el LIMIT), nunca la tabla"""
+        for sql, plan in self.query_plans(url, params):
+            for step in plan:
+                self.assertFalse(is_full_scan(sql, step), f'{url} {params}: {sql} {plan}')
+
+    def assertOverdueUsesPartialIndex(self, url, params=None):
+        """Las consultas de vencidas (filtran por due_date) usan el índice parcial"""
+        plans = [(sql, plan) for sql, plan in self.query_plans(url, params) if '"due_date" <' in sql]
+        self.assertTrue(plans, url)
+        for sql, plan in plans:
+            self.assertIn(f'USING INDEX {UNRESOLVED_DUE_INDEX}', ' '.join(plan), f'{url} {params}: {sql} {plan}')
+
+    def test_default_list_walks_an_index(self):
+        self.assertBoundedIndexWalk('/api/todos/')
+        self.assertBoundedIndexWalk('/api/todos/', {'pagination': 'cursor'})
+
+    def test_list_filters_use_indexes(self):
+        for params in ({'status': 'pending'}, {'priority': 'high'}, {'category': self.work.id},
+                       {'user': self.user.id}, {'overdue': 'true'}, {'status': 'pending', 'pagination': 'cursor'}):
+            self.assertIndexSearch('/api/todos/', params)
+
+    def test_overdue_and_high_priority_use_indexes(self):
+        self.assertIndexSearch('/api/todos/overdue/')
+        self.assertIndexSearch('/api/todos/high-priority/')
+
+    def test_index_walk_counts_as_full_scan_when_filtered(self):
+        step = 'SCAN todo_todo USING INDEX todo_created_priority_idx'
+        self.assertFalse(is_full_scan('SELECT * FROM "todo_todo" ORDER BY "created_at" DESC LIMIT 20', step))
+        self.assertTrue(is_full_scan('SELECT * FROM "todo_todo" WHERE "title" = %s LIMIT 20', step))
+        self.assertTrue(is_full_scan('SELECT * FROM "todo_todo"', 'SCAN todo_todo'))
+
+    def test_overdue_count_uses_partial_index(self):
+        for params in ({}, {'category': self.work.id}, {'status': 'pending'}):
+            self.assertOverdueUsesPartialIndex('/api/todos/stats/', params)
+
+    def test_overdue_lists_use_partial_index(self):
+        self.assertOverdueUsesPartialIndex('/api/todos/overdue/')
+        self.assertOverdueUsesPartialIndex('/api/todos/', {'overdue': 'true'})
+        self.assertOverdueUsesPartialIndex('/api/todos/', {'overdue': 'true', 'pagination': 'cursor'})
+        self.assertOverdueUsesPartialIndex('/api/dashboard/')
+
+
+class TodoKeysetPaginationTests(TestCase):
+    """Pruebas de la paginación por cursor del listado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='ana')
+        Todo.objects.bulk_create([
+            Todo(title=f'Tarea {i}', status='pending' if i % 3 else 'completed',
+                 user=cls.user if i % 2 else None)
+            for i in range(45)
+        ])
+        # Fechas repetidas para ejercitar el desempate por id
+        same_time = timezone.now() - timedelta(days=1)
+        Todo.objects.filter(id__in=Todo.objects.order_by('id').values('id')[10:30]).update(created_at=same_time)
+
+    def walk(self, params):
+        client = APIClient()
+        response = client.get('/api/todos/', {'pagination': 'cursor', **params})
+        pages = [response.json()]
+        while pages[-1]['next']:
+            pages.append(client.get(pages[-1]['next']).json())
+        return pages
+
+    def test_walks_all_rows_in_order(self):
+        pages = self.walk({})
+        self.assertEqual(len(pages), 3)
+        self.assertNotIn('count', pages[0])
+        ids = [item['id'] for page in pages for item in page['results']]
+        expected = list(Todo.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link(self):
+        pages = self.walk({})
+        previous = APIClient().get(pages[2]['previous']).json()
+        self.assertEqual(previous['results'], pages[1]['results'])
+        first = APIClient().get(previous['previous']).json()
+        self.assertEqual(first['results'], pages[0]['results'])
+        self.assertIsNone(first['previous'])
+
+    def test_honors_filters(self):
+        pages = self.walk({'status': 'pending', 'user': self.user.id})
+        ids = {item['id'] for page in pages for item in page['results']}
+        expected = set(Todo.objects.filter(status='pending', user=self.user).values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_constant_queries_without_count(self):
+        pages = self.walk({})
+        # Validadores (2) + página de tareas + prefetch de adjuntos, sin COUNT(*)
+        with self.assertNumQueries(4):
+            APIClient().get(pages[1]['next'])
+
+    def test_invalid_cursor(self):
+        response = APIClient().get('/api/todos/', {'pagination': 'cursor', 'cursor': 'xyz'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_unchanged(self):
+        response = APIClient().get('/api/todos/', {'page': 2})
+        self.assertEqual(response.json()['count'], 45)
+
+
+def fts5_supported():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE t USING fts5(x)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+@skipUnless(connection.vendor == 'sqlite' and fts5_supported(), 'SQLite sin FTS5')
+class TodoSearchTests(TestCase):
+    """Pruebas de la búsqueda de texto completo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.report = Todo.objects.create(title='Informe mensual', description='Ventas de julio')
+        cls.meeting = Todo.objects.create(title='Reunión', description='Revisar el informe')
+        cls.kitchen = Todo.objects.create(title='Limpiar cocina')
+
+    def search(self, text):
+        response = APIClient().get('/api/todos/', {'search': text})
+        return [item['id'] for item in response.json()['results']]
+
+    def test_prefix_and_accents(self):
+        self.assertEqual(self.search('coc'), [self.kitchen.id])
+        self.assertEqual(self.search('reunion'), [self.meeting.id])
+        self.assertEqual(self.search('inf jul'), [self.report.id])
+
+    def test_relevance_ordering(self):
+        # Coincidencia en el título antes que en la descripción
+        self.assertEqual(self.search('informe'), [self.report.id, self.meeting.id])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('"informe" (*'), [self.report.id, self.meeting.id])
+        self.assertEqual(self.search('***'), [])
+
+    def test_index_follows_writes(self):
+        self.kitchen.title = 'Lavar platos'
+        self.kitchen.save()
+        self.assertEqual(self.search('cocina'), [])
+        Todo.objects.filter(pk=self.kitchen.pk).update(description='Usar jabón')
+        self.assertEqual(self.search('jabon'), [self.kitchen.id])
+        self.kitchen.delete()
+        self.assertEqual(self.search('lavar'), [])
+
+    def test_rebuild_command(self):
+        call_command('rebuild_todo_search', stdout=StringIO())
+        self.assertEqual(self.search('mensual'), [self.report.id])
+
+
+class TodoExportTests(TestCase):
+    """Pruebas de la exportación en streaming"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.work = TodoCategory.objects.create(name='Trabajo')
+        Todo.objects.bulk_create([
+            Todo(title=f'Tarea, "{i}"', status='completed' if i % 2 else 'pending',
+                 category=cls.work if i % 3 == 0 else None, due_date=timezone.now())
+            for i in range(25)
+        ])
+
+    def export(self, **params):
+        response = APIClient().get('/api/todos/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson(self):
+        response, body = self.export(format='ndjson')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 25)
+        first = Todo.objects.first()
+        expected = APIClient().get(f'/api/todos/{first.id}/').json()
+        self.assertEqual(rows[0]['id'], first.id)
+        for field in ('title', 'created_at', 'due_date', 'status', 'category'):
+            self.assertEqual(rows[0][field], expected[field])
+
+    def test_csv_with_filters(self):
+        response, body = self.export(format='csv', status='pending', category=self.work.id)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(body.splitlines()))
+        expected = Todo.objects.filter(status='pending', category=self.work).count()
+        self.assertEqual(len(rows), expected)
+        self.assertTrue(rows[0]['title'].startswith('Tarea, "'))
+
+    def test_default_format_and_unknown_format(self):
+        response, body = self.export()
+        self.assertEqual(len(body.splitlines()), 25)
+        self.assertEqual(APIClient().get('/api/todos/export/', {'format': 'xml'}).status_code, 404)
+
+    async def test_asgi_streams_without_buffering(self):
+        _, expected = await sync_to_async(self.export)(format='csv')
+        response = await self.async_client.get('/api/todos/export/', {'format': 'csv'})
+        self.assertTrue(response.is_async)
+        with warnings.catch_warnings():
+            # Django avisa cuando tiene que leer entero un iterador síncrono
+            warnings.simplefilter('error')
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+        self.assertEqual(body, expected)
+
+
+class TodoBulkTests(TestCase):
+    """Pruebas de los endpoints masivos"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username='ana')
+        self.work = TodoCategory.objects.create(name='Trabajo')
+
+    def bulk_create(self, size):
+        payload = [
+            {'title': f'Tarea {i}', 'priority': 'high', 'user': self.user.id, 'category': self.work.id}
+            for i in range(size)
+        ] + [{'title': 'Hecha', 'status': 'completed'}]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/todos/bulk-create/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], size + 1)
+        return len(context.captured_queries)
+
+    def test_bulk_create(self):
+        # Tras crear los contadores, las consultas no dependen del número de elementos
+        self.bulk_create(1)
+        self.assertEqual(self.bulk_create(5), self.bulk_create(60))
+        self.assertEqual(Todo.objects.filter(user=self.user, category=self.work).count(), 66)
+        self.assertIsNotNone(Todo.objects.filter(title='Hecha').first().completed_at)
+        self.assertEqual(check_counters(), [])
+
+    def test_bulk_create_reports_item_errors(self):
+        payload = [{'title': 'Bien'}, {'priority': 'x'}, {'title': 'Otra', 'category': 999}]
+        response = self.client.post('/api/todos/bulk-create/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('title', errors[1])
+        self.assertIn('priority', errors[1])
+        self.assertIn('category', errors[2])
+        self.assertFalse(Todo.objects.exists())
+
+    def test_bulk_update_applies_completed_at_rules(self):
+        done = Todo.objects.create(title='Hecha', status='completed', completed_at=timezone.now())
+        open_todo = Todo.objects.create(title='Abierta')
+        before = open_todo.updated_at
+        payload = [
+            {'id': open_todo.id, 'status': 'completed', 'priority': 'urgent'},
+            {'id': done.id, 'status': 'pending'},
+        ]
+        response = self.client.patch('/api/todos/bulk-update/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        open_todo.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual(open_todo.priority, 'urgent')
+        self.assertIsNotNone(open_todo.completed_at)
+        self.assertGreater(open_todo.updated_at, before)
+        self.assertIsNone(done.completed_at)
+        self.assertEqual(check_counters(), [])
+
+    def test_bulk_update_without_status_keeps_completed_at(self):
+        completed_at = timezone.now() - timedelta(days=1)
+        done = Todo.objects.create(title='Hecha', status='completed', completed_at=completed_at)
+        response = self.client.patch('/api/todos/bulk-update/', [{'id': done.id, 'priority': 'high'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        done.refresh_from_db()
+        self.assertEqual((done.priority, done.status, done.completed_at), ('high', 'completed', completed_at))
+
+    def test_bulk_update_matches_single_patch(self):
+        completed_at = timezone.now() - timedelta(days=1)
+        single = Todo.objects.create(title='Individual', status='completed', completed_at=completed_at)
+        bulk = Todo.objects.create(title='Masiva', status='completed', completed_at=completed_at)
+        response = self.client.patch(f'/api/todos/{single.id}/', {'priority': 'high'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch('/api/todos/bulk-update/', [{'id': bulk.id, 'priority': 'high'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        single.refresh_from_db()
+        bulk.refresh_from_db()
+        self.assertEqual(
+            (single.priority, single.status, single.completed_at),
+            (bulk.priority, bulk.status, bulk.completed_at),
+        )
+        self.assertEqual(single.completed_at, completed_at)
+
+    def test_bulk_update_unknown_and_duplicate_ids(self):
+        todo = Todo.objects.create(title='Abierta')
+        payload = [{'id': todo.id, 'title': 'A'}, {'id': todo.id, 'title': 'B'}, {'id': 999}, {'title': 'C'}]
+        response = self.client.patch('/api/todos/bulk-update/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('id', errors[1])
+        self.assertIn('id', errors[2])
+        self.assertIn('id', errors[3])
+        todo.refresh_from_db()
+        self.assertEqual(todo.title, 'Abierta')
+
+    def test_bulk_delete(self):
+        todos = Todo.objects.bulk_create([Todo(title=f'Tarea {i}') for i in range(5)])
+        ids = [todo.id for todo in todos[:3]] + [999]
+        response = self.client.post('/api/todos/bulk-delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted'], 3)
+        self.assertEqual(response.json()['errors'], [{'id': 999, 'detail': 'No encontrado.'}])
+        self.assertEqual(Todo.objects.count(), 2)
+        self.assertEqual(check_counters(), [])
+
+    def bulk_delete_queries(self, size):
+        todos = Todo.objects.bulk_create([
+            Todo(title=f'Tarea {i}', user=self.user, category=self.work if i % 2 else None,
+                 priority=['low', 'high'][i % 2]) for i in range(size)
+        ])
+        with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/todos/bulk-delete/', {'ids': [todo.id for todo in todos]}, format='json')
+        self.assertEqual(response.json()['deleted'], size)
+        self.assertEqual(TodoDeletion.objects.filter(todo_id__in=[todo.id for todo in todos]).count(), size)
+        return len(context.captured_queries), len(callbacks)
+
+    def test_bulk_delete_does_not_grow_with_size(self):
+        self.assertEqual(self.bulk_delete_queries(5), self.bulk_delete_queries(100))
+        self.assertFalse(Todo.objects.exists())
+        self.assertEqual(check_counters(), [])
+
+    def test_bulk_delete_releases_attachment_blobs(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(MEDIA_ROOT=directory.name):
+            todos = [Todo.objects.create(title=f'Tarea {i}') for i in range(3)]
+            for todo in todos:
+                TodoAttachment.objects.create(todo=todo, file=ContentFile(b'igual', 'a.txt'), filename='a.txt')
+            self.assertEqual(AttachmentBlob.objects.get().ref_count, 3)
+            response = self.client.post(
+                '/api/todos/bulk-delete/', {'ids': [todo.id for todo in todos[:2]]}, format='json'
+            )
+            self.assertEqual(response.json()['deleted'], 2)
+            self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+            self.assertEqual(TodoAttachment.objects.count(), 1)
+
+    def test_queryset_delete_keeps_django_behaviour(self):
+        todos = [Todo.objects.create(title=f'Tarea {i}', user=self.user) for i in range(2)]
+        with self.assertRaises(TypeError):
+            Todo.objects.values('title').filter(pk=todos[0].pk).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted, counts = Todo.objects.filter(user=self.user).delete()
+        self.assertEqual((deleted, counts), (2, {'todo.Todo': 2}))
+        self.assertEqual(TodoDeletion.objects.count(), 2)
+        self.assertEqual(check_counters(), [])
+
+    def test_rejects_non_list_payload(self):
+        response = self.client.post('/api/todos/bulk-create/', {'title': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SampleDataTests(TestCase):
+    def generate(self, seed):
+        call_command(
+            'create_sample_data', '--todos', '300', '--users', '3', '--categories', '2',
+            '--attachments', '5', '--seed', str(seed), stdout=StringIO(),
+        )
+
+    def test_generates_requested_volume(self):
+        self.generate(seed=1)
+        self.assertEqual(Todo.objects.count(), 300)
+        self.assertEqual(User.objects.filter(username__startswith='sample1_').count(), 3)
+        self.assertEqual(TodoCategory.objects.count(), 2)
+        self.assertEqual(TodoAttachment.objects.count(), 5)
+        self.assertEqual(set(Todo.objects.values_list('status', flat=True)),
+                         {'pending', 'in_progress', 'completed', 'cancelled'})
+        self.assertTrue(Todo.objects.overdue().exists())
+        self.assertFalse(Todo.objects.filter(status='completed', completed_at__isnull=True).exists())
+        self.assertEqual(check_counters(), [])
+
+    def test_same_seed_is_reproducible(self):
+        self.generate(seed=7)
+        first = list(Todo.objects.order_by('id').values_list('title', 'status', 'priority'))
+        Todo.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(list(Todo.objects.order_by('id').values_list('title', 'status', 'priority')), first)
+
+    def test_adds_to_existing_counters(self):
+        self.generate(seed=1)
+        self.generate(seed=2)
+        self.assertEqual(Todo.objects.count(), 600)
+        self.assertEqual(check_counters(), [])
+
+    def test_rejects_negative_values(self):
+        with self.assertRaises(CommandError):
+            call_command('create_sample_data', '--todos', '-1', stdout=StringIO())
+
+    def todo_schema(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = %s AND type IN ('index', 'trigger') "
+                "ORDER BY name", [Todo._meta.db_table],
+            )
+            return cursor.fetchall()
+
+    @skipUnless(connection.vendor == 'sqlite', 'índices de SQLite')
+    def test_restores_every_deferred_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE INDEX todo_extra_title_idx ON todo_todo (title)')
+        schema = self.todo_schema()
+        self.generate(seed=1)
+        self.assertEqual(self.todo_schema(), schema)
+        with self.assertRaises(RuntimeError), deferred_indexes():
+            self.assertNotIn('todo_extra_title_idx', [name for _, name, _ in self.todo_schema()])
+            raise RuntimeError
+        self.assertEqual(self.todo_schema(), schema)
+
+
+class EndpointBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='ana')
+        category = TodoCategory.objects.create(name='Trabajo')
+        Todo.objects.create(title='Informe', user=user, category=category)
+
+    def test_measures_endpoints_without_changing_data(self):
+        results = run_benchmarks(repeat=1, names={'todos-detail', 'todos-delete', 'todos-stats'})
+        self.assertEqual(set(results), {'todos-detail', 'todos-delete', 'todos-stats'})
+        self.assertGreater(results['todos-detail']['queries'], 0)
+        self.assertEqual(Todo.objects.count(), 1)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'todos-stats': {'time_ms': 10.0, 'queries': 2, 'full_scans': 0, 'vm_steps': 10}}
+        same = {'todos-stats': {'time_ms': 11.0, 'queries': 2, 'full_scans': 0, 'vm_steps': 10}}
+        worse = {'todos-stats': {'time_ms': 50.0, 'queries': 3, 'full_scans': 1, 'vm_steps': 30}}
+        self.assertEqual(compare_with_baseline(same, baseline), [])
+        self.assertEqual(len(compare_with_baseline(worse, baseline)), 4)
+
+    def test_unbounded_endpoints_are_skipped_on_large_sizes(self):
+        names = {'todos-overdue', 'todos-detail'}
+        results = run_benchmarks(repeat=1, names=names, size=UNBOUNDED_MAX_SIZE + 1)
+        self.assertIn('skipped', results['todos-overdue'])
+        self.assertIn('queries', results['todos-detail'])
+        self.assertNotIn('skipped', run_benchmarks(repeat=1, names=names, size=UNBOUNDED_MAX_SIZE)['todos-overdue'])
+        # Omitido en la línea base o en los resultados: no se compara
+        baseline = {'todos-overdue': {'skipped': 'sin paginar'}}
+        self.assertEqual(compare_with_baseline({'todos-overdue': {'time_ms': 1.0, 'queries': 9}}, baseline), [])
+        baseline = {'todos-overdue': {'time_ms': 1.0, 'queries': 1}, 'todos-detail': results['todos-detail']}
+        self.assertEqual(compare_with_baseline(results, baseline), [])
+
+    def test_missing_baseline_entry_is_a_regression(self):
+        result = {'time_ms': 1.0, 'queries': 1, 'full_scans': 0, 'vm_steps': 1}
+        regressions = compare_with_baseline({'todos-detail': result, 'dashboard': result}, {'todos-detail': result})
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('dashboard', regressions[0])
+
+    def test_json_benchmark_checks_identical_output(self):
+        results = run_json_benchmark(json_payloads(10), repeat=1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result['identical'] for result in results.values()))
+
+
+class CategoryTasksCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [TodoCategory.objects.create(name=f'Categoría {i}') for i in range(20)]
+        for i, category in enumerate(cls.categories):
+            Todo.objects.create(title=f'Tarea {i}', category=category)
+        Todo.objects.create(title='Extra', category=cls.categories[0])
+        Todo.objects.create(title='Sin categoría')
+
+    def test_todo_page_runs_constant_queries(self):
+        # Validadores (2), página, conteo, categorías con su número de tareas y adjuntos
+        with self.assertNumQueries(6):
+            response = APIClient().get('/api/todos/')
+        self.assertEqual(response.status_code, 200)
+        counts = {
+            todo['category_details']['name']: todo['category_details']['tasks_count']
+            for todo in response.json()['results'] if todo['category_details']
+        }
+        self.assertEqual(counts['Categoría 0'], 2)
+        self.assertEqual(counts['Categoría 5'], 1)
+
+    def test_category_list_annotates_counts(self):
+        # Generaciones (clave de la caché de respuestas y validadores), conteo y página
+        with self.assertNumQueries(4):
+            response = APIClient().get('/api/categories/')
+        counts = {category['name']: category['tasks_count'] for category in response.json()['results']}
+        self.assertEqual(counts['Categoría 0'], 2)
+        self.assertEqual(counts['Categoría 19'], 1)
+
+    def test_admin_changelist_annotates_counts(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(admin)
+        response = self.client.get('/admin/todo/todocategory/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_list.get(name='Categoría 0').tasks_count, 2)
+
+
+class TodoProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='ana')
+        category = TodoCategory.objects.create(name='Trabajo')
+        for i in range(5):
+            Todo.objects.create(title=f'Tarea {i}', user=user, category=category,
+                                due_date=timezone.now() + timedelta(days=i - 2))
+        Todo.objects.create(title='Sin relaciones', status='completed')
+
+    def test_fields_skip_joins_and_prefetches(self):
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get('/api/todos/', {'fields': 'id,title,status'})
+        # Validadores (2), conteo y página
+        self.assertEqual(len(context.captured_queries), 4)
+        self.assertNotIn('JOIN', context.captured_queries[-1]['sql'])
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'title', 'status'})
+
+    def test_expand_matches_full_serializer(self):
+        client = APIClient()
+        full = client.get('/api/todos/').json()['results']
+        with self.assertNumQueries(7):
+            projected = client.get('/api/todos/', {'expand': 'category,user,attachments'}).json()['results']
+        self.assertEqual(projected, full)
+        for url in ('/api/todos/overdue/', '/api/todos/high-priority/'):
+            self.assertEqual(client.get(url, {'expand': 'category,user,attachments'}).json(), client.get(url).json())
+
+    def test_derived_fields_and_cursor_pagination(self):
+        response = APIClient().get('/api/todos/', {
+            'fields': 'title,is_overdue,days_until_due', 'pagination': 'cursor',
+        })
+        rows = {row['title']: row for row in response.json()['results']}
+        self.assertTrue(rows['Tarea 0']['is_overdue'])
+        self.assertEqual(rows['Tarea 4']['days_until_due'], 2)
+        self.assertIsNone(rows['Sin relaciones']['days_until_due'])
+
+    def test_rejects_unknown_fields(self):
+        response = APIClient().get('/api/todos/', {'fields': 'id,secreto', 'expand': 'nada'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+        self.assertIn('expand', response.json())
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = TodoCategory.objects.create(name='Trabajo')
+        cls.todo = Todo.objects.create(title='Informe', category=cls.category)
+
+    def assertNotModified(self, url, response, **params):
+        # Las categorías responden desde la caché de respuestas: solo leen las generaciones
+        with self.assertNumQueries(2 if url.startswith('/api/todos/') else 1):
+            again = APIClient().get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], response['ETag'])
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        for url in ('/api/todos/', f'/api/todos/{self.todo.id}/', '/api/todos/stats/',
+                    '/api/categories/', f'/api/categories/{self.category.id}/'):
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+            self.assertNotModified(url, response)
+
+    def test_if_modified_since(self):
+        response = APIClient().get('/api/todos/')
+        again = APIClient().get('/api/todos/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_writes_change_validators(self):
+        client = APIClient()
+        etags = {url: client.get(url)['ETag'] for url in ('/api/todos/', '/api/categories/', '/api/todos/stats/')}
+        client.patch(f'/api/todos/{self.todo.id}/', {'status': 'completed'}, format='json')
+        for url, etag in etags.items():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+
+        etag = client.get('/api/todos/')['ETag']
+        TodoCategory.objects.filter(pk=self.category.pk).first().save()
+        self.assertEqual(client.get('/api/todos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = client.get('/api/todos/')['ETag']
+        Todo.objects.filter(pk=self.todo.pk).update(title='Otro')
+        self.assertEqual(client.get('/api/todos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_query(self):
+        client = APIClient()
+        self.assertNotEqual(client.get('/api/todos/')['ETag'], client.get('/api/todos/', {'status': 'pending'})['ETag'])
+
+    def test_passed_due_date_changes_validators(self):
+        client = APIClient()
+        todo = Todo.objects.create(title='Vence', due_date=timezone.now() + timedelta(hours=1))
+        etag = client.get('/api/todos/')['ETag']
+        # Simular el paso del tiempo sin escribir (update() incrementaría la generación)
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE todo_todo SET due_date = %s WHERE id = %s',
+                           [timezone.now() - timedelta(minutes=1), todo.id])
+        self.assertEqual(client.get('/api/todos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_resolved_tasks_never_become_overdue(self):
+        # Los validadores solo miran las tareas sin resolver: is_overdue tampoco puede cambiar en las demás
+        client = APIClient()
+        todos = [
+            Todo.objects.create(title=status, status=status, due_date=timezone.now() + timedelta(hours=1))
+            for status in ('completed', 'cancelled')
+        ]
+        etag = client.get('/api/todos/')['ETag']
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE todo_todo SET due_date = %s WHERE id IN (%s, %s)',
+                           [timezone.now() - timedelta(minutes=1), *(todo.id for todo in todos)])
+        self.assertEqual(client.get('/api/todos/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        for params in ({}, {'fields': 'title,is_overdue'}):
+            rows = {row['title']: row['is_overdue'] for row in client.get('/api/todos/', params).json()['results']}
+            self.assertEqual(rows, {'completed': False, 'cancelled': False, 'Informe': False})
+
+
+class FastJSONTests(TestCase):
+    """El renderer/parser rápido debe dar el mismo resultado que los de DRF"""
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_renders_like_drf(self):
+        now = timezone.now()
+        self.assertSameOutput({
+            'aware': now, 'naive': now.replace(tzinfo=None), 'date': now.date(), 'time': now.time(),
+            'decimal': Decimal('1.50'), 'lazy': gettext_lazy('Pendiente'), 'text': 'año\u2028fin\u2029',
+            'nested': [{'n': 1, 'none': None, 'flag': True}], 'keys': {1: 'uno'}, 'tuple': (1, 2),
+        })
+        self.assertSameOutput({'big': 2 ** 70})
+        self.assertSameOutput({'a': [1, 2]}, 'application/json; indent=4')
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_api_responses_match_drf(self):
+        todo = Todo.objects.create(title='Informe', due_date=timezone.now())
+        response = APIClient().get(f'/api/todos/{todo.id}/')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_parses_like_drf(self):
+        for body in (b'{"title": "a\\u00f1o", "n": [1, 2.5, null]}', b'{"big": 123456789012345678901234}'):
+            self.assertEqual(FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        with self.assertRaisesMessage(ParseError, 'JSON parse error - Expecting value'):
+            FastJSONParser().parse(BytesIO(b'{"title": }'))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"nan": NaN}'))
+
+    def test_api_parses_requests(self):
+        response = APIClient().post('/api/todos/', {'title': 'Año nuevo', 'priority': 'high'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Todo.objects.get().title, 'Año nuevo')
+        response = APIClient().post('/api/todos/', '{"title": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CompactListTests(TestCase):
+    """Listas pending-*/resolved-*: filtros, formato por columnas, cursor y IDs binarios"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='ana')
+        cls.pending = [
+            Todo.objects.create(title=f'Pendiente {i}', status='pending', user=cls.user if i % 2 else None,
+                                priority='high' if i < 2 else 'low')
+            for i in range(5)
+        ]
+        cls.in_progress = Todo.objects.create(title='En curso', status='in_progress', user=cls.user)
+        cls.completed = Todo.objects.create(title='Hecha', status='completed', user=cls.user)
+        cls.pending_ids = [todo.id for todo in reversed(cls.pending)]
+
+    def test_default_rows(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/todos/pending-ids/').json(), self.pending_ids)
+        self.assertEqual(client.get('/api/todos/pending-resolved/').json(),
+                         [{'id': self.completed.id, 'title': 'Hecha'}])
+        self.assertEqual(client.get('/api/todos/unresolved-users/').json()[0],
+                         {'id': self.in_progress.id, 'user': self.user.id})
+
+    def test_applies_list_filters(self):
+        response = APIClient().get('/api/todos/pending-users/', {'priority': 'high', 'user': self.user.id})
+        self.assertEqual(response.json(), [{'id': self.pending[1].id, 'user': self.user.id}])
+
+    def test_columns_layout(self):
+        client = APIClient()
+        data = client.get('/api/todos/pending-users/', {'layout': 'columns'}).json()
+        self.assertEqual(data['id'], self.pending_ids)
+        self.assertEqual(data['user'], [None, self.user.id, None, self.user.id, None])
+        self.assertEqual(client.get('/api/todos/resolved-users/', {'layout': 'columns', 'user': 0}).json(),
+                         {'id': [], 'user': []})
+        self.assertEqual(client.get('/api/todos/pending-ids/', {'layout': 'tabla'}).status_code, 400)
+
+    def test_cursor_pagination(self):
+        client = APIClient()
+        ids, url = [], '/api/todos/pending-titles/?pagination=cursor&page_size=2&layout=columns'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                data = client.get(url).json()
+                ids += data['results']['id']
+                url = data['next']
+        self.assertEqual(ids, self.pending_ids)
+        self.assertEqual(len(queries), 3)
+
+    def test_packed_ids(self):
+        client = APIClient()
+        response = client.get('/api/todos/pending-ids/', {'format': 'packed'})
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(array('q', response.content).tolist(), self.pending_ids)
+
+        response = client.get('/api/todos/pending-ids/', {'format': 'packed', 'pagination': 'cursor', 'page_size': 3})
+        self.assertEqual(array('q', response.content).tolist(), self.pending_ids[:3])
+        next_url = re.match(r'<([^>]+)>; rel="next"', response['Link']).group(1)
+        self.assertEqual(array('q', client.get(next_url).content).tolist(), self.pending_ids[3:])
+
+        response = client.get('/api/todos/pending-ids/', {'format': 'packed', 'layout': 'tabla'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+
+class ChangesFeedTests(TestCase):
+    """Feed de cambios /api/todos/changes/ con tombstones"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = TodoCategory.objects.create(name='Trabajo')
+        self.todos = [Todo.objects.create(title=f'Tarea {i}', category=self.category) for i in range(5)]
+        self.settle()
+
+    def settle(self):
+        """Llevar todos los cambios fuera del margen que se reenvía"""
+        past = timezone.now() - timedelta(minutes=1)
+        Todo.objects.update(updated_at=past)
+        TodoDeletion.objects.update(deleted_at=past)
+
+    def sync(self, token=None, **params):
+        """Seguir el feed hasta agotar `more`; devuelve (IDs cambiados, IDs eliminados, token)"""
+        changed, deleted = [], []
+        while True:
+            data = self.client.get('/api/todos/changes/', {'since': token or '', **params}).json()
+            changed += [todo['id'] for todo in data['changes']]
+            deleted += data['deleted']
+            token = data['next']
+            if not data['more']:
+                return changed, deleted, token
+
+    def test_initial_sync_pages_through_everything(self):
+        changed, deleted, token = self.sync(limit=2)
+        self.assertEqual(changed, [todo.id for todo in self.todos])
+        self.assertEqual(deleted, [])
+        self.assertEqual(self.sync(token), ([], [], token))
+
+    def test_returns_only_changes_and_tombstones(self):
+        *_, token = self.sync()
+        updated, removed = self.todos[1], self.todos[3]
+        self.client.patch(f'/api/todos/{updated.id}/', {'title': 'Editada'}, format='json')
+        self.client.delete(f'/api/todos/{removed.id}/')
+        self.client.post('/api/todos/bulk-delete/', {'ids': [self.todos[4].id]}, format='json')
+        self.client.post('/api/todos/', {'title': 'Nueva'}, format='json')
+        created = Todo.objects.get(title='Nueva').id
+
+        changed, deleted, token = self.sync(token)
+        self.assertEqual(changed, [updated.id, created])
+        self.assertEqual(deleted, [removed.id, self.todos[4].id])
+
+        # Los cambios recientes se reenvían hasta salir del margen de confirmación
+        self.assertEqual(self.sync(token)[:2], (changed, deleted))
+        self.settle()
+        self.assertEqual(self.sync(token)[:2], ([], []))
+
+    def test_writes_that_bypass_save_touch_todos(self):
+        *_, token = self.sync()
+        Todo.objects.filter(pk=self.todos[0].pk).update(status='completed')
+        TodoAttachment.objects.create(todo=self.todos[2], file='todo_attachments/a.txt', filename='a.txt')
+        self.assertEqual(self.sync(token)[0], [self.todos[0].id, self.todos[2].id])
+
+        self.settle()
+        *_, token = self.sync(token)
+        self.category.delete()
+        self.assertEqual(sorted(self.sync(token)[0]), [todo.id for todo in self.todos])
+
+    def test_invalid_and_expired_tokens(self):
+        response = self.client.get('/api/todos/changes/', {'since': 'no-es-un-token'})
+        self.assertEqual(response.status_code, 400)
+        old = timezone.now() - DELETION_LOG_RETENTION - timedelta(days=1)
+        response = self.client.get('/api/todos/changes/', {'since': encode_token((old, 0), (old, 0))})
+        self.assertEqual(response.status_code, 410)
+
+    def test_prune_deletions(self):
+        recent = self.todos[1].id
+        self.todos[0].delete()
+        TodoDeletion.objects.update(deleted_at=timezone.now() - DELETION_LOG_RETENTION - timedelta(days=1))
+        self.todos[1].delete()
+        self.assertEqual(prune_deletions(), 1)
+        self.assertEqual(list(TodoDeletion.objects.values_list('todo_id', flat=True)), [recent])
+
+
+class TodoEventsTests(TestCase):
+    """Stream de eventos (SSE) y su difusión"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self, filters=None, maxsize=50):
+        subscriber = broadcaster.subscribe(filters, maxsize, loop=self.loop)
+        self.addCleanup(broadcaster.unsubscribe, subscriber)
+        return subscriber
+
+    def received(self, subscriber):
+        self.loop.run_until_complete(asyncio.sleep(0))
+        events = []
+        while not subscriber.queue.empty():
+            events.append(subscriber.queue.get_nowait())
+        return [(event['type'], event['id']) if 'id' in event else (event['type'],) for event in events]
+
+    def test_mutations_publish_filtered_events(self):
+        ana, luis = User.objects.create(username='ana'), User.objects.create(username='luis')
+        subscriber = self.subscribe({'user': ana.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            todo = Todo.objects.create(title='Informe', user=ana)
+            Todo.objects.create(title='Ajena', user=luis)
+            todo.status = 'completed'
+            todo.save()
+            attachment = TodoAttachment.objects.create(todo=todo, file='todo_attachments/a.txt', filename='a.txt')
+            category = TodoCategory.objects.create(name='Trabajo')
+            todo.user = luis
+            todo.save()
+        self.assertEqual(self.received(subscriber), [
+            ('todo.created', todo.id), ('todo.status', todo.id), ('attachment.created', attachment.id),
+            ('category.created', category.id), ('todo.updated', todo.id),
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Todo.objects.filter(user=luis).update(priority='high')
+            todo.delete()
+        self.assertEqual(self.received(subscriber), [('todo.bulk_updated',)])
+
+    def test_bulk_create_publishes_one_event(self):
+        subscriber = self.subscribe({'user': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            Todo.objects.bulk_create([Todo(title=f'Tarea {i}') for i in range(DEFAULT_QUEUE_SIZE + 1)])
+        self.assertEqual(self.received(subscriber), [('todo.bulk_created',)])
+        self.assertFalse(subscriber.overflowed)
+
+    def test_slow_consumer_overflows(self):
+        subscriber = self.subscribe(maxsize=2)
+        for _ in range(3):
+            broadcaster.dispatch({'type': 'todo.bulk_updated'})
+        self.assertEqual(len(self.received(subscriber)), 2)
+        self.assertTrue(subscriber.overflowed)
+
+    def test_database_backend(self):
+        backend = DatabaseEventBackend(broadcaster)
+        subscriber = self.subscribe({'category': 7})
+        backend.poll()
+        backend.publish({'type': 'category.updated', 'id': 7, 'category': 7})
+        backend.publish({'type': 'category.updated', 'id': 8, 'category': 8})
+        self.assertEqual(TodoEvent.objects.count(), 2)
+        self.assertEqual(backend.poll(), 2)
+        self.assertEqual(self.received(subscriber), [('category.updated', 7)])
+
+    def test_requires_asgi(self):
+        self.assertEqual(APIClient().get('/api/events/').status_code, 501)
+
+
+class TodoEventsStreamTests(TestCase):
+    async def test_stream_sends_matching_events_and_unsubscribes(self):
+        response = await self.async_client.get('/api/events/', {'category': 3})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b'retry: 3000\n\n')
+
+        broadcaster.dispatch({'type': 'category.updated', 'id': 4, 'category': 4})
+        broadcaster.dispatch({'type': 'category.updated', 'id': 3, 'category': 3})
+        chunk = (await asyncio.wait_for(anext(content), 1)).decode()
+        self.assertIn('event: category.updated\n', chunk)
+        self.assertEqual(json.loads(chunk.split('data: ')[1])['id'], 3)
+
+        # Al desconectarse el cliente, el servidor cancela la tarea que consume el stream
+        task = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(broadcaster.subscribers, set())
+
+    async def test_rejects_invalid_filters(self):
+        response = await self.async_client.get('/api/events/', {'user': 'ana'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncReadViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='ana')
+        cls.category = TodoCategory.objects.create(name='Trabajo')
+        now = timezone.now()
+        for index in range(25):
+            Todo.objects.create(
+                title=f'Tarea {index}', user=cls.user if index % 2 else None,
+                category=cls.category if index % 3 else None,
+                priority=['low', 'high', 'urgent'][index % 3], status=['pending', 'completed'][index % 2],
+                due_date=now + timedelta(days=index - 10),
+            )
+        cls.todo = Todo.objects.first()
+
+    def test_async_views_only_with_setting(self):
+        urls = ('/api/todos/', f'/api/todos/{self.todo.id}/', '/api/todos/stats/', '/api/todos/overdue/',
+                '/api/todos/high-priority/', '/api/users/')
+        for url in urls:
+            self.assertFalse(inspect.iscoroutinefunction(resolve(url).func), url)
+        with use_async_views(True):
+            for url in urls:
+                self.assertTrue(inspect.iscoroutinefunction(resolve(url).func), url)
+            self.assertFalse(inspect.iscoroutinefunction(resolve('/api/categories/').func))
+            self.assertFalse(inspect.iscoroutinefunction(resolve('/api/todos/bulk-create/').func))
+
+    def test_async_reads_match_sync(self):
+        requests = [
+            ('/api/todos/', {}), ('/api/todos/', {'page': 2}), ('/api/todos/', {'status': 'pending', 'priority': 'high'}),
+            ('/api/todos/', {'pagination': 'cursor'}), ('/api/todos/', {'search': 'Tarea'}),
+            ('/api/todos/', {'fields': 'id,title', 'expand': 'category'}), (f'/api/todos/{self.todo.id}/', {}),
+            ('/api/todos/stats/', {}), ('/api/todos/stats/', {'user': self.user.id}), ('/api/todos/stats/', {'overdue': 'true'}),
+            ('/api/todos/overdue/', {}), ('/api/todos/high-priority/', {'user': self.user.id}),
+            ('/api/users/', {}), ('/api/todos/999999/', {}), ('/api/todos/', {'page': 99}),
+        ]
+        expected = [APIClient().get(url, params) for url, params in requests]
+        with use_async_views(True):
+            for (url, params), sync_response in zip(requests, expected):
+                response = async_to_sync(self.async_client.get)(url, params)
+                self.assertEqual(response.status_code, sync_response.status_code, (url, params))
+                self.assertEqual(response.json(), sync_response.json(), (url, params))
+                self.assertEqual(response.get('ETag'), sync_response.get('ETag'), (url, params))
+
+    def test_async_conditional_get_and_writes(self):
+        with use_async_views(True):
+            response = async_to_sync(self.async_client.get)('/api/todos/')
+            again = async_to_sync(self.async_client.get)('/api/todos/', headers={'If-None-Match': response['ETag']})
+            self.assertEqual(again.status_code, 304)
+
+            # Los métodos de escritura de la misma ruta se sirven con la vista síncrona
+            created = async_to_sync(self.async_client.post)(
+                '/api/todos/', {'title': 'Nueva', 'priority': 'low'}, content_type='application/json'
+            )
+            self.assertEqual(created.status_code, 201)
+            again = async_to_sync(self.async_client.get)('/api/todos/', headers={'If-None-Match': response['ETag']})
+            self.assertEqual(again.status_code, 200)
+            self.assertEqual(again.json()['count'], 26)
+
+
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    # Las peticiones se atienden en otros hilos, que no ven la transacción de TestCase
+    def setUp(self):
+        user = User.objects.create(username='ana')
+        category = TodoCategory.objects.create(name='Trabajo')
+        for index in range(5):
+            Todo.objects.create(title=f'Tarea {index}', user=user, category=category, priority='high')
+
+    def test_concurrency_benchmark(self):
+        results = run_concurrency_benchmark([3], requests=12, threads=2)
+        self.assertEqual({stack for stack, _ in results}, {'wsgi', 'asgi-sync', 'asgi'})
+        for result in results.values():
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['requests_per_second'], 0)
+
+    def test_mixed_benchmark(self):
+        operations = mixed_operations(20, write_ratio=0.5)
+        self.assertEqual({method for method, _, _ in operations}, {'GET', 'PATCH', 'POST'})
+        results = run_mixed_benchmark(operations, threads=1)
+        self.assertEqual(set(results), {'default', 'production'})
+        for result in results.values():
+            self.assertEqual(result['errors'], 0)
+        self.assertEqual(Todo.objects.count(), 5 + 2 * sum(method == 'POST' for method, _, _ in operations))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Perfil y mantenimiento específicos de SQLite')
+class SQLiteProfileTests(TestCase):
+    def open_database(self, path, profile):
+        settings_dict = {**copy.deepcopy(connection.settings_dict), 'NAME': str(path), **copy.deepcopy(profile)}
+        database = connections['default'].__class__(settings_dict, 'maintenance')
+        connections['maintenance'] = database
+        self.addCleanup(connections.__delitem__, 'maintenance')
+        self.addCleanup(database.close)
+        return database
+
+    def pragma(self, database, name):
+        with database.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_production_profile_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = self.open_database(Path(directory) / 'db.sqlite3', settings.SQLITE_PRODUCTION_PROFILE)
+            self.assertEqual(self.pragma(database, 'journal_mode'), 'wal')
+            self.assertEqual(self.pragma(database, 'synchronous'), 1)
+            self.assertEqual(self.pragma(database, 'busy_timeout'), 5000)
+            self.assertEqual(self.pragma(database, 'mmap_size'), 256 * 1024 * 1024)
+            self.assertEqual(database.transaction_mode, 'IMMEDIATE')
+            self.assertGreater(database.settings_dict['CONN_MAX_AGE'], 0)
+
+    def test_maintenance_vacuum_analyze_and_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = self.open_database(Path(directory) / 'db.sqlite3', settings.SQLITE_PRODUCTION_PROFILE)
+            with database.cursor() as cursor:
+                cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, value TEXT)')
+                cursor.execute('CREATE INDEX item_value ON item (value)')
+                cursor.executemany('INSERT INTO item (value) VALUES (%s)', [('x' * 500,)] * 200)
+
+            result = run_maintenance('maintenance')
+            self.assertFalse(result['auto_vacuum_incremental'])
+            self.assertTrue(result['checkpointed'])
+            with database.cursor() as cursor:
+                cursor.execute("SELECT tbl FROM sqlite_stat1 WHERE tbl = 'item'")
+                self.assertTrue(cursor.fetchall())
+
+            result = run_maintenance('maintenance', vacuum=True)
+            self.assertTrue(result['vacuumed'])
+            self.assertEqual(self.pragma(database, 'auto_vacuum'), 2)
+
+            with database.cursor() as cursor:
+                cursor.execute('DELETE FROM item')
+            result = run_maintenance('maintenance')
+            self.assertGreater(result['freed_pages'], 0)
+            self.assertEqual(self.pragma(database, 'freelist_count'), 0)
+
+    def test_command_reports_steps(self):
+        out = StringIO()
+        call_command('db_maintenance', stdout=out)
+        self.assertIn('ANALYZE', out.getvalue())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'La copia de réplicas usa la API de backup de SQLite')
+class ReplicaRouterTests(TransactionTestCase):
+    # La copia se hace con otra conexión, que solo ve lo confirmado
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.replica_path = str(Path(directory.name) / 'replica.sqlite3')
+        replica = connections['default'].__class__(
+            {**copy.deepcopy(connection.settings_dict), 'NAME': self.replica_path}, 'replica'
+        )
+        connections['replica'] = replica
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(replica.close)
+        settings_override = override_settings(TODO_READ_REPLICAS=['replica'])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        replica_monitor.reset()
+        self.addCleanup(replica_monitor.reset)
+
+        Todo.objects.create(title='Copiada')
+        sync_replica(self.replica_path)
+
+    def count(self, client=None):
+        replica_monitor.reset()
+        return (client or APIClient()).get('/api/todos/').json()['count']
+
+    def test_reads_use_replica_within_lag(self):
+        Todo.objects.create(title='Sin copiar')
+        self.assertEqual(self.count(), 1)
+        sync_replica(self.replica_path)
+        self.assertEqual(self.count(), 2)
+
+    def test_client_sticks_to_primary_after_write(self):
+        writer = APIClient()
+        response = writer.post('/api/todos/', {'title': 'Mía'}, format='json')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.count(writer), 2)
+        self.assertEqual(self.count(), 1)
+        # Las lecturas no renuevan la ventana
+        self.assertNotIn(STICKY_COOKIE, writer.get('/api/todos/').cookies)
+
+    def test_lagging_or_broken_replica_falls_back_to_primary(self):
+        Todo.objects.create(title='Sin copiar')
+        with override_settings(TODO_REPLICA_MAX_LAG=0):
+            with mock.patch('todo.replicas.timezone.now', return_value=timezone.now() + timedelta(seconds=1)):
+                self.assertGreater(replica_lag('replica'), 0)
+                self.assertEqual(self.count(), 2)
+
+        with connections['replica'].cursor() as cursor:
+            cursor.execute('DROP TABLE todo_datageneration')
+        with self.assertLogs('todo.replicas', 'WARNING'):
+            self.assertIsNone(replica_lag('replica'))
+            self.assertEqual(self.count(), 2)
+
+    def test_cursor_readers_use_primary(self):
+        # La réplica sirve el listado, pero el feed y el sondeo de eventos no la usan
+        Todo.objects.create(title='Sin copiar')
+        self.assertEqual(self.count(), 1)
+        replica_monitor.reset()
+        changes = APIClient().get('/api/todos/changes/').json()['changes']
+        self.assertEqual(sorted(todo['title'] for todo in changes), ['Copiada', 'Sin copiar'])
+
+        backend = DatabaseEventBackend(broadcaster)
+        backend.poll()
+        backend.publish({'type': 'category.updated', 'id': 1, 'category': 1})
+        replica_monitor.reset()
+        self.assertEqual(backend.poll(), 1)
+
+    def test_writes_and_migrations_stay_on_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Todo), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'todo'))
+        self.assertIsNone(router.allow_migrate('default', 'todo'))
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Todo), 'default')
+
+    def test_sync_command_requires_replicas(self):
+        with override_settings(TODO_READ_REPLICAS=[]), self.assertRaises(CommandError):
+            call_command('sync_replicas', stdout=StringIO())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class AttachmentDownloadTests(TestCase):
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        todo = Todo.objects.create(title='Con adjunto')
+        cls.attachment = TodoAttachment.objects.create(
+            todo=todo, file=SimpleUploadedFile('datos.bin', cls.content), filename='datos.pdf'
+        )
+        cls.url = f'/api/attachments/{cls.attachment.id}/download/'
+
+    def get(self, **headers):
+        return self.client.get(self.url, **headers)
+
+    def test_full_download_with_validators(self):
+        response = self.get(HTTP_ACCEPT='application/pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('filename="datos.pdf"', response['Content-Disposition'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        cached = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_range_requests(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        suffix = self.get(HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), self.content[-5:])
+        open_ended = self.get(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(b''.join(open_ended.streaming_content), self.content[1000:])
+
+        unsatisfiable = self.get(HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], f'bytes */{len(self.content)}')
+
+        # Varios tramos o un If-Range que ya no vale: archivo completo
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"antiguo"').status_code, 200)
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag).status_code, 206)
+
+    async def test_asgi_streams_in_blocks(self):
+        with warnings.catch_warnings():
+            # Django avisa cuando tiene que leer entero un iterador síncrono
+            warnings.simplefilter('error')
+            for headers, expected, status in (({}, self.content, 200), ({'Range': 'bytes=10-700'}, self.content[10:701], 206)):
+                response = await self.async_client.get(self.url, headers=headers)
+                self.assertEqual(response.status_code, status)
+                self.assertTrue(response.is_async)
+                self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), expected)
+                self.assertEqual(response['Content-Length'], str(len(expected)))
+
+    def test_offload_to_web_server(self):
+        with override_settings(TODO_ATTACHMENT_OFFLOAD='x-accel-redirect'):
+            response = self.get()
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.attachment.file.name}')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('ETag', response)
+
+        with override_settings(TODO_ATTACHMENT_OFFLOAD='x-sendfile'):
+            response = self.get()
+        self.assertEqual(response['X-Sendfile'], self.attachment.file.path)
+
+    def test_missing_file_is_404(self):
+        missing = TodoAttachment.objects.create(todo=self.attachment.todo, file='todo_attachments/no.txt', filename='no.txt')
+        self.assertEqual(self.client.get(f'/api/attachments/{missing.id}/download/').status_code, 404)
+
+
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.todo = Todo.objects.create(title='Con adjuntos')
+
+    def setUp(self):
+        # Un directorio por prueba: el recolector recorre todos los blobs
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def attach(self, content, filename='informe.pdf'):
+        return TodoAttachment.objects.create(
+            todo=self.todo, file=SimpleUploadedFile(filename, content), filename=filename
+        )
+
+    def refs(self, attachment):
+        return AttachmentBlob.objects.get(name=attachment.file.name).ref_count
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.attach(b'mismo contenido', 'a.pdf')
+        second = self.attach(b'mismo contenido', 'b.pdf')
+        other = self.attach(b'otro contenido')
+        digest = hashlib.sha256(b'mismo contenido').hexdigest()
+        self.assertEqual(first.file.name, f'todo_attachments/blobs/{digest[:2]}/{digest[2:4]}/{digest}')
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertNotEqual(other.file.name, first.file.name)
+        self.assertEqual(self.refs(first), 2)
+        self.assertEqual(AttachmentBlob.objects.get(name=first.file.name).size, len(b'mismo contenido'))
+
+        response = self.client.get(f'/api/attachments/{second.id}/download/')
+        self.assertEqual(b''.join(response.streaming_content), b'mismo contenido')
+        self.assertEqual(response['ETag'], f'"{digest}"')
+
+    def test_references_follow_attachment_lifecycle(self):
+        first = self.attach(b'compartido')
+        second = self.attach(b'compartido')
+        path = first.file.path
+        first.delete()
+        self.assertEqual(self.refs(second), 1)
+
+        # Cambiar el archivo mueve la referencia; borrar la tarea libera el resto
+        second.file = SimpleUploadedFile('nuevo.pdf', b'nuevo')
+        second.save()
+        self.assertEqual(AttachmentBlob.objects.get(sha256=hashlib.sha256(b'compartido').hexdigest()).ref_count, 0)
+        self.assertEqual(self.refs(second), 1)
+        self.todo.delete()
+        self.assertFalse(AttachmentBlob.objects.filter(ref_count__gt=0).exists())
+
+        self.assertEqual(collect_garbage(grace=3600), (0, 0))
+        self.assertEqual(collect_garbage(grace=0), (2, len(b'compartido') + len(b'nuevo')))
+        self.assertFalse(Path(path).exists())
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+    def test_gc_removes_orphans_and_recount_fixes_drift(self):
+        attachment = self.attach(b'vigente')
+        orphan = blob_storage().save('x', ContentFile(b'huerfano'))
+        AttachmentBlob.objects.update(ref_count=0)
+
+        out = StringIO()
+        call_command('gc_attachment_blobs', '--grace', '0', '--recount', '--dry-run', stdout=out)
+        self.assertIn('1 blobs con referencias corregidas', out.getvalue())
+        self.assertIn('1 archivos se borrarían', out.getvalue())
+        self.assertTrue(blob_storage().exists(orphan))
+
+        call_command('gc_attachment_blobs', '--grace', '0', stdout=StringIO())
+        self.assertFalse(blob_storage().exists(orphan))
+        self.assertTrue(blob_storage().exists(attachment.file.name))
+        self.assertEqual(self.refs(attachment), 1)
+
+    def test_migrates_legacy_files(self):
+        legacy = default_storage.save('todo_attachments/antiguo.txt', ContentFile(b'antiguo'))
+        copy_name = default_storage.save('todo_attachments/copia.txt', ContentFile(b'antiguo'))
+        old = [TodoAttachment.objects.create(todo=self.todo, file=name, filename='antiguo.txt')
+               for name in (legacy, legacy, copy_name)]
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+        out = StringIO()
+        call_command('migrate_attachment_blobs', stdout=out)
+        self.assertIn('2 archivos migrados (3 adjuntos actualizados)', out.getvalue())
+        names = set(TodoAttachment.objects.filter(pk__in=[a.pk for a in old]).values_list('file', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(AttachmentBlob.objects.get(name=names.pop()).ref_count, 3)
+        self.assertFalse(default_storage.exists(legacy))
+
+    def test_sample_data_counts_references(self):
+        call_command('create_sample_data', '--todos', '10', '--users', '1', '--categories', '1',
+                     '--attachments', '4', '--seed', '3', stdout=StringIO())
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 4)
+
+
+def image_upload(filename='foto.png', size=(1200, 800), color=(200, 30, 30, 128)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(filename, buffer.getvalue(), content_type='image/png')
+
+
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.todo = Todo.objects.create(title='Con imagen')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_create_schedules_generation_without_blocking(self):
+        with mock.patch('todo.signals.thumbnail_queue') as queue, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/attachments/', {'todo': self.todo.id, 'filename': 'foto.png', 'file': image_upload()}
+            )
+            TodoAttachment.objects.create(todo=self.todo, file=SimpleUploadedFile('a.txt', b'texto'), filename='a.txt')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['thumbnail_urls'], {})
+        queue.submit.assert_called_once_with(response.json()['id'])
+
+    def test_builds_thumbnails_once(self):
+        attachment = TodoAttachment.objects.create(todo=self.todo, file=image_upload(), filename='foto.png')
+        thumbnails = build_thumbnails(attachment.id)
+        self.assertEqual(set(thumbnails), {'128', '512'})
+        self.assertEqual(set(thumbnails['128']), {'webp', 'jpeg'})
+        with Image.open(blob_storage().path(thumbnails['512']['webp'])) as image:
+            self.assertEqual((image.format, image.size, image.mode), ('WEBP', (512, 341), 'RGBA'))
+        with Image.open(blob_storage().path(thumbnails['128']['jpeg'])) as image:
+            self.assertEqual((image.format, image.size, image.mode), ('JPEG', (128, 85), 'RGB'))
+
+        data = self.client.get(f'/api/attachments/{attachment.id}/').json()
+        self.assertEqual(
+            data['thumbnail_urls']['128']['webp'], f"http://testserver/media/{thumbnails['128']['webp']}"
+        )
+        generation = read_generations(DataGeneration.TODOS)[DataGeneration.TODOS][0]
+        with mock.patch('todo.imaging.save_atomically') as save:
+            self.assertEqual(build_thumbnails(attachment.id), thumbnails)
+        save.assert_not_called()
+        self.assertEqual(read_generations(DataGeneration.TODOS)[DataGeneration.TODOS][0], generation)
+
+        # Otra subida de la misma imagen reutiliza las miniaturas
+        copy = TodoAttachment.objects.create(todo=self.todo, file=image_upload(), filename='copia.png')
+        with mock.patch('todo.imaging.save_atomically') as save:
+            self.assertEqual(build_thumbnails(copy.id), thumbnails)
+        save.assert_not_called()
+
+    def test_skips_non_images_and_broken_files(self):
+        text = TodoAttachment.objects.create(todo=self.todo, file=SimpleUploadedFile('a.txt', b'x'), filename='a.txt')
+        broken = TodoAttachment.objects.create(todo=self.todo, file=SimpleUploadedFile('b.png', b'x'), filename='b.png')
+        self.assertEqual(build_thumbnails(text.id), {})
+        self.assertEqual(build_thumbnails(broken.id), {})
+        self.assertEqual(TodoAttachment.objects.get(pk=broken.id).thumbnails, {})
+
+    def test_command_backfills_and_gc_removes_thumbnails(self):
+        attachment = TodoAttachment.objects.create(todo=self.todo, file=image_upload(), filename='foto.png')
+        out = StringIO()
+        call_command('generate_thumbnails', '--workers', '1', stdout=out)
+        self.assertIn('1 de 1 imágenes con miniaturas', out.getvalue())
+        attachment.refresh_from_db()
+        self.assertEqual(len(current_thumbnails(attachment)), 2)
+
+        attachment.delete()
+        removed, _ = collect_garbage(grace=0)
+        self.assertEqual(removed, 5)
+
+
+class ThumbnailQueueTests(TransactionTestCase):
+    def test_queue_builds_in_worker_process(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(MEDIA_ROOT=directory.name, TODO_THUMBNAIL_WORKERS=1, TODO_THUMBNAIL_QUEUE_SIZE=1):
+            todo = Todo.objects.create(title='Con imagen')
+            # Sin la cola global, que generaría las mismas miniaturas a la vez
+            with mock.patch('todo.signals.thumbnail_queue'):
+                attachment = TodoAttachment.objects.create(todo=todo, file=image_upload(), filename='foto.png')
+            queue = ThumbnailQueue()
+            future = queue.submit(attachment.id)
+            self.assertIsNone(queue.submit(attachment.id))
+            with self.assertLogs('todo.thumbnails', 'WARNING'):
+                self.assertIsNone(queue.submit(attachment.id + 1))
+            self.assertEqual(set(future.result(timeout=60)), {'128', '512'})
+            queue.threads.shutdown()
+            queue.processes.shutdown()
+            attachment.refresh_from_db()
+            self.assertEqual(set(attachment.thumbnails), {'128', '512'})
+
+
+def run_queued_jobs():
+    """Reclamar y ejecutar en este hilo los trabajos pendientes; devuelve sus estados"""
+    return [execute_job(*job) for job in claim_jobs(10)]
+
+
+@override_settings(TODO_JOB_RETRY_BACKOFF=0)
+class TodoJobTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_claim_respects_priority_run_at_and_leases(self):
+        low = enqueue('counters.rebuild')
+        high = enqueue('counters.rebuild', priority=5)
+        enqueue('counters.rebuild', priority=9, delay=60)
+        claimed = claim_jobs(5)
+        self.assertEqual([job_id for job_id, _ in claimed], [high.id, low.id])
+        self.assertEqual(claim_jobs(5), [])
+
+        # Reserva vencida: otro worker la reclama y el primero ya no puede terminarla
+        TodoJob.objects.filter(pk=high.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [(job_id, token)] = claim_jobs(5)
+        self.assertEqual(job_id, high.id)
+        self.assertIsNone(execute_job(*claimed[0]))
+        self.assertEqual(execute_job(job_id, token), TodoJob.SUCCEEDED)
+        job = TodoJob.objects.get(pk=high.id)
+        self.assertEqual((job.attempts, job.locked_by), (2, ''))
+
+    def test_retries_with_backoff_until_attempts_run_out(self):
+        calls = []
+
+        def flaky(job):
+            calls.append(job.attempts)
+            raise RuntimeError('fallo')
+
+        with mock.patch.dict(TASKS, {'flaky': flaky}):
+            job = enqueue('flaky', max_attempts=3)
+            with self.assertLogs('todo.jobs', 'WARNING'):
+                self.assertEqual(run_queued_jobs(), [TodoJob.QUEUED])
+                self.assertEqual(run_queued_jobs(), [TodoJob.QUEUED])
+                self.assertEqual(run_queued_jobs(), [TodoJob.FAILED])
+        self.assertEqual(calls, [1, 2, 3])
+        job.refresh_from_db()
+        self.assertEqual(job.status, TodoJob.FAILED)
+        self.assertIn('RuntimeError', job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_background_export_and_download(self):
+        Todo.objects.create(title='Alta', priority='high')
+        Todo.objects.create(title='Baja', priority='low')
+        response = self.client.get('/api/todos/export/?format=csv&priority=high&background=1')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        job_url = response['Location']
+        self.assertEqual(job_url, f"/api/jobs/{response.json()['id']}/")
+        self.assertEqual(self.client.get(f'{job_url}download/').status_code, 404)
+
+        self.assertEqual(run_queued_jobs(), [TodoJob.SUCCEEDED])
+        job = self.client.get(job_url).json()
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual((job['result']['format'], job['result']['rows']), ('csv', 1))
+        download = self.client.get(f'{job_url}download/')
+        self.assertEqual(download.status_code, 200)
+        rows = list(csv.DictReader(StringIO(b''.join(download.streaming_content).decode('utf-8'))))
+        self.assertEqual([row['title'] for row in rows], ['Alta'])
+
+    def test_background_bulk_update(self):
+        todo = Todo.objects.create(title='Pendiente')
+        response = self.client.patch(
+            '/api/todos/bulk-update/?background=1', [{'id': todo.id, 'status': 'completed'}],
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        invalid = self.client.patch(
+            '/api/todos/bulk-update/?background=1', [{'id': todo.id, 'priority': 'x'}],
+            content_type='application/json'
+        )
+        self.assertEqual(run_queued_jobs(), [TodoJob.SUCCEEDED, TodoJob.FAILED])
+        todo.refresh_from_db()
+        self.assertEqual(todo.status, 'completed')
+
+        # Un error de validación no se reintenta
+        failed = self.client.get(invalid['Location']).json()
+        self.assertEqual((failed['status'], failed['attempts']), ('failed', 1))
+        self.assertIn('priority', failed['result']['errors'][0])
+
+
+class TodoWorkerTests(TransactionTestCase):
+    # Los trabajos se ejecutan en hilos del pool, que no ven la transacción de TestCase.
+    # Un solo hilo: la base de datos de pruebas en memoria no admite escrituras concurrentes
+    def test_worker_command_drains_queue(self):
+        Todo.objects.create(title='Tarea', priority='high')
+        for _ in range(3):
+            enqueue('counters.rebuild')
+        out = StringIO()
+        with mock.patch('todo.management.commands.run_todo_worker.signal.signal') as handlers:
+            call_command('run_todo_worker', '--once', '--concurrency', '1', stdout=out)
+        self.assertEqual(handlers.call_count, 2)
+        self.assertIn('3 trabajos procesados', out.getvalue())
+        self.assertEqual(set(TodoJob.objects.values_list('status', flat=True)), {TodoJob.SUCCEEDED})
+
+    def test_stop_finishes_running_jobs(self):
+        worker = Worker(concurrency=1, poll_interval=0.01)
+        enqueue('counters.rebuild')
+        worker.stop()
+        self.assertEqual(worker.run(), 0)
+        self.assertEqual(TodoJob.objects.get().status, TodoJob.QUEUED)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.ana = User.objects.create(username='ana')
+        self.work = TodoCategory.objects.create(name='Trabajo')
+        self.past = timezone.now() - timedelta(days=1)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def create_todos(self, count):
+        for index in range(count):
+            todo = Todo.objects.create(
+                title=f'Tarea {index}', user=self.ana, category=self.work if index % 2 else None,
+                priority='urgent' if index % 3 else 'low', due_date=self.past,
+            )
+            TodoAttachment.objects.create(todo=todo, file=SimpleUploadedFile('nota.txt', b'x'), filename='nota.txt')
+
+    def test_matches_separate_endpoints(self):
+        self.create_todos(8)
+        dashboard = self.client.get('/api/dashboard/').json()
+        self.assertEqual(dashboard['stats'], self.client.get('/api/todos/stats/').json())
+        self.assertEqual(dashboard['categories'], self.client.get('/api/categories/').json()['results'])
+        self.assertEqual(dashboard['users'], self.client.get('/api/users/').json())
+        self.assertEqual(dashboard['overdue'], self.client.get('/api/todos/overdue/').json()[:5])
+        self.assertEqual(dashboard['high_priority'], self.client.get('/api/todos/high-priority/').json()[:5])
+        self.assertEqual(len(self.client.get('/api/dashboard/', {'preview': 2}).json()['overdue']), 2)
+
+    def test_query_budget_does_not_grow_with_data(self):
+        # Validadores (2), contadores, vencidas, categorías, usuarios, dos vistas previas y adjuntos
+        self.create_todos(2)
+        with self.assertNumQueries(9):
+            self.client.get('/api/dashboard/', {'preview': 20})
+        self.create_todos(30)
+        TodoCategory.objects.create(name='Casa')
+        User.objects.create(username='luis')
+        with self.assertNumQueries(9):
+            response = self.client.get('/api/dashboard/', {'preview': 20})
+        self.assertEqual(len(response.json()['overdue']), 20)
+
+    def test_conditional_get(self):
+        self.create_todos(1)
+        response = self.client.get('/api/dashboard/')
+        with self.assertNumQueries(2):
+            again = self.client.get('/api/dashboard/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        User.objects.create(username='luis')
+        self.assertEqual(self.client.get('/api/dashboard/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache().clear()
+        self.client = APIClient()
+        self.category = TodoCategory.objects.create(name='Trabajo')
+        self.ana = User.objects.create(username='ana')
+
+    def get(self, url, queries, **headers):
+        with self.assertNumQueries(queries):
+            return self.client.get(url, **headers)
+
+    def test_hits_skip_the_view(self):
+        for url in ('/api/categories/', f'/api/categories/{self.category.id}/', '/api/users/'):
+            first = self.client.get(url)
+            # Solo la lectura de las generaciones
+            cached = self.get(url, 1)
+            self.assertEqual(cached.status_code, 200)
+            self.assertEqual(cached.content, first.content)
+            self.assertEqual(dict(cached.items()), dict(first.items()))
+            if 'ETag' in first:
+                self.assertEqual(self.get(url, 1, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_stores_every_header(self):
+        self.client.get('/api/users/')
+        _, (_, headers) = lookup(RequestFactory().get('/api/users/'), (DataGeneration.USERS,))
+        self.assertEqual(headers, {'Content-Type': 'application/json', 'Allow': 'GET, HEAD, OPTIONS'})
+
+    def test_writes_invalidate_exactly(self):
+        self.client.get('/api/categories/')
+        self.client.get('/api/users/')
+
+        # Una tarea cambia tasks_count: las categorías se recalculan, los usuarios no
+        Todo.objects.create(title='Informe', category=self.category)
+        self.assertEqual(self.client.get('/api/categories/').json()['results'][0]['tasks_count'], 1)
+        self.get('/api/users/', 1)
+
+        User.objects.create(username='luis')
+        self.assertEqual(len(self.client.get('/api/users/').json()), 2)
+        self.get('/api/categories/', 1)
+
+        self.client.patch(f'/api/categories/{self.category.id}/', {'name': 'Oficina'}, format='json')
+        self.assertEqual(self.client.get('/api/categories/').json()['results'][0]['name'], 'Oficina')
+
+    def test_login_keeps_users_cached(self):
+        self.ana.set_password('secreta')
+        self.ana.save()
+        self.client.get('/api/users/')
+        before = read_generations(DataGeneration.USERS)
+        self.assertTrue(APIClient().login(username='ana', password='secreta'))
+        self.ana.refresh_from_db()
+        self.assertIsNotNone(self.ana.last_login)
+        self.assertEqual(read_generations(DataGeneration.USERS), before)
+        self.get('/api/users/', 1)
+
+        self.ana.first_name = 'Ana'
+        self.ana.save(update_fields=['first_name'])
+        self.assertEqual(self.client.get('/api/users/').json()[0]['first_name'], 'Ana')
+
+    def test_key_depends_on_query(self):
+        self.client.get('/api/categories/')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get('/api/categories/', {'page': 2}).status_code, 404)
+        self.assertGreater(len(context.captured_queries), 1)
+        # Los errores no se guardan
+        self.assertEqual(self.client.get('/api/categories/', {'page': 1}).json()['count'], 1)
+        self.get('/api/categories/', 4, HTTP_ACCEPT='application/json')
+        self.get('/api/categories/', 1, HTTP_ACCEPT='application/json')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/categories/', {'page': 2})
+        self.assertGreater(len(context.captured_queries), 1)
+
+    def test_writes_from_other_processes_invalidate(self):
+        # Otro proceso con su propia LocMemCache solo comparte la fila de DataGeneration
+        self.client.get('/api/users/')
+        User.objects.bulk_create([User(username='luis')])
+        DataGeneration.objects.filter(key=DataGeneration.USERS).update(value=F('value') + 1)
+        self.assertEqual(len(self.client.get('/api/users/').json()), 2)
@@ -0,0 +1,162 @@
+import logging
+import mimetypes
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .events import attachment_event, publish_event
+from .generations import bump_generation
+from .imaging import PIL_FORMATS, render_thumbnails
+from .models import DataGeneration, Todo, TodoAttachment
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (128, 512)
+DEFAULT_FORMATS = ('webp', 'jpeg')
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 100
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def thumbnail_settings():
+    sizes = getattr(settings, 'TODO_THUMBNAIL_SIZES', DEFAULT_SIZES)
+    formats = [value for value in getattr(settings, 'TODO_THUMBNAIL_FORMATS', DEFAULT_FORMATS) if value in PIL_FORMATS]
+    return sizes, formats
+
+
+def is_image(attachment):
+    """Adjuntos de los que se generan miniaturas (por el tipo del nombre; SVG no)"""
+    content_type, _ = mimetypes.guess_type(attachment.filename or attachment.file.name or '')
+    return bool(content_type) and content_type.startswith('image/') and content_type != 'image/svg+xml'
+
+
+def thumbnail_name(name, size, image_format):
+    """Junto al original: con el almacenamiento por contenido, las imágenes iguales comparten miniaturas"""
+    return f'{name}.thumb-{size}.{EXTENSIONS[image_format]}'
+
+
+def current_thumbnails(attachment):
+    """Miniaturas registradas que corresponden al archivo actual del adjunto"""
+    prefix = f'{attachment.file.name}.thumb-'
+    thumbnails = {}
+    for size, formats in (attachment.thumbnails or {}).items():
+        for image_format, name in formats.items():
+            if name.startswith(prefix):
+                thumbnails.setdefault(size, {})[image_format] = name
+    return thumbnails
+
+
+def thumbnail_targets(attachment):
+    """(ruta del original, [(ruta, tamaño, formato)]) de un adjunto, o None si no lleva miniaturas"""
+    if not attachment.file.name or not is_image(attachment):
+        return None
+    storage, name = attachment.file.storage, attachment.file.name
+    sizes, formats = thumbnail_settings()
+    try:
+        targets = [
+            (storage.path(thumbnail_name(name, size, image_format)), size, image_format)
+            for size in sizes for image_format in formats
+        ]
+        return storage.path(name), targets
+    except NotImplementedError:
+        return None  # Solo almacenamientos en el sistema de archivos
+
+
+def save_thumbnails(attachment, targets, done):
+    """
+    Registrar en el adjunto las miniaturas generadas (`done`, rutas de render_thumbnails)
+
+    Si cambian, se marca la tarea como modificada y se publica
+    attachment.updated. Devuelve el diccionario {tamaño: {formato: nombre}}.
+    """
+    name = attachment.file.name
+    done = set(done)
+    thumbnails = {}
+    for path, size, image_format in targets:
+        if path in done:
+            thumbnails.setdefault(str(size), {})[image_format] = thumbnail_name(name, size, image_format)
+
+    if thumbnails != current_thumbnails(attachment):
+        with transaction.atomic():
+            if TodoAttachment.objects.filter(pk=attachment.pk, file=name).update(thumbnails=thumbnails):
+                Todo.objects.filter(pk=attachment.todo_id).update(updated_at=timezone.now())
+                bump_generation(DataGeneration.TODOS)
+                publish_event(attachment_event(
+                    'updated', attachment, attachment.todo.user_id, attachment.todo.category_id
+                ))
+    return thumbnails
+
+
+def build_thumbnails(attachment_id, executor=None):
+    """
+    Generar y registrar las miniaturas de un adjunto (idempotente)
+
+    Las que ya existen en disco no se vuelven a generar. Pillow se ejecuta
+    en `executor` (un ProcessPoolExecutor) si se indica.
+    """
+    attachment = TodoAttachment.objects.filter(pk=attachment_id).select_related('todo').first()
+    job = thumbnail_targets(attachment) if attachment is not None else None
+    if job is None:
+        return {}
+    source, targets = job
+    if executor is None:
+        done = render_thumbnails(source, targets)
+    else:
+        done = executor.submit(render_thumbnails, source, targets).result()
+    return save_thumbnails(attachment, targets, done)
+
+
+class ThumbnailQueue:
+    """
+    Cola acotada de miniaturas pendientes, fuera del ciclo de la petición
+
+    Cada trabajo ocupa un hilo que espera a un proceso del pool
+    (TODO_THUMBNAIL_WORKERS procesos; con 0, Pillow corre en el hilo). Si
+    hay más de TODO_THUMBNAIL_QUEUE_SIZE pendientes, el adjunto se omite
+    y lo recoge después el comando generate_thumbnails.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.threads = None
+        self.processes = None
+
+    def start(self):
+        workers = getattr(settings, 'TODO_THUMBNAIL_WORKERS', DEFAULT_WORKERS)
+        if workers:
+            # spawn: los procesos no heredan hilos ni conexiones del servidor
+            self.processes = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        self.threads = ThreadPoolExecutor(max(workers, 1), thread_name_prefix='thumbnails')
+
+    def submit(self, attachment_id):
+        """Encolar un adjunto; devuelve el Future del trabajo o None si se omite"""
+        with self.lock:
+            if attachment_id in self.pending:
+                return None
+            if len(self.pending) >= getattr(settings, 'TODO_THUMBNAIL_QUEUE_SIZE', DEFAULT_QUEUE_SIZE):
+                logger.warning('Cola de miniaturas llena: se omite el adjunto %s', attachment_id)
+                return None
+            if self.threads is None:
+                self.start()
+            self.pending.add(attachment_id)
+        return self.threads.submit(self.run, attachment_id)
+
+    def run(self, attachment_id):
+        try:
+            return build_thumbnails(attachment_id, self.processes)
+        except Exception:
+            logger.exception('No se pudieron generar las miniaturas del adjunto %s', attachment_id)
+            return {}
+        finally:
+            with self.lock:
+                self.pending.discard(attachment_id)
+            connections.close_all()
+
+
+thumbnail_queue = ThumbnailQueue()
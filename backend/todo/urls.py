@@ -8,9 +8,12 @@ router.register(r'todos', views.TodoViewSet)
 router.register(r'categories', views.TodoCategoryViewSet)
 router.register(r'attachments', views.TodoAttachmentViewSet)
 router.register(r'users', views.UserViewSet)
+router.register(r'jobs', views.TodoJobViewSet)
 
 # Definir patrones de URL
 urlpatterns = [
+    path('events/', views.todo_events, name='todo-events'),
+    path('dashboard/', views.DashboardView.as_view(), name='todo-dashboard'),
     path('', include(router.urls)),
 ]
 
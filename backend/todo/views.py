@@ -1,21 +1,73 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Q, Count
-from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.settings import api_settings
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Todo, TodoCategory, TodoAttachment
+from .async_views import AsyncReadMixin
+from .models import DataGeneration, Todo, TodoCategory, TodoAttachment, TodoJob
 from .serializers import (
     TodoSerializer, TodoCreateSerializer, TodoUpdateStatusSerializer,
     TodoCategorySerializer, TodoAttachmentSerializer, TodoStatsSerializer,
-    UserSerializer
+    UserSerializer, TodoBulkCreateSerializer, TodoBulkUpdateSerializer,
+    TodoBulkDeleteSerializer, TodoJobSerializer, DashboardSerializer
 )
+from .bulk import (
+    BULK_MAX_ITEMS, BulkValidationError, bulk_create_todos, bulk_update_todos,
+    bulk_delete_todos
+)
+from .changes import CHANGES_MAX_PAGE_SIZE, CHANGES_PAGE_SIZE, read_changes
+from .conditional import conditional_get
+from .response_cache import cache_response
+from .events import stream_events
+from .export import astream_export, iter_export_rows, stream_export
+from .dashboard import DASHBOARD_MAX_PREVIEW_SIZE, DASHBOARD_PREVIEW_SIZE, build_dashboard
+from .filters import HIGH_PRIORITIES, filter_todos
+from .lists import CompactTodoList, parse_layout
+from .pagination import CompactListPagination, TodoKeysetPagination
+from .parsers import FastJSONParser
+from .projection import TodoProjection, parse_projection_fields
+from .renderers import CSVRenderer, DownloadRenderer, FastJSONRenderer, NDJSONRenderer, PackedIntRenderer
+from .stats import acompute_todo_stats, compute_todo_stats
+from .counters import aread_counter_stats, read_counter_stats
+from .downloads import serve_attachment, serve_file
+from .jobs import enqueue
+from .replicas import read_from_primary
+
+
+COMPACT_LIST_PARAMETERS = [
+    openapi.Parameter('layout', openapi.IN_QUERY, description="rows (lista de objetos) o columns ({columna: [valores]})", type=openapi.TYPE_STRING),
+    openapi.Parameter('pagination', openapi.IN_QUERY, description="Usar 'cursor' para paginar (página de 1000, ajustable con page_size)", type=openapi.TYPE_STRING),
+    openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor devuelto en next/previous", type=openapi.TYPE_STRING),
+    openapi.Parameter('page_size', openapi.IN_QUERY, description="Tamaño de página con paginación por cursor (máximo 10000)", type=openapi.TYPE_INTEGER),
+    openapi.Parameter('priority', openapi.IN_QUERY, description="Filtrar por prioridad", type=openapi.TYPE_STRING),
+    openapi.Parameter('category', openapi.IN_QUERY, description="Filtrar por categoría (ID)", type=openapi.TYPE_INTEGER),
+    openapi.Parameter('user', openapi.IN_QUERY, description="Filtrar por usuario (ID)", type=openapi.TYPE_INTEGER),
+    openapi.Parameter('search', openapi.IN_QUERY, description="Buscar en título/descripción", type=openapi.TYPE_STRING),
+    openapi.Parameter('overdue', openapi.IN_QUERY, description="Solo tareas vencidas", type=openapi.TYPE_BOOLEAN),
+]
+
 
+def job_accepted(request, job):
+    """Respuesta 202 (en JSON) con el trabajo encolado; Location apunta a su estado"""
+    request.accepted_renderer, request.accepted_media_type = FastJSONRenderer(), FastJSONRenderer.media_type
+    response = Response(TodoJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = reverse('todo:todojob-detail', args=[job.pk])
+    return response
 
-class TodoViewSet(viewsets.ModelViewSet):
+
+class TodoViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar ToDos del sistema
     
@@ -26,10 +78,21 @@ class TodoViewSet(viewsets.ModelViewSet):
     - update: Actualizar tarea completa
     - partial_update: Actualizar campos específicos
     - destroy: Eliminar tarea
+    
+    Bajo ASGI, list, retrieve, stats, overdue y high_priority se sirven
+    con sus versiones asíncronas (alist, aretrieve...).
     """
     queryset = Todo.objects.all()
     serializer_class = TodoSerializer
     permission_classes = [AllowAny]  # Para desarrollo, cambiar en producción
+    async_actions = ('list', 'retrieve', 'stats', 'overdue', 'high_priority')
+    
+    @property
+    def paginator(self):
+        """Usar paginación por cursor si se solicita con ?pagination=cursor"""
+        if not hasattr(self, '_paginator') and self.request.query_params.get('pagination') == 'cursor':
+            self._paginator = TodoKeysetPagination()
+        return super().paginator
     
     def get_serializer_class(self):
         """Usar diferentes serializers según la acción"""
@@ -44,57 +107,97 @@ class TodoViewSet(viewsets.ModelViewSet):
             openapi.Parameter('status', openapi.IN_QUERY, description="Filtrar por estado (pending, in_progress, completed, cancelled)", type=openapi.TYPE_STRING),
             openapi.Parameter('priority', openapi.IN_QUERY, description="Filtrar por prioridad (low, medium, high, urgent)", type=openapi.TYPE_STRING),
             openapi.Parameter('category', openapi.IN_QUERY, description="Filtrar por categoría (ID)", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('search', openapi.IN_QUERY, description="Buscar en título/descripción", type=openapi.TYPE_STRING),
+            openapi.Parameter('search', openapi.IN_QUERY, description="Buscar en título/descripción (por prefijo, ordenado por relevancia)", type=openapi.TYPE_STRING),
             openapi.Parameter('overdue', openapi.IN_QUERY, description="Filtrar tareas vencidas", type=openapi.TYPE_BOOLEAN),
             openapi.Parameter('user', openapi.IN_QUERY, description="Filtrar por usuario (ID)", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('pagination', openapi.IN_QUERY, description="Usar 'cursor' para paginación por cursor (sin conteo total)", type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Cursor devuelto en next/previous (paginación por cursor)", type=openapi.TYPE_STRING),
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas (ej: id,title,status)", type=openapi.TYPE_STRING),
+            openapi.Parameter('expand', openapi.IN_QUERY, description="Relaciones anidadas a incluir: category, user, attachments", type=openapi.TYPE_STRING),
         ],
         operation_description="Obtener lista de tareas con filtros opcionales"
     )
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
     def list(self, request, *args, **kwargs):
         """Obtener lista de tareas con filtros"""
+        projection = self.get_projection()
+        if projection is not None:
+            return self.projected_response(self.filter_queryset(self.get_queryset()), projection)
         return super().list(request, *args, **kwargs)
     
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
+    def retrieve(self, request, *args, **kwargs):
+        """Obtener una tarea (responde 304 si no cambió)"""
+        return super().retrieve(request, *args, **kwargs)
+    
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
+    async def alist(self, request, *args, **kwargs):
+        projection = self.get_projection()
+        if projection is not None:
+            queryset = self.filter_queryset(await self.aget_queryset())
+            return await sync_to_async(self.projected_response)(queryset, projection)
+        return await super().alist(request, *args, **kwargs)
+    
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
+    async def aretrieve(self, request, *args, **kwargs):
+        return await super().aretrieve(request, *args, **kwargs)
+    
+    def get_projection(self):
+        """Proyección ligera si se pidieron ?fields= o ?expand=, o None"""
+        fields = parse_projection_fields(self.request.query_params)
+        if fields is None:
+            return None
+        return TodoProjection(fields, self.get_serializer_context())
+    
+    def projected_response(self, queryset, projection, paginate=True):
+        """Responder con filas de values() en lugar de instancias serializadas"""
+        queryset = projection.apply(queryset)
+        page = self.paginate_queryset(queryset) if paginate else None
+        if page is not None:
+            return self.get_paginated_response(projection.to_representation(page))
+        return Response(projection.to_representation(queryset))
+    
+    def get_base_queryset(self):
+        """Tareas con las relaciones que muestra TodoSerializer, sin filtros"""
+        return Todo.objects.select_related('user').prefetch_related(
+            Prefetch('category', queryset=TodoCategory.objects.with_tasks_count()),
+            'attachments'
+        )
+    
     def get_queryset(self):
         """Filtrar tareas según parámetros de consulta"""
-        queryset = Todo.objects.select_related('category', 'user').prefetch_related('attachments')
-        
-        # Filtro por estado
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        # Filtro por prioridad
-        priority_filter = self.request.query_params.get('priority', None)
-        if priority_filter:
-            queryset = queryset.filter(priority=priority_filter)
-        
-        # Filtro por categoría
-        category_filter = self.request.query_params.get('category', None)
-        if category_filter:
-            queryset = queryset.filter(category_id=category_filter)
-        
-        # Filtro por usuario
-        user_filter = self.request.query_params.get('user', None)
-        if user_filter:
-            queryset = queryset.filter(user_id=user_filter)
-        
-        # Búsqueda por texto
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search)
-            )
+        return filter_todos(self.get_base_queryset(), self.request.query_params)
+    
+    async def aget_queryset(self):
+        """get_queryset para las acciones asíncronas; la búsqueda comprueba el índice FTS5 en un hilo"""
+        if self.request.query_params.get('search'):
+            return await sync_to_async(self.get_queryset)()
+        return self.get_queryset()
+    
+    def get_counter_filters(self):
+        """
+        Filtros que pueden resolverse con los contadores de estadísticas
         
-        # Filtro por vencidas
-        overdue_filter = self.request.query_params.get('overdue', None)
-        if overdue_filter is not None and overdue_filter.lower() in ['true', '1', 'yes']:
-            queryset = queryset.filter(
-                due_date__lt=timezone.now(),
-                status__in=['pending', 'in_progress']
-            )
+        Devuelve None si la consulta usa búsqueda, vencidas o IDs no
+        válidos; en ese caso hay que agregar sobre el queryset.
+        """
+        params = self.request.query_params
+        overdue_filter = params.get('overdue', None)
+        if params.get('search') or (overdue_filter is not None and overdue_filter.lower() in ['true', '1', 'yes']):
+            return None
         
-        return queryset
+        filters = {}
+        for name in ('user', 'category'):
+            value = params.get(name, None)
+            if value:
+                if not value.isdigit() or int(value) == 0:
+                    return None
+                filters[f'{name}_id'] = int(value)
+        for name in ('status', 'priority'):
+            value = params.get(name, None)
+            if value:
+                filters[name] = value
+        return filters
     
     @swagger_auto_schema(
         request_body=TodoUpdateStatusSerializer,
@@ -130,48 +233,158 @@ class TodoViewSet(viewsets.ModelViewSet):
         operation_description="Obtener estadísticas generales de las tareas"
     )
     @action(detail=False, methods=['get'])
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, time_sensitive=True)
     def stats(self, request):
         """Obtener estadísticas de las tareas"""
-        queryset = self.get_queryset()
-        total_tasks = queryset.count()
-        
-        # Estadísticas por estado
-        pending_tasks = queryset.filter(status='pending').count()
-        completed_tasks = queryset.filter(status='completed').count()
-        in_progress_tasks = queryset.filter(status='in_progress').count()
-        cancelled_tasks = queryset.filter(status='cancelled').count()
+        counter_filters = self.get_counter_filters()
+        if counter_filters is not None:
+            stats_data = read_counter_stats(**counter_filters)
+        else:
+            stats_data = compute_todo_stats(self.get_queryset())
         
-        # Tareas vencidas
-        overdue_tasks = queryset.filter(
-            due_date__lt=timezone.now(),
-            status__in=['pending', 'in_progress']
-        ).count()
-        
-        # Tasa de completado
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        # Estadísticas por prioridad
-        priority_stats = queryset.values('priority').annotate(count=Count('priority'))
-        tasks_by_priority = {item['priority']: item['count'] for item in priority_stats}
+        serializer = TodoStatsSerializer(stats_data)
+        return Response(serializer.data)
+    
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, time_sensitive=True)
+    async def astats(self, request):
+        counter_filters = self.get_counter_filters()
+        if counter_filters is not None:
+            stats_data = await aread_counter_stats(**counter_filters)
+        else:
+            stats_data = await acompute_todo_stats(await self.aget_queryset())
+        return Response(TodoStatsSerializer(stats_data).data)
+    
+    def in_background(self):
+        """?background=1: encolar la operación en lugar de ejecutarla en la petición"""
+        return self.request.query_params.get('background', '').lower() in ['true', '1', 'yes']
+    
+    def get_bulk_items(self, request):
+        """Validar que el cuerpo sea una lista no vacía dentro del límite permitido"""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'detail': 'Se esperaba una lista no vacía de tareas.'})
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError({'detail': f'Máximo {BULK_MAX_ITEMS} tareas por petición.'})
+        return items
+    
+    @swagger_auto_schema(
+        method='post',
+        request_body=TodoBulkCreateSerializer(many=True),
+        responses={201: 'IDs de las tareas creadas', 400: 'Errores por elemento'},
+        operation_description="Crear tareas en bloque (todo o nada)"
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request):
+        """Crear varias tareas en una sola transacción"""
+        try:
+            todos = bulk_create_todos(self.get_bulk_items(request))
+        except BulkValidationError as error:
+            return Response({'errors': error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {'created': len(todos), 'ids': [todo.id for todo in todos]},
+            status=status.HTTP_201_CREATED
+        )
+    
+    @swagger_auto_schema(
+        method='patch',
+        request_body=TodoBulkUpdateSerializer(many=True),
+        manual_parameters=[
+            openapi.Parameter('background', openapi.IN_QUERY, description="Actualizar en segundo plano (responde 202 con el trabajo)", type=openapi.TYPE_BOOLEAN),
+        ],
+        responses={200: 'IDs de las tareas actualizadas', 202: TodoJobSerializer, 400: 'Errores por elemento'},
+        operation_description="Actualizar tareas en bloque (todo o nada); cada elemento lleva su id"
+    )
+    @action(detail=False, methods=['patch'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """Actualizar varias tareas en una sola transacción (con ?background=1, en la cola de trabajos)"""
+        if self.in_background():
+            return job_accepted(request, enqueue('todos.bulk_update', {'items': self.get_bulk_items(request)}))
+        try:
+            todos = bulk_update_todos(self.get_bulk_items(request))
+        except BulkValidationError as error:
+            return Response({'errors': error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'updated': len(todos), 'ids': [todo.id for todo in todos]})
+    
+    @swagger_auto_schema(
+        method='post',
+        request_body=TodoBulkDeleteSerializer,
+        responses={200: 'IDs eliminados y no encontrados'},
+        operation_description="Eliminar tareas en bloque con una sola consulta filtrada"
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Eliminar varias tareas por ID"""
+        serializer = TodoBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if len(ids) > BULK_MAX_ITEMS:
+            raise ValidationError({'ids': [f'Máximo {BULK_MAX_ITEMS} IDs por petición.']})
         
-        # Estadísticas por categoría
-        category_stats = queryset.values('category__name').annotate(count=Count('category'))
-        tasks_by_category = {item['category__name'] or 'Sin categoría': item['count'] for item in category_stats}
+        deleted, missing = bulk_delete_todos(ids)
+        return Response({
+            'deleted': len(deleted),
+            'ids': deleted,
+            'errors': [{'id': pk, 'detail': 'No encontrado.'} for pk in missing],
+        })
+    
+    @swagger_auto_schema(
+        method='get',
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, description="Token devuelto en 'next' por la llamada anterior (vacío para la sincronización inicial)", type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, description=f"Máximo de tareas y de eliminaciones por respuesta (por defecto {CHANGES_PAGE_SIZE}, máximo {CHANGES_MAX_PAGE_SIZE})", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: 'changes (tareas), deleted (IDs eliminados), next (token) y more', 410: 'Token expirado'},
+        operation_description="Tareas creadas, modificadas o eliminadas desde un token, para mantener una réplica local"
+    )
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Feed de cambios para sincronización incremental
         
-        stats_data = {
-            'total_tasks': total_tasks,
-            'pending_tasks': pending_tasks,
-            'completed_tasks': completed_tasks,
-            'in_progress_tasks': in_progress_tasks,
-            'cancelled_tasks': cancelled_tasks,
-            'overdue_tasks': overdue_tasks,
-            'completion_rate': round(completion_rate, 2),
-            'tasks_by_priority': tasks_by_priority,
-            'tasks_by_category': tasks_by_category,
-        }
+        Con `more` en true hay que volver a llamar enseguida con `next`; los
+        cambios de los últimos segundos pueden llegar repetidos. Se lee del
+        primario: el margen del token (SETTLE_WINDOW) no cubre el retraso de
+        una réplica y los cambios que aún no tuviera se saltarían.
+        """
+        limit = request.query_params.get('limit', '')
+        limit = min(int(limit), CHANGES_MAX_PAGE_SIZE) if limit.isdigit() and int(limit) > 0 else CHANGES_PAGE_SIZE
+        with read_from_primary():
+            todos, deleted, token, more = read_changes(
+                self.get_base_queryset(), request.query_params.get('since'), limit
+            )
+            serializer = self.get_serializer(todos, many=True)
+            data = serializer.data
+        return Response({'changes': data, 'deleted': deleted, 'next': token, 'more': more})
+    
+    @swagger_auto_schema(
+        method='get',
+        manual_parameters=[
+            openapi.Parameter('format', openapi.IN_QUERY, description="Formato de exportación (ndjson, csv)", type=openapi.TYPE_STRING),
+            openapi.Parameter('background', openapi.IN_QUERY, description="Exportar a un archivo en segundo plano (responde 202 con el trabajo)", type=openapi.TYPE_BOOLEAN),
+        ],
+        responses={200: 'Tareas en NDJSON o CSV', 202: TodoJobSerializer},
+        operation_description="Exportar en streaming las tareas filtradas (acepta los mismos filtros que el listado)"
+    )
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Exportar tareas en NDJSON o CSV sin cargarlas en memoria (con ?background=1, a un archivo)
         
-        serializer = TodoStatsSerializer(stats_data)
-        return Response(serializer.data)
+        Bajo ASGI el cuerpo es un generador asíncrono (astream_export): con
+        uno síncrono Django lo leería entero antes de enviarlo.
+        """
+        renderer = request.accepted_renderer
+        if self.in_background():
+            params = {key: value for key, value in request.query_params.items() if key not in ('background', 'format')}
+            return job_accepted(request, enqueue('todos.export', {'format': renderer.format, 'params': params}))
+        rows = iter_export_rows(self.get_queryset())
+        stream = astream_export if isinstance(request._request, ASGIRequest) else stream_export
+        response = StreamingHttpResponse(
+            stream(renderer, rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = f'attachment; filename="todos.{renderer.format}"'
+        return response
     
     @swagger_auto_schema(
         method='get',
@@ -179,30 +392,80 @@ class TodoViewSet(viewsets.ModelViewSet):
         operation_description="Obtener tareas de alta prioridad"
     )
     @action(detail=False, methods=['get'], url_path='high-priority')
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
     def high_priority(self, request):
         """Obtener tareas de alta prioridad"""
-        high_priority_todos = self.get_queryset().filter(priority__in=['high', 'urgent'])
+        high_priority_todos = self.get_queryset().filter(priority__in=HIGH_PRIORITIES)
+        projection = self.get_projection()
+        if projection is not None:
+            return self.projected_response(high_priority_todos, projection, paginate=False)
         serializer = self.get_serializer(high_priority_todos, many=True)
         return Response(serializer.data)
     
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
+    async def ahigh_priority(self, request):
+        high_priority_todos = (await self.aget_queryset()).filter(priority__in=HIGH_PRIORITIES)
+        return await self.aunpaginated_response(high_priority_todos)
+    
     @swagger_auto_schema(
         method='get',
         responses={200: TodoSerializer(many=True)},
         operation_description="Obtener tareas vencidas"
     )
     @action(detail=False, methods=['get'])
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
     def overdue(self, request):
         """Obtener tareas vencidas"""
-        overdue_todos = self.get_queryset().filter(
-            due_date__lt=timezone.now(),
-            status__in=['pending', 'in_progress']
-        )
+        overdue_todos = self.get_queryset().overdue()
+        projection = self.get_projection()
+        if projection is not None:
+            return self.projected_response(overdue_todos, projection, paginate=False)
         serializer = self.get_serializer(overdue_todos, many=True)
         return Response(serializer.data)
+    
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
+    async def aoverdue(self, request):
+        return await self.aunpaginated_response((await self.aget_queryset()).overdue())
+    
+    async def aunpaginated_response(self, queryset):
+        """Lista sin paginar (o su proyección) para las acciones asíncronas"""
+        projection = self.get_projection()
+        if projection is not None:
+            return await sync_to_async(self.projected_response)(queryset, projection, paginate=False)
+        serializer = self.get_serializer([todo async for todo in queryset], many=True)
+        return Response(serializer.data)
+
+    def compact_list_response(self, name):
+        """
+        Responder una lista compacta (pending-*/resolved-*)
+        
+        Acepta los filtros del listado, ?layout=columns, ?pagination=cursor
+        (con ?page_size=) y, en pending-ids, ?format=packed para recibir los
+        IDs como enteros binarios (los enlaces de página van en la cabecera Link).
+        """
+        todo_list = CompactTodoList(name, parse_layout(self.request.query_params))
+        packed = self.request.accepted_renderer.format == PackedIntRenderer.format
+        if packed:
+            todo_list.layout = 'rows'
+        queryset = todo_list.apply(self.filter_queryset(self.get_queryset()))
+        
+        if self.request.query_params.get('pagination') != 'cursor':
+            return Response(todo_list.to_representation(todo_list.values(queryset)))
+        
+        paginator = CompactListPagination()
+        page = paginator.paginate_queryset(todo_list.page_values(queryset), self.request, view=self)
+        data = todo_list.to_representation(todo_list.page_rows(page))
+        if not packed:
+            return paginator.get_paginated_response(data)
+        links = [(paginator.get_next_link(), 'next'), (paginator.get_previous_link(), 'previous')]
+        link = ', '.join(f'<{url}>; rel="{rel}"' for url, rel in links if url)
+        return Response(data, headers={'Link': link} if link else None)
 
     # Endpoints específicos para listas según requerimientos
-    @action(detail=False, methods=['get'], url_path='pending-ids')
+    @action(detail=False, methods=['get'], url_path='pending-ids',
+            renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, PackedIntRenderer])
     @swagger_auto_schema(
+        manual_parameters=COMPACT_LIST_PARAMETERS,
         operation_description="Lista de todos los pendientes (solo IDs)",
         responses={200: openapi.Response('Lista de IDs', openapi.Schema(
             type=openapi.TYPE_ARRAY,
@@ -211,11 +474,11 @@ class TodoViewSet(viewsets.ModelViewSet):
     )
     def pending_ids(self, request):
         """Lista de todos los pendientes (solo IDs)"""
-        pending_todos = Todo.objects.filter(status='pending').values_list('id', flat=True)
-        return Response(list(pending_todos))
+        return self.compact_list_response('pending-ids')
 
     @action(detail=False, methods=['get'], url_path='pending-titles')
     @swagger_auto_schema(
+        manual_parameters=COMPACT_LIST_PARAMETERS,
         operation_description="Lista de todos los pendientes (IDs y Titles)",
         responses={200: openapi.Response('Lista de tareas', openapi.Schema(
             type=openapi.TYPE_ARRAY,
@@ -230,11 +493,11 @@ class TodoViewSet(viewsets.ModelViewSet):
     )
     def pending_titles(self, request):
         """Lista de todos los pendientes (IDs y Titles)"""
-        pending_todos = Todo.objects.filter(status='pending').values('id', 'title')
-        return Response(list(pending_todos))
+        return self.compact_list_response('pending-titles')
 
     @action(detail=False, methods=['get'], url_path='pending-unresolved')
     @swagger_auto_schema(
+        manual_parameters=COMPACT_LIST_PARAMETERS,
         operation_description="Lista de todos los pendientes sin resolver (ID y Title)",
         responses={200: openapi.Response('Lista de tareas', openapi.Schema(
             type=openapi.TYPE_ARRAY,
@@ -249,13 +512,11 @@ class TodoViewSet(viewsets.ModelViewSet):
     )
     def pending_unresolved(self, request):
         """Lista de todos los pendientes sin resolver (ID y Title)"""
-        pending_todos = Todo.objects.filter(
-            status__in=['pending', 'in_progress']
-        ).values('id', 'title')
-        return Response(list(pending_todos))
+        return self.compact_list_response('pending-unresolved')
 
     @action(detail=False, methods=['get'], url_path='pending-resolved')
     @swagger_auto_schema(
+        manual_parameters=COMPACT_LIST_PARAMETERS,
         operation_description="Lista de todos los pendientes resueltos (ID y Title)",
         responses={200: openapi.Response('Lista de tareas', openapi.Schema(
             type=openapi.TYPE_ARRAY,
@@ -270,11 +531,11 @@ class TodoViewSet(viewsets.ModelViewSet):
     )
     def pending_resolved(self, request):
         """Lista de todos los pendientes resueltos (ID y Title)"""
-        resolved_todos = Todo.objects.filter(status='completed').values('id', 'title')
-        return Response(list(resolved_todos))
+        return self.compact_list_response('pending-resolved')
 
     @action(detail=False, methods=['get'], url_path='pending-users')
     @swagger_auto_schema(
+        manual_parameters=COMPACT_LIST_PARAMETERS,
         operation_description="Lista de todos los pendientes (IDs y userID)",
         responses={200: openapi.Response('Lista de tareas', openapi.Schema(
             type=openapi.TYPE_ARRAY,
@@ -289,11 +550,11 @@ class TodoViewSet(viewsets.ModelViewSet):
     )
     def pending_users(self, request):
         """Lista de todos los pendientes (IDs y userID)"""
-        pending_todos = Todo.objects.filter(status='pending').values('id', 'user')
-        return Response(list(pending_todos))
+        return self.compact_list_response('pending-users')
 
     @action(detail=False, methods=['get'], url_path='resolved-users')
     @swagger_auto_schema(
+        manual_parameters=COMPACT_LIST_PARAMETERS,
         operation_description="Lista de todos los pendientes resueltos (ID y userID)",
         responses={200: openapi.Response('Lista de tareas', openapi.Schema(
             type=openapi.TYPE_ARRAY,
@@ -308,11 +569,11 @@ class TodoViewSet(viewsets.ModelViewSet):
     )
     def resolved_users(self, request):
         """Lista de todos los pendientes resueltos (ID y userID)"""
-        resolved_todos = Todo.objects.filter(status='completed').values('id', 'user')
-        return Response(list(resolved_todos))
+        return self.compact_list_response('resolved-users')
 
     @action(detail=False, methods=['get'], url_path='unresolved-users')
     @swagger_auto_schema(
+        manual_parameters=COMPACT_LIST_PARAMETERS,
         operation_description="Lista de todos los pendientes sin resolver (ID y userID)",
         responses={200: openapi.Response('Lista de tareas', openapi.Schema(
             type=openapi.TYPE_ARRAY,
@@ -327,10 +588,7 @@ class TodoViewSet(viewsets.ModelViewSet):
     )
     def unresolved_users(self, request):
         """Lista de todos los pendientes sin resolver (ID y userID)"""
-        unresolved_todos = Todo.objects.filter(
-            status__in=['pending', 'in_progress']
-        ).values('id', 'user')
-        return Response(list(unresolved_todos))
+        return self.compact_list_response('unresolved-users')
 
 
 @swagger_auto_schema(tags=['Categories'])
@@ -339,6 +597,22 @@ class TodoCategoryViewSet(viewsets.ModelViewSet):
     queryset = TodoCategory.objects.all()
     serializer_class = TodoCategorySerializer
     permission_classes = [AllowAny]
+    
+    def get_queryset(self):
+        """Anotar el número de tareas de cada categoría"""
+        return TodoCategory.objects.with_tasks_count()
+    
+    @cache_response(DataGeneration.CATEGORIES, DataGeneration.TODOS)
+    @conditional_get(DataGeneration.CATEGORIES, DataGeneration.TODOS)
+    def list(self, request, *args, **kwargs):
+        """Obtener lista de categorías (responde 304 si no cambió; desde la caché si no hubo escrituras)"""
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response(DataGeneration.CATEGORIES, DataGeneration.TODOS)
+    @conditional_get(DataGeneration.CATEGORIES, DataGeneration.TODOS)
+    def retrieve(self, request, *args, **kwargs):
+        """Obtener una categoría (responde 304 si no cambió; desde la caché si no hubo escrituras)"""
+        return super().retrieve(request, *args, **kwargs)
 
 
 @swagger_auto_schema(tags=['Attachments'])
@@ -347,6 +621,8 @@ class TodoAttachmentViewSet(viewsets.ModelViewSet):
     queryset = TodoAttachment.objects.all()
     serializer_class = TodoAttachmentSerializer
     permission_classes = [AllowAny]
+    # Los archivos se suben como multipart/form-data
+    parser_classes = [FastJSONParser, MultiPartParser, FormParser]
     
     @swagger_auto_schema(
         manual_parameters=[
@@ -365,9 +641,18 @@ class TodoAttachmentViewSet(viewsets.ModelViewSet):
         if todo_id:
             queryset = queryset.filter(todo_id=todo_id)
         return queryset
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Descargar el archivo adjunto (admite Range, If-Range, If-None-Match e If-Modified-Since)"
+    )
+    @action(detail=True, methods=['get'], renderer_classes=[FastJSONRenderer, DownloadRenderer])
+    def download(self, request, pk=None):
+        """Descargar el archivo de un adjunto"""
+        return serve_attachment(request, self.get_object())
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(AsyncReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet de solo lectura para usuarios del sistema
     Permite obtener la lista de usuarios para asignación de tareas
@@ -376,10 +661,92 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
     pagination_class = None  # Disable pagination for users
+    async_actions = ('list',)
     
     @swagger_auto_schema(
         operation_description="Obtener lista de todos los usuarios disponibles para asignación de tareas"
     )
+    @cache_response(DataGeneration.USERS)
     def list(self, request, *args, **kwargs):
-        """Obtener lista de usuarios"""
+        """Obtener lista de usuarios (desde la caché si no hubo cambios en los usuarios)"""
         return super().list(request, *args, **kwargs)
+    
+    @cache_response(DataGeneration.USERS)
+    async def alist(self, request, *args, **kwargs):
+        return await super().alist(request, *args, **kwargs)
+
+
+class TodoJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Estado de los trabajos en segundo plano (cola en base de datos, manage.py run_todo_worker)"""
+    queryset = TodoJob.objects.all()
+    serializer_class = TodoJobSerializer
+    permission_classes = [AllowAny]
+    
+    @swagger_auto_schema(
+        operation_description="Obtener el estado y el resultado de un trabajo en segundo plano"
+    )
+    def retrieve(self, request, *args, **kwargs):
+        """Estado de un trabajo"""
+        return super().retrieve(request, *args, **kwargs)
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Descargar el archivo generado por un trabajo terminado (p. ej. una exportación)"
+    )
+    @action(detail=True, methods=['get'], renderer_classes=[FastJSONRenderer, DownloadRenderer])
+    def download(self, request, pk=None):
+        """Descargar el archivo del resultado del trabajo"""
+        job = self.get_object()
+        name = (job.result or {}).get('file') if job.status == TodoJob.SUCCEEDED else None
+        if not name:
+            raise Http404('El trabajo no ha generado ningún archivo.')
+        return serve_file(request, default_storage, name)
+
+
+class DashboardView(APIView):
+    """
+    Datos iniciales de la pantalla de inicio en una sola petición
+    
+    Estadísticas, categorías con su número de tareas, usuarios y las
+    primeras tareas vencidas y de alta prioridad (ver todo.dashboard).
+    """
+    permission_classes = [AllowAny]
+    
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('preview', openapi.IN_QUERY, description=f"Tareas en cada vista previa (por defecto {DASHBOARD_PREVIEW_SIZE}, máximo {DASHBOARD_MAX_PREVIEW_SIZE})", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: DashboardSerializer},
+        operation_description="Estadísticas, categorías, usuarios y vistas previas de tareas vencidas y de alta prioridad"
+    )
+    @conditional_get(DataGeneration.TODOS, DataGeneration.CATEGORIES, DataGeneration.USERS, time_sensitive=True)
+    def get(self, request):
+        """Obtener los datos del panel (responde 304 si no cambiaron)"""
+        preview = request.query_params.get('preview', '')
+        preview = min(int(preview), DASHBOARD_MAX_PREVIEW_SIZE) if preview.isdigit() else DASHBOARD_PREVIEW_SIZE
+        serializer = DashboardSerializer(build_dashboard(preview), context={'request': request})
+        return Response(serializer.data)
+
+
+async def todo_events(request):
+    """
+    Stream de eventos de tareas, categorías y adjuntos (Server-Sent Events)
+    
+    Requiere ASGI: cada conexión queda abierta sin ocupar un hilo. Acepta
+    ?user= y ?category= para recibir solo los eventos de ese usuario o categoría.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'El stream de eventos requiere un servidor ASGI.'}, status=501)
+    
+    filters = {}
+    for name in ('user', 'category'):
+        value = request.GET.get(name)
+        if value:
+            if not value.isdigit():
+                return JsonResponse({name: ['Debe ser un ID numérico.']}, status=400)
+            filters[name] = int(value)
+    
+    response = StreamingHttpResponse(stream_events(filters), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
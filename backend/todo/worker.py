@@ -0,0 +1,13 @@
+# Procesos del pool de `run_todo_worker --pool process`: se arrancan con spawn,
+# así que cada uno configura Django antes de importar modelos
+import django
+
+
+def setup_process():
+    django.setup()
+
+
+def execute_in_process(job_id, token):
+    from .jobs import execute_job
+
+    return execute_job(job_id, token)